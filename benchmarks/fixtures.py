@@ -0,0 +1,87 @@
+import os
+import json
+import random
+
+# Записанные ответы WB (python -m benchmarks.run --record ...)
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+def make_card(product_id=100000001, sizes=40, warehouses=30, seed=0):
+    """Карточка товара с множеством размеров, у каждого остатки на нескольких складах"""
+    rng = random.Random(seed + product_id)
+    return {
+        'id': product_id,
+        'name': f"Товар {product_id}",
+        'brand': f"Бренд {product_id % 50}",
+        'subj': {'id': 1234, 'name': "Кружки"},
+        'supplierId': 10000 + product_id % 500,
+        'supplierName': f"Продавец {product_id % 500}",
+        'supplier': f"Продавец {product_id % 500}",
+        'rating': round(rng.uniform(3, 5), 1),
+        'feedbacks': rng.randint(0, 5000),
+        'salePriceU': rng.randint(10000, 500000),
+        'priceU': rng.randint(500000, 900000),
+        'sizes': [
+            {
+                'name': f"{42 + size}",
+                'optionId': product_id * 100 + size,
+                'stocks': [
+                    {'wh': 100 + rng.randint(0, warehouses * 3), 'qty': rng.randint(0, 200)}
+                    for _ in range(rng.randint(1, warehouses))
+                ]
+            }
+            for size in range(sizes)
+        ]
+    }
+
+def make_listing_page(products=100, page=1, sizes=3, warehouses=5):
+    """Страница выдачи каталога: products товаров с небольшим числом размеров"""
+    start = 200000000 + page * products
+    return [make_card(start + index, sizes=sizes, warehouses=warehouses) for index in range(products)]
+
+def make_feedback_page(product_id=100000001, feedbacks=100):
+    """Страница отзывов в формате feedbacks.wb.ru"""
+    rng = random.Random(product_id)
+    return [
+        {
+            'id': f"fb{product_id}{index}",
+            'wbUserId': rng.randint(1, 10 ** 8),
+            'productValuation': rng.randint(1, 5),
+            'text': "Отличный товар, пришел быстро, упаковка целая. " * rng.randint(1, 6),
+            'votes': {'pluses': rng.randint(0, 30), 'minuses': rng.randint(0, 5)},
+            'createdDate': f"2025-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}T12:00:00Z"
+        }
+        for index in range(feedbacks)
+    ]
+
+def load_recorded(name):
+    """Загружает записанный ответ WB или None, если его нет"""
+    try:
+        with open(os.path.join(FIXTURES_DIR, f"{name}.json"), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def record_fixtures(product_id, category_shard=None, category_query=None):
+    """Сохраняет настоящие ответы WB: карточку, страницу отзывов и страницу выдачи категории"""
+    from parser.scraper import WildBerriesScraper
+
+    scraper = WildBerriesScraper()
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    recorded = {}
+
+    response = scraper._get('card', f"https://card.wb.ru/cards/detail?nm={product_id}")
+    products = response.json().get('data', {}).get('products', []) if response.status_code == 200 else []
+    if products:
+        recorded['card'] = products[0]
+    feedbacks = scraper.get_product_feedbacks(product_id, limit=100)
+    if feedbacks:
+        recorded['feedback_page'] = feedbacks
+    if category_shard:
+        listing = scraper.get_category_products(category_shard, query=category_query)
+        if listing:
+            recorded['listing_page'] = listing
+
+    for name, payload in recorded.items():
+        with open(os.path.join(FIXTURES_DIR, f"{name}.json"), 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False)
+    return sorted(recorded)
@@ -0,0 +1,257 @@
+"""Микробенчмарки разбора карточек и сохранения результатов
+
+Запуск:
+    python -m benchmarks.run                    # сравнить с benchmarks/baseline.json
+    python -m benchmarks.run --save-baseline    # записать новую базовую линию
+    python -m benchmarks.run --db               # добавить бенчмарки записи в локальную PostgreSQL
+    python -m benchmarks.run --record 12345678  # записать настоящие ответы WB в benchmarks/fixtures
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import statistics
+from datetime import datetime
+
+from benchmarks.fixtures import make_card, make_listing_page, make_feedback_page, load_recorded, record_fixtures
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# Диапазон ID продавцов и префикс товаров, которые бенчмарк пишет в БД и удаляет после себя
+BENCH_SELLER_ID = 2147480000
+BENCH_PREFIX = "bench-"
+
+def measure(func, repeat=5, min_time=0.05):
+    """Замеряет время одного вызова func: подбирает число вызовов на замер и повторяет замер repeat раз"""
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time or number >= 1 << 20:
+            break
+        number *= 2
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - started) / number)
+    return {
+        'median_us': round(statistics.median(timings) * 1e6, 3),
+        'min_us': round(min(timings) * 1e6, 3),
+        'number': number,
+        'repeat': repeat
+    }
+
+def fixture_sets():
+    """Синтетические фикстуры и, если записаны, настоящие ответы WB"""
+    fixtures = {
+        'synthetic': {
+            'card': make_card(),
+            'listing_page': make_listing_page(),
+            'feedback_page': make_feedback_page()
+        }
+    }
+    recorded = {name: load_recorded(name) for name in ('card', 'listing_page', 'feedback_page')}
+    recorded = {name: payload for name, payload in recorded.items() if payload}
+    if recorded:
+        fixtures['recorded'] = recorded
+    return fixtures
+
+def parsing_cases(workdir):
+    """Бенчмарки без БД: разбор карточек, выдачи и отзывов, запись в JSON"""
+    from models.entities import Product, Price, Feedback
+    from parser.batch import ListingBatch
+    from parser.helpers import save_to_json, NdjsonWriter
+    from parser.scraper import WildBerriesScraper
+
+    scraper = WildBerriesScraper()
+    cases = {}
+    for kind, fixtures in fixture_sets().items():
+        card = fixtures.get('card')
+        if card is not None:
+            cases[f"extract_stocks[{kind}_card]"] = lambda card=card: scraper._extract_stocks(card)
+            cases[f"extract_category[{kind}_card]"] = lambda card=card: scraper._extract_category(card)
+            cases[f"price_from_payload[{kind}_card]"] = lambda card=card: Price.from_payload(card)
+            cases[f"product_from_card[{kind}_card]"] = lambda card=card: Product.from_card_payload(card)
+
+        page = fixtures.get('listing_page')
+        if page is not None:
+            products = [Product.from_listing_payload(item) for item in page]
+            records = [product.to_dict() for product in products]
+            json_path = os.path.join(workdir, f"{kind}_listing.json")
+            ndjson_path = os.path.join(workdir, f"{kind}_listing")
+
+            def write_ndjson(records=records, ndjson_path=ndjson_path):
+                with NdjsonWriter(ndjson_path) as writer:
+                    writer.write_many(records)
+
+            def listing_frames(page=page):
+                batch = ListingBatch()
+                batch.add_page(page)
+                return batch.frames()
+
+            cases[f"listing_to_products[{kind}_page]"] = (
+                lambda page=page: [Product.from_listing_payload(item) for item in page])
+            cases[f"listing_batch_frames[{kind}_page]"] = listing_frames
+            cases[f"save_to_json[{kind}_page]"] = (
+                lambda records=records, json_path=json_path: save_to_json(records, json_path))
+            cases[f"ndjson_write[{kind}_page]"] = write_ndjson
+
+        feedbacks = fixtures.get('feedback_page')
+        if feedbacks is not None:
+            cases[f"feedbacks_from_page[{kind}_page]"] = (
+                lambda feedbacks=feedbacks: [Feedback.from_payload(1, item) for item in feedbacks])
+    return cases
+
+def db_cases():
+    """Бенчмарки записи в локальную PostgreSQL (настройки подключения из config.settings / .env)
+
+    Returns:
+        (словарь бенчмарков, функция очистки)
+    """
+    from models.entities import Product, Seller
+    from parser.batch import ListingBatch
+    from database.repository import WildberriesRepository
+
+    repo = WildberriesRepository()
+
+    card = make_card(sizes=10, warehouses=10)
+    product = Product.from_card_payload(card)
+    product.wb_id = f"{BENCH_PREFIX}{card['id']}"
+    product.brand = f"{BENCH_PREFIX}brand"
+    product.category = f"{BENCH_PREFIX}category"
+    product.seller = Seller(BENCH_SELLER_ID, f"{BENCH_PREFIX}seller")
+
+    page = make_listing_page()
+    for offset, item in enumerate(page):
+        item['supplierId'] = BENCH_SELLER_ID + 1 + offset % 10
+        item['brand'] = f"{BENCH_PREFIX}brand"
+        item['subj'] = {'name': f"{BENCH_PREFIX}category"}
+    batch = ListingBatch()
+    batch.add_page(page)
+    products, stocks = batch.frames()
+    products['wb_id'] = BENCH_PREFIX + products['wb_id']
+    stocks['wb_id'] = BENCH_PREFIX + stocks['wb_id']
+
+    def cleanup():
+        conn = repo.db.get_connection()
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT id FROM products WHERE wb_id LIKE %s", (BENCH_PREFIX + '%',))
+            product_ids = [row[0] for row in cursor.fetchall()]
+            if product_ids:
+                cursor.execute("DELETE FROM product_stocks WHERE product_id = ANY(%s)", (product_ids,))
+                cursor.execute("DELETE FROM product_prices WHERE product_id = ANY(%s)", (product_ids,))
+                cursor.execute("DELETE FROM products WHERE id = ANY(%s)", (product_ids,))
+            cursor.execute("DELETE FROM sellers WHERE id >= %s", (BENCH_SELLER_ID,))
+            cursor.execute("DELETE FROM brands WHERE name LIKE %s", (BENCH_PREFIX + '%',))
+            cursor.execute("DELETE FROM categories WHERE name LIKE %s", (BENCH_PREFIX + '%',))
+        conn.commit()
+        repo.close()
+
+    cases = {
+        'save_product[db]': lambda: repo.save_product(product),
+        'save_listing_batch[db_100]': lambda: repo.save_listing_batch(products, stocks)
+    }
+    return cases, cleanup
+
+def compare(results, baseline, threshold):
+    """Возвращает список (бенчмарк, было, стало, изменение) для замедлившихся больше чем на threshold"""
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        change = result['median_us'] / previous['median_us'] - 1
+        if change > threshold:
+            regressions.append((name, previous['median_us'], result['median_us'], change))
+    return regressions
+
+def load_baseline(filename):
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            return json.load(f).get('results', {})
+    except FileNotFoundError:
+        return {}
+
+def save_results(filename, results):
+    """Атомарно сохраняет результаты в машиночитаемом виде"""
+    tmp_filename = filename + '.tmp'
+    with open(tmp_filename, 'w', encoding='utf-8') as f:
+        json.dump({
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'results': results
+        }, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp_filename, filename)
+
+def main():
+    parser = argparse.ArgumentParser(description='Микробенчмарки парсера WildBerries')
+    parser.add_argument('--db', action='store_true', help='Добавить бенчмарки записи в локальную PostgreSQL')
+    parser.add_argument('--filter', type=str, help='Запускать только бенчмарки, в имени которых есть подстрока')
+    parser.add_argument('--baseline', type=str, default=BASELINE_FILE, help='Файл базовой линии (JSON)')
+    parser.add_argument('--save-baseline', action='store_true', help='Записать результаты как новую базовую линию')
+    parser.add_argument('--output', type=str, help='Дополнительно сохранить результаты запуска в JSON-файл')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Допустимое замедление медианы относительно базовой линии (по умолчанию 0.2 = 20%%)')
+    parser.add_argument('--repeat', type=int, default=5, help='Количество замеров на бенчмарк')
+    parser.add_argument('--record', type=int, metavar='PRODUCT_ID',
+                        help='Записать карточку и отзывы товара (и выдачу --record-shard) в benchmarks/fixtures')
+    parser.add_argument('--record-shard', type=str, help='Шард каталога для записи страницы выдачи')
+    parser.add_argument('--record-query', type=str, help='Параметры запроса категории, например cat=128483')
+    args = parser.parse_args()
+
+    if args.record:
+        recorded = record_fixtures(args.record, args.record_shard, args.record_query)
+        print(f"Записаны фикстуры: {', '.join(recorded) or 'нет'}")
+        return 0
+
+    with tempfile.TemporaryDirectory() as workdir:
+        cases = parsing_cases(workdir)
+        cleanup = None
+        if args.db:
+            db_bench, cleanup = db_cases()
+            cases.update(db_bench)
+
+        results = {}
+        try:
+            for name, func in cases.items():
+                if args.filter and args.filter not in name:
+                    continue
+                results[name] = measure(func, repeat=args.repeat)
+                print(f"{name:<45}{results[name]['median_us']:>14.1f} мкс (мин {results[name]['min_us']:.1f})")
+        finally:
+            if cleanup is not None:
+                cleanup()
+
+    if args.output:
+        save_results(args.output, results)
+
+    baseline = load_baseline(args.baseline)
+    if args.save_baseline:
+        # Бенчмарки, не запущенные в этот раз, остаются в базовой линии
+        save_results(args.baseline, {**baseline, **results})
+        print(f"Базовая линия сохранена: {args.baseline}")
+        return 0
+
+    if not baseline:
+        print("Базовой линии нет, сравнение пропущено (--save-baseline, чтобы создать)")
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    for name, before, after, change in regressions:
+        print(f"РЕГРЕССИЯ {name}: {before:.1f} -> {after:.1f} мкс (+{change:.0%})")
+    if regressions:
+        return 1
+    print(f"Регрессий больше {args.threshold:.0%} нет")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
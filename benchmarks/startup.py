@@ -0,0 +1,79 @@
+"""Время запуска main.py для разового обновления товара (--mode product --no-db)
+
+Запуск:
+    python -m benchmarks.startup                 # бюджет по умолчанию 0.15 с
+    python -m benchmarks.startup --budget 0.2 --runs 20
+
+Каждый замер - отдельный процесс интерпретатора, который выполняет тот же
+путь, что и `main.py --mode product --no-db` до первого сетевого запроса:
+импорт main и всего, что нужно режиму, и создание скрапера. Дополнительно
+проверяется, что в этом режиме не загружаются драйвер БД, pandas, pyarrow и
+bs4. Код возврата 1 - бюджет превышен или загружен лишний модуль.
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Модули, которые не нужны для --mode product --no-db
+FORBIDDEN_MODULES = ('psycopg2', 'pandas', 'pyarrow', 'bs4', 'database.connection')
+
+_STARTUP_SCRIPT = r"""
+import sys, time, json
+started = time.perf_counter()
+sys.argv = ['main.py', '--mode', 'product', '--id', '1', '--no-db']
+import main
+from parser.scraper import WildBerriesScraper
+WildBerriesScraper()
+elapsed = time.perf_counter() - started
+print(json.dumps({'imports': elapsed, 'modules': sorted(sys.modules)}))
+"""
+
+def run_once():
+    """Возвращает (полное время процесса, время импортов внутри процесса, загруженные модули)"""
+    import time
+
+    started = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', _STARTUP_SCRIPT], cwd=PACKAGE_ROOT, check=True,
+                            capture_output=True, text=True).stdout
+    total = time.perf_counter() - started
+    result = json.loads(output.strip().splitlines()[-1])
+    return total, result['imports'], result['modules']
+
+def main():
+    parser = argparse.ArgumentParser(description='Время запуска main.py --mode product --no-db')
+    parser.add_argument('--runs', type=int, default=10, help='Количество запусков (по умолчанию 10)')
+    parser.add_argument('--budget', type=float, default=0.15,
+                        help='Бюджет на медиану полного времени запуска процесса, секунды (по умолчанию 0.15)')
+    args = parser.parse_args()
+
+    totals, imports = [], []
+    modules = set()
+    for _ in range(args.runs):
+        total, imported, loaded = run_once()
+        totals.append(total)
+        imports.append(imported)
+        modules.update(loaded)
+
+    median_total = statistics.median(totals)
+    print(f"Запуск процесса: медиана {median_total * 1000:.0f} мс, мин {min(totals) * 1000:.0f} мс")
+    print(f"Импорт main и создание скрапера: медиана {statistics.median(imports) * 1000:.0f} мс")
+
+    failed = False
+    loaded_forbidden = [name for name in FORBIDDEN_MODULES if name in modules]
+    if loaded_forbidden:
+        print(f"Загружены лишние модули: {', '.join(loaded_forbidden)}")
+        failed = True
+    if median_total > args.budget:
+        print(f"Бюджет {args.budget * 1000:.0f} мс превышен")
+        failed = True
+    if not failed:
+        print(f"В пределах бюджета {args.budget * 1000:.0f} мс")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,63 @@
+import re
+import time
 import psycopg2
+import psycopg2.extensions
 from psycopg2.extras import DictCursor
 from config.settings import DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD
 from loguru import logger
+from parser.metrics import REGISTRY
+
+# Тип запроса для метрик: операция и таблица, например insert:product_prices
+_STATEMENT_RE = re.compile(r'^\s*(?:(insert)\s+into|(update)|(delete)\s+from|(select)\b.*?\bfrom)\s+(\w+)',
+                           re.IGNORECASE | re.DOTALL)
+
+def statement_type(query):
+    """Возвращает тип запроса вида <операция>:<таблица> (other, если не распознан)"""
+    if isinstance(query, bytes):
+        query = query[:500].decode('utf-8', 'ignore')
+    match = _STATEMENT_RE.match(str(query))
+    if match is None:
+        return 'other'
+    operation = next(group for group in match.groups()[:4] if group)
+    return f"{operation.lower()}:{match.group(5).lower()}"
+
+class _MetricsCursorMixin:
+    """Учитывает каждый выполненный запрос в метриках по его типу"""
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            statement = statement_type(query)
+            REGISTRY.inc('wb_db_statements_total', statement=statement)
+            REGISTRY.observe('wb_db_statement_duration_seconds', time.perf_counter() - started, statement=statement)
+
+class MetricsCursor(_MetricsCursorMixin, psycopg2.extensions.cursor):
+    pass
+
+class MetricsDictCursor(_MetricsCursorMixin, DictCursor):
+    pass
+
+class MetricsConnection(psycopg2.extensions.connection):
+    """Соединение, замеряющее длительность коммитов и считающее откаты"""
+
+    def commit(self):
+        started = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            REGISTRY.observe('wb_db_commit_duration_seconds', time.perf_counter() - started)
+
+    def rollback(self):
+        REGISTRY.inc('wb_db_rollbacks_total')
+        return super().rollback()
 
 class Database:
+    """Соединение с PostgreSQL, которое открывается при первом запросе"""
+    
     def __init__(self):
         self.conn = None
-        self.connect()
         
     def connect(self):
         try:
@@ -15,8 +66,10 @@ class Database:
                 port=DB_PORT,
                 database=DB_NAME,
                 user=DB_USER,
-                password=DB_PASSWORD
+                password=DB_PASSWORD,
+                connection_factory=MetricsConnection
             )
+            self.conn.cursor_factory = MetricsCursor
             logger.info("Подключение к PostgreSQL установлено")
         except Exception as e:
             logger.error(f"Ошибка подключения к PostgreSQL: {e}")
@@ -27,13 +80,20 @@ class Database:
             self.connect()
         return self.conn
     
-    def execute_query(self, query, params=None):
+    def execute_query(self, query, params=None, fetch=None):
+        """Выполняет запрос в отдельной транзакции
+        
+        Args:
+            fetch: Функция чтения результата из курсора; вызывается до закрытия
+                курсора, и execute_query возвращает ее результат
+        """
         conn = self.get_connection()
-        cursor = conn.cursor(cursor_factory=DictCursor)
+        cursor = conn.cursor(cursor_factory=MetricsDictCursor)
         try:
             cursor.execute(query, params or ())
+            result = fetch(cursor) if fetch is not None else cursor
             conn.commit()
-            return cursor
+            return result
         except Exception as e:
             conn.rollback()
             logger.error(f"Ошибка выполнения запроса: {e}")
@@ -42,12 +102,10 @@ class Database:
             cursor.close()
     
     def fetch_all(self, query, params=None):
-        cursor = self.execute_query(query, params)
-        return cursor.fetchall()
+        return self.execute_query(query, params, fetch=lambda cursor: cursor.fetchall())
     
     def fetch_one(self, query, params=None):
-        cursor = self.execute_query(query, params)
-        return cursor.fetchone()
+        return self.execute_query(query, params, fetch=lambda cursor: cursor.fetchone())
     
     def close(self):
         if self.conn is not None:
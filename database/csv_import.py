@@ -0,0 +1,136 @@
+import os
+import re
+import glob
+import hashlib
+
+from loguru import logger
+
+from models.entities import LegalEntity
+from parser.csv_sink import iter_csv_rows
+
+# Файлы, которые пишет inn.py
+LEGACY_CSV_PATTERN = "sellers_info/wildberries_sellers_*.csv"
+
+def file_content_hash(filename, chunk_size=1 << 20):
+    """SHA-256 содержимого файла, прочитанного блоками"""
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def expand_paths(paths):
+    """Раскрывает маски и каталоги в отсортированный список CSV-файлов без повторов"""
+    filenames = []
+    for path in paths:
+        if os.path.isdir(path):
+            filenames.extend(glob.glob(os.path.join(path, "wildberries_sellers_*.csv")))
+        else:
+            filenames.extend(glob.glob(path) or [path])
+    return sorted(set(filenames))
+
+class SellerCsvImporter:
+    """Загрузка CSV-выгрузок inn.py в реестр юридических лиц
+
+    Файл читается построчно (многострочные ячейки seller_info разбирает
+    модуль csv), из product_url берется артикул товара, текст подсказки
+    разбирается в LegalEntity. Строки без артикула или без ИНН/ОГРН
+    пропускаются, повторы пары товар - продавец отбрасываются еще до
+    записи в БД. Записи отправляются пакетами по batch_size строк, каждый
+    пакет - одна транзакция. Полностью загруженный файл запоминается по
+    хэшу содержимого, и повторный импорт его пропускает; файл, загрузка
+    которого прервалась, при следующем запуске загружается заново (запись
+    идет через upsert, поэтому повторы безопасны). Пакет, который не удалось
+    сохранить, откатывается, остальные пакеты и файлы загружаются дальше, а
+    файл отмечается как загруженный с ошибкой и при следующем импорте
+    загружается снова.
+    """
+
+    def __init__(self, repo, batch_size=1000, force=False):
+        self.repo = repo
+        self.batch_size = batch_size
+        self.force = force
+        self.stats = {'files': 0, 'skipped_files': 0, 'failed_files': 0, 'rows': 0, 'duplicates': 0, 'invalid': 0,
+                      'saved': 0, 'failed_rows': 0}
+        self._seen = set()
+
+    def import_files(self, paths):
+        """Загружает все файлы по путям, маскам и каталогам; возвращает статистику"""
+        for filename in expand_paths(paths):
+            try:
+                self.import_file(filename)
+            except Exception as e:
+                logger.error(f"Ошибка при загрузке файла {filename}: {e}")
+                self.stats['failed_files'] += 1
+        logger.info("Импорт завершен: " + ", ".join(f"{key}: {value}" for key, value in self.stats.items()))
+        return self.stats
+
+    def import_file(self, filename):
+        """Загружает один файл; возвращает количество сохраненных связок или None, если файл пропущен"""
+        content_hash = file_content_hash(filename)
+        if not self.force and self.repo.is_file_imported(content_hash):
+            logger.info(f"Файл {filename} уже загружен, пропускаем")
+            self.stats['skipped_files'] += 1
+            return None
+
+        logger.info(f"Загрузка {filename}")
+        saved = 0
+        failed = 0
+        rows_count = 0
+        batch = []
+        for row in iter_csv_rows(filename):
+            rows_count += 1
+            item = self._parse_row(row)
+            if item is None:
+                continue
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                batch_saved = self._flush(batch, filename)
+                saved += batch_saved or 0
+                failed += len(batch) if batch_saved is None else 0
+                batch = []
+        if batch:
+            batch_saved = self._flush(batch, filename)
+            saved += batch_saved or 0
+            failed += len(batch) if batch_saved is None else 0
+
+        self.stats['rows'] += rows_count
+        if failed:
+            self.repo.mark_file_imported(content_hash, filename, rows_count, status='failed')
+            self.stats['failed_files'] += 1
+            logger.error(f"Файл {filename}: {rows_count} строк, сохранено {saved} связок, "
+                         f"не сохранено {failed} строк; файл будет загружен снова при следующем импорте")
+            return saved
+
+        self.repo.mark_file_imported(content_hash, filename, rows_count)
+        self.stats['files'] += 1
+        logger.info(f"Файл {filename}: {rows_count} строк, сохранено {saved} связок товар - продавец")
+        return saved
+
+    def _parse_row(self, row):
+        """Превращает строку CSV в (wb_id, товар, магазин, источник, LegalEntity) или None"""
+        match = re.search(r'/catalog/(\d+)/', row.get('product_url') or '')
+        entity = LegalEntity.from_seller_info(row.get('seller_info'))
+        if match is None or entity.is_empty:
+            self.stats['invalid'] += 1
+            return None
+
+        wb_id = match.group(1)
+        key = (wb_id, entity.inn or entity.ogrn)
+        if key in self._seen:
+            self.stats['duplicates'] += 1
+            return None
+        self._seen.add(key)
+
+        # Колонка source появилась в CSV позже, в старых файлах ее нет
+        return wb_id, row.get('product_name'), row.get('seller_name'), row.get('source') or None, entity
+
+    def _flush(self, batch, filename):
+        """Сохраняет пакет; возвращает количество связок или None, если пакет откатился"""
+        saved = self.repo.save_legal_entity_products(batch)
+        if saved is None:
+            logger.error(f"Пакет из {len(batch)} строк файла {filename} не сохранен")
+            self.stats['failed_rows'] += len(batch)
+            return None
+        self.stats['saved'] += saved
+        return saved
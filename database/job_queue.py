@@ -0,0 +1,207 @@
+from loguru import logger
+from psycopg2.extras import execute_values
+
+from database.connection import Database, statement_type
+from parser.metrics import REGISTRY
+
+# Виды заданий (совпадают с видами сущностей демона)
+JOB_KINDS = ('product', 'category', 'seller', 'search')
+
+class JobQueue:
+    """Очередь заданий обхода в PostgreSQL (таблица crawl_jobs) для нескольких хостов
+
+    Исполнитель забирает задания запросом SELECT ... FOR UPDATE SKIP LOCKED:
+    строки, которые в этот момент забирает другой исполнитель, пропускаются,
+    поэтому исполнители не ждут друг друга и не получают одно задание дважды.
+    Взятое задание арендуется на lease_seconds; аренду продлевает
+    extend_leases(). Если исполнитель пропал, задание с истекшей арендой
+    снова забирается другим исполнителем как очередная попытка. Задание,
+    исчерпавшее max_attempts попыток, переходит в статус dead и ждет
+    разбора (requeue_dead()).
+
+    Args:
+        db: Соединение (database.connection.Database); по умолчанию свое
+        worker_id: Имя исполнителя, под которым берется аренда
+    """
+
+    def __init__(self, db=None, worker_id=None):
+        self.db = db or Database()
+        self.worker_id = worker_id
+
+    def enqueue(self, jobs, max_attempts=5):
+        """Ставит задания в очередь одной транзакцией
+
+        Args:
+            jobs: Словари с ключами kind, target и необязательными pages, priority
+            max_attempts: Число попыток до перевода в dead
+
+        Returns:
+            Количество новых заданий: задание для сущности, у которой уже есть
+            ожидающее или выполняемое, не создается. None при ошибке.
+        """
+        rows = [(job['kind'], str(job['target']), job.get('pages', 1), job.get('priority', 0), max_attempts)
+                for job in jobs]
+        for kind, *_ in rows:
+            if kind not in JOB_KINDS:
+                raise ValueError(f"Неизвестный вид задания: {kind}")
+        try:
+            conn = self.db.get_connection()
+            cursor = conn.cursor()
+            query = """
+            INSERT INTO crawl_jobs (kind, target, pages, priority, max_attempts)
+            VALUES %s
+            ON CONFLICT (kind, target) WHERE status IN ('pending', 'running') DO NOTHING
+            RETURNING id
+            """
+            REGISTRY.observe('wb_db_batch_rows', len(rows), statement=statement_type(query))
+            created = execute_values(cursor, query, rows, fetch=True)
+            conn.commit()
+            cursor.close()
+            return len(created)
+        except Exception as e:
+            logger.error(f"Ошибка при постановке {len(rows)} заданий в очередь: {e}")
+            if 'conn' in locals() and 'cursor' in locals():
+                conn.rollback()
+                cursor.close()
+            return None
+
+    def claim(self, limit=1, lease_seconds=600):
+        """Забирает до limit готовых заданий под аренду исполнителя
+
+        В той же транзакции задания с истекшей арендой и исчерпанными
+        попытками переводятся в dead.
+
+        Returns:
+            Список словарей с ключами id, kind, target, pages, attempts, max_attempts
+        """
+        try:
+            conn = self.db.get_connection()
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                UPDATE crawl_jobs
+                SET status = 'dead', leased_by = NULL, lease_expires_at = NULL, updated_at = NOW(),
+                    finished_at = NOW(), last_error = COALESCE(last_error, 'аренда истекла')
+                WHERE status = 'running' AND lease_expires_at < NOW() AND attempts >= max_attempts
+                """
+            )
+            cursor.execute(
+                """
+                WITH ready AS (
+                    SELECT id FROM crawl_jobs
+                    WHERE (status = 'pending' AND run_after <= NOW())
+                       OR (status = 'running' AND lease_expires_at < NOW())
+                    ORDER BY priority DESC, run_after
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                UPDATE crawl_jobs j
+                SET status = 'running', attempts = j.attempts + 1, leased_by = %s,
+                    lease_expires_at = NOW() + %s * INTERVAL '1 second', updated_at = NOW()
+                FROM ready
+                WHERE j.id = ready.id
+                RETURNING j.id, j.kind, j.target, j.pages, j.attempts, j.max_attempts
+                """,
+                (limit, self.worker_id, lease_seconds)
+            )
+            columns = [column.name for column in cursor.description]
+            jobs = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            conn.commit()
+            cursor.close()
+            return jobs
+        except Exception as e:
+            logger.error(f"Ошибка при получении заданий из очереди: {e}")
+            if 'conn' in locals() and 'cursor' in locals():
+                conn.rollback()
+                cursor.close()
+            return []
+
+    def extend_leases(self, job_ids, lease_seconds=600):
+        """Продлевает аренду заданий исполнителя; возвращает ID заданий, аренда которых еще за ним"""
+        if not job_ids:
+            return []
+        query = """
+        UPDATE crawl_jobs
+        SET lease_expires_at = NOW() + %s * INTERVAL '1 second', updated_at = NOW()
+        WHERE id = ANY(%s) AND status = 'running' AND leased_by = %s
+        RETURNING id
+        """
+        rows = self.db.execute_query(query, (lease_seconds, list(job_ids), self.worker_id),
+                                     fetch=lambda cursor: cursor.fetchall())
+        return [row[0] for row in rows]
+
+    def complete(self, job_id):
+        """Отмечает задание выполненным; False, если аренду уже забрал другой исполнитель"""
+        query = """
+        UPDATE crawl_jobs
+        SET status = 'done', leased_by = NULL, lease_expires_at = NULL, last_error = NULL,
+            updated_at = NOW(), finished_at = NOW()
+        WHERE id = %s AND status = 'running' AND leased_by = %s
+        RETURNING id
+        """
+        row = self.db.execute_query(query, (job_id, self.worker_id), fetch=lambda cursor: cursor.fetchone())
+        return row is not None
+
+    def fail(self, job_id, error, retry_delay=60):
+        """Возвращает задание в очередь через retry_delay секунд или, если попытки исчерпаны, переводит в dead
+
+        Returns:
+            Новый статус задания (pending или dead) или None, если аренду уже
+            забрал другой исполнитель
+        """
+        query = """
+        UPDATE crawl_jobs
+        SET status = CASE WHEN attempts >= max_attempts THEN 'dead' ELSE 'pending' END,
+            run_after = NOW() + %s * INTERVAL '1 second',
+            finished_at = CASE WHEN attempts >= max_attempts THEN NOW() END,
+            leased_by = NULL, lease_expires_at = NULL, last_error = %s, updated_at = NOW()
+        WHERE id = %s AND status = 'running' AND leased_by = %s
+        RETURNING status
+        """
+        row = self.db.execute_query(query, (retry_delay, str(error)[:1000], job_id, self.worker_id),
+                                    fetch=lambda cursor: cursor.fetchone())
+        return row[0] if row else None
+
+    def requeue_dead(self, kind=None):
+        """Возвращает задания из dead в очередь со сброшенным счетчиком попыток; возвращает их количество"""
+        # Для сущности возвращается только последнее задание и только если у нее нет активного
+        query = """
+        UPDATE crawl_jobs
+        SET status = 'pending', attempts = 0, run_after = NOW(), finished_at = NULL, updated_at = NOW()
+        WHERE id IN (
+            SELECT DISTINCT ON (kind, target) id
+            FROM crawl_jobs dead
+            WHERE status = 'dead' AND (%s IS NULL OR kind = %s)
+              AND NOT EXISTS (
+                  SELECT 1 FROM crawl_jobs active
+                  WHERE active.kind = dead.kind AND active.target = dead.target
+                    AND active.status IN ('pending', 'running')
+              )
+            ORDER BY kind, target, id DESC
+        )
+        """
+        return self.db.execute_query(query, (kind, kind), fetch=lambda cursor: cursor.rowcount)
+
+    def stats(self):
+        """Количество заданий по видам и статусам"""
+        query = """
+        SELECT kind, status, COUNT(*) AS jobs, MIN(run_after) FILTER (WHERE status = 'pending') AS next_run
+        FROM crawl_jobs
+        GROUP BY kind, status
+        ORDER BY kind, status
+        """
+        return [dict(row) for row in self.db.fetch_all(query)]
+
+    def dead_jobs(self, limit=50):
+        """Последние задания в статусе dead с текстом ошибки"""
+        query = """
+        SELECT id, kind, target, attempts, last_error, finished_at
+        FROM crawl_jobs
+        WHERE status = 'dead'
+        ORDER BY finished_at DESC NULLS LAST
+        LIMIT %s
+        """
+        return [dict(row) for row in self.db.fetch_all(query, (limit,))]
+
+    def close(self):
+        self.db.close()
@@ -1,22 +1,24 @@
 from loguru import logger
 from datetime import datetime
-from database.connection import Database
+from psycopg2.extras import execute_values
+from database.connection import Database, statement_type
+from parser.metrics import REGISTRY
 
 class WildberriesRepository:
     def __init__(self):
         self.db = Database()
     
-    def save_product(self, product_data):
-        """Сохраняет информацию о товаре в базу данных"""
+    def save_product(self, product):
+        """Сохраняет информацию о товаре (models.entities.Product) в базу данных"""
         try:
             # Проверяем наличие бренда
-            brand_id = self._get_or_create_brand(product_data['brand'])
+            brand_id = self._get_or_create_brand(product.brand)
             
             # Проверяем наличие категории
-            category_id = self._get_or_create_category(product_data['category'])
+            category_id = self._get_or_create_category(product.category)
             
             # Проверяем наличие продавца
-            seller_id = self._get_or_create_seller(product_data['seller'])
+            seller_id = self._get_or_create_seller(product.seller)
             
             # Проверяем наличие товара в базе
             conn = self.db.get_connection()
@@ -24,7 +26,7 @@ class WildberriesRepository:
             
             cursor.execute(
                 "SELECT id FROM products WHERE wb_id = %s",
-                (product_data['wb_id'],)
+                (product.wb_id,)
             )
             product_row = cursor.fetchone()
             
@@ -39,8 +41,8 @@ class WildberriesRepository:
                     WHERE id = %s
                     """,
                     (
-                        product_data['name'], brand_id, category_id, seller_id,
-                        product_data.get('rating'), product_data.get('feedbacks_count'),
+                        product.name, brand_id, category_id, seller_id,
+                        product.rating, product.feedbacks_count,
                         datetime.now(), product_id
                     )
                 )
@@ -54,31 +56,32 @@ class WildberriesRepository:
                     RETURNING id
                     """,
                     (
-                        product_data['wb_id'], product_data['name'], brand_id, category_id, seller_id,
-                        product_data.get('rating'), product_data.get('feedbacks_count'),
+                        product.wb_id, product.name, brand_id, category_id, seller_id,
+                        product.rating, product.feedbacks_count,
                         datetime.now(), datetime.now()
                     )
                 )
                 product_id = cursor.fetchone()[0]
             
             # Добавляем запись о цене
-            cursor.execute(
-                """
-                INSERT INTO product_prices 
-                (product_id, current_price, original_price, discount_percentage, timestamp)
-                VALUES (%s, %s, %s, %s, %s)
-                """,
-                (
-                    product_id,
-                    product_data['price'].get('current'),
-                    product_data['price'].get('original'),
-                    product_data['price'].get('discount_percentage'),
-                    datetime.now()
+            if product.price is not None:
+                cursor.execute(
+                    """
+                    INSERT INTO product_prices 
+                    (product_id, current_price, original_price, discount_percentage, timestamp)
+                    VALUES (%s, %s, %s, %s, %s)
+                    """,
+                    (
+                        product_id,
+                        product.price.current,
+                        product.price.original,
+                        product.price.discount_percentage,
+                        product.price.timestamp
+                    )
                 )
-            )
             
             # Добавляем записи о наличии на складах
-            for warehouse_id, quantity in product_data.get('stocks', {}).items():
+            for warehouse_id, quantity in product.stocks.items():
                 cursor.execute(
                     """
                     INSERT INTO product_stocks 
@@ -91,16 +94,154 @@ class WildberriesRepository:
             conn.commit()
             cursor.close()
             
-            logger.info(f"Товар с ID {product_data['wb_id']} успешно сохранен")
+            logger.info(f"Товар с ID {product.wb_id} успешно сохранен")
             return product_id
             
         except Exception as e:
-            logger.error(f"Ошибка при сохранении товара {product_data.get('wb_id')}: {e}")
+            logger.error(f"Ошибка при сохранении товара {product.wb_id}: {e}")
             if 'conn' in locals() and 'cursor' in locals():
                 conn.rollback()
                 cursor.close()
             return None
     
+    def save_listing_batch(self, products, stocks):
+        """Сохраняет пакет товаров из выдачи одной транзакцией
+        
+        Args:
+            products: DataFrame товаров (колонки parser.batch.PRODUCT_COLUMNS)
+            stocks: DataFrame остатков по складам (wb_id, warehouse_id, quantity)
+        
+        Returns:
+            Количество сохраненных товаров
+        """
+        if products.empty:
+            return 0
+        
+        now = datetime.now()
+        
+        try:
+            conn = self.db.get_connection()
+            cursor = conn.cursor()
+            
+            # Бренды уникальны по имени, поэтому достаточно вставки без конфликтов
+            brands = products['brand'].unique().tolist()
+            self._execute_values(
+                cursor,
+                "INSERT INTO brands (name, created_at, updated_at) VALUES %s ON CONFLICT (name) DO NOTHING",
+                [(brand, now, now) for brand in brands]
+            )
+            cursor.execute("SELECT name, id FROM brands WHERE name = ANY(%s)", (brands,))
+            brand_ids = dict(cursor.fetchall())
+            
+            # Имя категории не уникально: берем существующие и создаем только недостающие
+            categories = products['category'].dropna().unique().tolist()
+            category_ids = {}
+            if categories:
+                cursor.execute(
+                    "SELECT name, MIN(id) FROM categories WHERE name = ANY(%s) GROUP BY name",
+                    (categories,)
+                )
+                category_ids = dict(cursor.fetchall())
+                missing = [name for name in categories if name not in category_ids]
+                if missing:
+                    category_ids.update(self._execute_values(
+                        cursor,
+                        "INSERT INTO categories (name, created_at, updated_at) VALUES %s RETURNING name, id",
+                        [(name, now, now) for name in missing],
+                        fetch=True
+                    ))
+            
+            # Продавцы
+            sellers = products.drop_duplicates('seller_id')
+            self._execute_values(
+                cursor,
+                """
+                INSERT INTO sellers (id, name, created_at, updated_at) VALUES %s
+                ON CONFLICT (id) DO UPDATE SET name = EXCLUDED.name, updated_at = EXCLUDED.updated_at
+                """,
+                [(seller_id, name, now, now) for seller_id, name in self._frame_rows(sellers, ['seller_id', 'seller_name'])]
+            )
+            
+            # Товары: категорию из выдачи не затираем, если она неизвестна
+            product_rows = [
+                (wb_id, name, brand_ids[brand], category_ids.get(category), seller_id,
+                 rating, feedbacks_count, now, now)
+                for wb_id, name, brand, category, seller_id, rating, feedbacks_count
+                in self._frame_rows(products, ['wb_id', 'name', 'brand', 'category', 'seller_id',
+                                               'rating', 'feedbacks_count'])
+            ]
+            product_ids = dict(self._execute_values(
+                cursor,
+                """
+                INSERT INTO products 
+                (wb_id, name, brand_id, category_id, seller_id, rating, feedbacks_count, created_at, updated_at)
+                VALUES %s
+                ON CONFLICT (wb_id) DO UPDATE SET
+                    name = EXCLUDED.name, brand_id = EXCLUDED.brand_id,
+                    category_id = COALESCE(EXCLUDED.category_id, products.category_id),
+                    seller_id = EXCLUDED.seller_id, rating = EXCLUDED.rating,
+                    feedbacks_count = EXCLUDED.feedbacks_count, updated_at = EXCLUDED.updated_at
+                RETURNING wb_id, id
+                """,
+                product_rows,
+                fetch=True
+            ))
+            
+            # Цены и остатки
+            self._execute_values(
+                cursor,
+                """
+                INSERT INTO product_prices 
+                (product_id, current_price, original_price, discount_percentage, timestamp)
+                VALUES %s
+                """,
+                [
+                    (product_ids[wb_id], current, original, discount, now)
+                    for wb_id, current, original, discount
+                    in self._frame_rows(products, ['wb_id', 'current_price', 'original_price',
+                                                   'discount_percentage'])
+                ]
+            )
+            if not stocks.empty:
+                self._execute_values(
+                    cursor,
+                    """
+                    INSERT INTO product_stocks 
+                    (product_id, warehouse_id, quantity, timestamp)
+                    VALUES %s
+                    """,
+                    [
+                        (product_ids[wb_id], warehouse_id, quantity, now)
+                        for wb_id, warehouse_id, quantity
+                        in self._frame_rows(stocks, ['wb_id', 'warehouse_id', 'quantity'])
+                    ]
+                )
+            
+            conn.commit()
+            cursor.close()
+            
+            logger.info(f"Пакет из {len(product_ids)} товаров успешно сохранен")
+            return len(product_ids)
+            
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении пакета из {len(products)} товаров: {e}")
+            if 'conn' in locals() and 'cursor' in locals():
+                conn.rollback()
+                cursor.close()
+            return 0
+    
+    @staticmethod
+    def _execute_values(cursor, query, rows, **kwargs):
+        """execute_values с учетом размера пакета в метриках"""
+        REGISTRY.observe('wb_db_batch_rows', len(rows), statement=statement_type(query))
+        return execute_values(cursor, query, rows, **kwargs)
+    
+    @staticmethod
+    def _frame_rows(frame, columns):
+        """Возвращает строки DataFrame как кортежи Python-значений (NaN -> None)"""
+        subset = frame[columns]
+        return list(subset.astype(object).where(subset.notna(), None).itertuples(index=False, name=None))
+    
     def _get_or_create_brand(self, brand_name):
         """Получает или создает бренд в базе данных"""
         query = "SELECT id FROM brands WHERE name = %s"
@@ -131,16 +272,16 @@ class WildberriesRepository:
         
         return category_row['id']
     
-    def _get_or_create_seller(self, seller_data):
+    def _get_or_create_seller(self, seller):
         """Получает или создает продавца в базе данных"""
         query = "SELECT id FROM sellers WHERE id = %s"
-        seller_row = self.db.fetch_one(query, (seller_data['id'],))
+        seller_row = self.db.fetch_one(query, (seller.id,))
         
         if seller_row:
             # Обновляем имя продавца, если оно изменилось
             query = "UPDATE sellers SET name = %s, updated_at = %s WHERE id = %s"
-            self.db.execute_query(query, (seller_data['name'], datetime.now(), seller_data['id']))
-            return seller_data['id']
+            self.db.execute_query(query, (seller.name, datetime.now(), seller.id))
+            return seller.id
         
         # Создаем нового продавца
         query = """
@@ -148,12 +289,368 @@ class WildberriesRepository:
         VALUES (%s, %s, %s, %s)
         """
         now = datetime.now()
-        self.db.execute_query(query, (seller_data['id'], seller_data['name'], now, now))
+        self.db.execute_query(query, (seller.id, seller.name, now, now))
         
-        return seller_data['id']
-    
-    def save_feedback(self, product_id, feedback_data):
-        """Сохраняет отзыв на товар"""
+        return seller.id
+
+    _LEGAL_ENTITY_COLUMNS = ('inn', 'ogrn', 'kpp', 'legal_name', 'entity_type', 'address')
+
+    def _upsert_legal_entities(self, cursor, entities, now):
+        """Сохраняет юридические лица в реестр, сопоставляя их с записями по ИНН или ОГРН
+
+        У legal_entities два независимых уникальных индекса (inn и ogrn), а
+        одно лицо может прийти сначала только с ОГРН, а затем с ИНН и ОГРН,
+        поэтому ON CONFLICT по одной колонке здесь не подходит. Существующие
+        записи с любым из ключей блокируются одним запросом. Лица и записи,
+        связанные общим ключом, сводятся в одну запись: найденная обновляется
+        (если их несколько - остальные сливаются в запись с меньшим id), а
+        совсем новые лица вставляются одним запросом.
+
+        Args:
+            cursor: Курсор открытой транзакции
+            entities: Список models.entities.LegalEntity с ИНН или ОГРН
+            now: Время обновления
+
+        Returns:
+            Словарь {('inn' | 'ogrn', значение): id записи legal_entities}
+        """
+        def keys(values):
+            return [(column, value) for column, value in zip(('inn', 'ogrn'), values) if value]
+
+        # Группы связанных общим ИНН/ОГРН лиц и записей (система непересекающихся множеств)
+        parent = {}
+
+        def find(node):
+            parent.setdefault(node, node)
+            while parent[node] != node:
+                parent[node] = parent[parent[node]]
+                node = parent[node]
+            return node
+
+        def union(nodes):
+            roots = [find(node) for node in nodes]
+            for root in roots[1:]:
+                parent[root] = roots[0]
+
+        batch = [tuple(getattr(entity, column) for column in self._LEGAL_ENTITY_COLUMNS) for entity in entities]
+        for values in batch:
+            union(keys(values))
+
+        cursor.execute(
+            """
+            SELECT id, inn, ogrn, kpp, legal_name, entity_type, address
+            FROM legal_entities
+            WHERE inn = ANY(%s) OR ogrn = ANY(%s)
+            ORDER BY id
+            FOR UPDATE
+            """,
+            ([value for column, value in parent if column == 'inn'],
+             [value for column, value in parent if column == 'ogrn'])
+        )
+        existing = cursor.fetchall()
+        for row in existing:
+            union([('row', row[0])] + keys(row[1:]))
+
+        groups = {}
+        for values in batch:
+            groups.setdefault(find(keys(values)[0]), ([], []))[0].append(values)
+        for row in existing:
+            groups.setdefault(find(('row', row[0])), ([], []))[1].append(row)
+
+        entity_ids = {}
+        new_groups = []
+        for group_values, rows in groups.values():
+            # Новые значения важнее сохраненных, пустые поля дополняются из записей
+            candidates = group_values + [row[1:] for row in rows]
+            merged = tuple(
+                next((values[index] for values in candidates if values[index]), None)
+                for index in range(len(self._LEGAL_ENTITY_COLUMNS))
+            )
+            group_keys = {key for values in group_values for key in keys(values)}
+            if not rows:
+                new_groups.append((merged, group_keys))
+                continue
+
+            legal_entity_id = rows[0][0]
+            if len(rows) > 1:
+                self._merge_legal_entities(cursor, legal_entity_id, [row[0] for row in rows[1:]])
+            cursor.execute(
+                """
+                UPDATE legal_entities SET
+                    inn = %s, ogrn = %s, kpp = %s, legal_name = %s, entity_type = %s, address = %s,
+                    updated_at = %s
+                WHERE id = %s
+                """,
+                merged + (now, legal_entity_id)
+            )
+            entity_ids.update(dict.fromkeys(group_keys, legal_entity_id))
+
+        if new_groups:
+            returned = self._execute_values(
+                cursor,
+                """
+                INSERT INTO legal_entities
+                (inn, ogrn, kpp, legal_name, entity_type, address, created_at, updated_at)
+                VALUES %s
+                RETURNING inn, ogrn, id
+                """,
+                [merged + (now, now) for merged, _ in new_groups],
+                fetch=True
+            )
+            inserted = {(inn, ogrn): legal_entity_id for inn, ogrn, legal_entity_id in returned}
+            for merged, group_keys in new_groups:
+                entity_ids.update(dict.fromkeys(group_keys, inserted[merged[:2]]))
+
+        return entity_ids
+
+    @staticmethod
+    def _merge_legal_entities(cursor, legal_entity_id, duplicate_ids):
+        """Переносит продавцов и товары записей duplicate_ids на legal_entity_id и удаляет дубли"""
+        cursor.execute(
+            "UPDATE sellers SET legal_entity_id = %s WHERE legal_entity_id = ANY(%s)",
+            (legal_entity_id, duplicate_ids)
+        )
+        # Товар, уже связанный с оставшейся записью (или с другим дублем), второй раз не переносится
+        cursor.execute(
+            """
+            DELETE FROM legal_entity_products lp
+            WHERE lp.legal_entity_id = ANY(%(duplicates)s)
+              AND EXISTS (
+                  SELECT 1 FROM legal_entity_products other
+                  WHERE other.wb_id = lp.wb_id
+                    AND (other.legal_entity_id = %(kept)s
+                         OR (other.legal_entity_id = ANY(%(duplicates)s) AND other.id < lp.id))
+              )
+            """,
+            {'kept': legal_entity_id, 'duplicates': duplicate_ids}
+        )
+        cursor.execute(
+            "UPDATE legal_entity_products SET legal_entity_id = %s WHERE legal_entity_id = ANY(%s)",
+            (legal_entity_id, duplicate_ids)
+        )
+        cursor.execute("DELETE FROM legal_entities WHERE id = ANY(%s)", (duplicate_ids,))
+        logger.info(f"Записи реестра {duplicate_ids} с общим ИНН/ОГРН объединены в запись {legal_entity_id}")
+
+    def save_seller_legal_info(self, seller_id, seller_name, entity):
+        """Сохраняет юридические данные продавца в реестр и связывает их с продавцом
+
+        Args:
+            seller_id: ID продавца WB; если неизвестен, обновляется только реестр
+            seller_name: Название магазина
+            entity: Разобранные данные (models.entities.LegalEntity)
+
+        Returns:
+            ID записи legal_entities или None
+        """
+        if entity.is_empty:
+            return None
+
+        now = datetime.now()
+
+        try:
+            conn = self.db.get_connection()
+            cursor = conn.cursor()
+
+            entity_ids = self._upsert_legal_entities(cursor, [entity], now)
+            legal_entity_id = entity_ids[('inn', entity.inn) if entity.inn else ('ogrn', entity.ogrn)]
+
+            if seller_id:
+                cursor.execute(
+                    """
+                    INSERT INTO sellers (id, name, legal_entity_id, legal_info_updated_at, created_at, updated_at)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                    ON CONFLICT (id) DO UPDATE SET
+                        name = COALESCE(NULLIF(EXCLUDED.name, ''), sellers.name),
+                        legal_entity_id = EXCLUDED.legal_entity_id,
+                        legal_info_updated_at = EXCLUDED.legal_info_updated_at,
+                        updated_at = EXCLUDED.updated_at
+                    """,
+                    (int(seller_id), seller_name or '', legal_entity_id, now, now, now)
+                )
+
+            conn.commit()
+            cursor.close()
+            return legal_entity_id
+
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении юридических данных продавца {seller_id or seller_name}: {e}")
+            if 'conn' in locals() and 'cursor' in locals():
+                conn.rollback()
+                cursor.close()
+            return None
+
+    def get_sellers_without_legal_info(self, stale_days=30, limit=100):
+        """Возвращает продавцов без юридических данных или с данными старше stale_days
+
+        Продавцы упорядочены по числу их товаров в базе (затем по products_count
+        из WB), чтобы сначала обрабатывались те, у кого больше товаров.
+
+        Returns:
+            Список словарей с ключами id, name, products
+        """
+        query = """
+        SELECT s.id, s.name, COUNT(p.id) AS products
+        FROM sellers s
+        LEFT JOIN products p ON p.seller_id = s.id
+        WHERE s.legal_info_updated_at IS NULL OR s.legal_info_updated_at < NOW() - %s * INTERVAL '1 day'
+        GROUP BY s.id
+        ORDER BY COUNT(p.id) DESC, COALESCE(s.products_count, 0) DESC, s.id
+        LIMIT %s
+        """
+        return [dict(row) for row in self.db.fetch_all(query, (stale_days, limit))]
+
+    def mark_seller_legal_info_checked(self, seller_id):
+        """Отмечает проверку продавца, юридические данные которого получить не удалось
+
+        Такой продавец снова попадет в выборку get_sellers_without_legal_info
+        только когда отметка устареет, а не в каждом запуске.
+        """
+        query = "UPDATE sellers SET legal_info_updated_at = %s WHERE id = %s"
+        self.db.execute_query(query, (datetime.now(), seller_id))
+
+    def get_sellers_by_inn(self, inn):
+        """Возвращает всех продавцов с данным ИНН вместе с их юридическими данными
+
+        Поиск идет по уникальному индексу legal_entities(inn) и индексу
+        sellers(legal_entity_id), без просмотра текста подсказок.
+        """
+        query = """
+        SELECT s.id, s.name, s.rating, s.products_count, s.legal_info_updated_at,
+               le.inn, le.ogrn, le.kpp, le.legal_name, le.entity_type, le.address
+        FROM legal_entities le
+        JOIN sellers s ON s.legal_entity_id = le.id
+        WHERE le.inn = %s
+        ORDER BY s.id
+        """
+        return [dict(row) for row in self.db.fetch_all(query, (inn,))]
+
+    def save_legal_entity_products(self, rows):
+        """Сохраняет пакет связок товар - юридическое лицо одной транзакцией
+
+        Args:
+            rows: Список кортежей (wb_id, название товара, название магазина, источник,
+                models.entities.LegalEntity); строки без ИНН и ОГРН пропускаются
+
+        Returns:
+            Количество сохраненных связок или None при ошибке (пакет откатывается целиком)
+        """
+        rows = [row for row in rows if not row[4].is_empty]
+        if not rows:
+            return 0
+
+        now = datetime.now()
+
+        try:
+            conn = self.db.get_connection()
+            cursor = conn.cursor()
+
+            # Юридические лица сопоставляются с реестром одним запросом по ИНН и ОГРН сразу
+            entity_ids = self._upsert_legal_entities(cursor, [row[4] for row in rows], now)
+
+            # Связки товар - продавец, дубликаты внутри пакета схлопываются в последнюю
+            links = {}
+            for wb_id, product_name, seller_name, source, entity in rows:
+                entity_id = entity_ids[('inn', entity.inn) if entity.inn else ('ogrn', entity.ogrn)]
+                links[(wb_id, entity_id)] = (wb_id, entity_id, product_name, seller_name, source, now, now)
+            self._execute_values(
+                cursor,
+                """
+                INSERT INTO legal_entity_products
+                (wb_id, legal_entity_id, product_name, seller_name, source, created_at, updated_at)
+                VALUES %s
+                ON CONFLICT (wb_id, legal_entity_id) DO UPDATE SET
+                    product_name = EXCLUDED.product_name, seller_name = EXCLUDED.seller_name,
+                    source = COALESCE(EXCLUDED.source, legal_entity_products.source),
+                    updated_at = EXCLUDED.updated_at
+                """,
+                list(links.values())
+            )
+
+            conn.commit()
+            cursor.close()
+            return len(links)
+
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении пакета из {len(rows)} товаров продавцов: {e}")
+            if 'conn' in locals() and 'cursor' in locals():
+                conn.rollback()
+                cursor.close()
+            return None
+
+    def is_file_imported(self, content_hash):
+        """Проверяет, загружался ли уже файл с таким хэшем содержимого"""
+        query = "SELECT 1 FROM imported_files WHERE content_hash = %s AND status = 'imported'"
+        return self.db.fetch_one(query, (content_hash,)) is not None
+
+    def mark_file_imported(self, content_hash, filename, rows_count, status='imported'):
+        """Запоминает загруженный файл: imported - повторный импорт его пропустит, failed - загрузит снова"""
+        query = """
+        INSERT INTO imported_files (content_hash, filename, rows_count, status, imported_at)
+        VALUES (%s, %s, %s, %s, %s)
+        ON CONFLICT (content_hash) DO UPDATE SET
+            filename = EXCLUDED.filename, rows_count = EXCLUDED.rows_count, status = EXCLUDED.status,
+            imported_at = EXCLUDED.imported_at
+        """
+        self.db.execute_query(query, (content_hash, filename, rows_count, status, datetime.now()))
+
+    def get_products_by_inn(self, inn):
+        """Возвращает товары, найденные в CSV-выгрузках у продавца с данным ИНН"""
+        query = """
+        SELECT lp.wb_id, lp.product_name, lp.seller_name, lp.source, lp.updated_at
+        FROM legal_entities le
+        JOIN legal_entity_products lp ON lp.legal_entity_id = le.id
+        WHERE le.inn = %s
+        ORDER BY lp.wb_id
+        """
+        return [dict(row) for row in self.db.fetch_all(query, (inn,))]
+
+    def get_product_volatility(self, wb_id, window_days=30):
+        """Возвращает сводку истории цен и остатков товара за последние window_days дней
+
+        Returns:
+            Словарь с ключами observations (записей цены), span_seconds (от первой
+            записи до последней), price_changes (смен цены между соседними
+            записями), discount_changed_ago (секунд с последней смены скидки или
+            None) и stock (суммарный остаток в последнем снимке или None)
+        """
+        query = """
+        WITH history AS (
+            SELECT pp.timestamp, pp.current_price, pp.discount_percentage,
+                   LAG(pp.current_price) OVER w AS previous_price,
+                   LAG(pp.discount_percentage) OVER w AS previous_discount
+            FROM products p
+            JOIN product_prices pp ON pp.product_id = p.id
+            WHERE p.wb_id = %(wb_id)s AND pp.timestamp >= NOW() - %(days)s * INTERVAL '1 day'
+            WINDOW w AS (ORDER BY pp.timestamp)
+        ),
+        latest_stock AS (
+            -- Записи одного снимка остатков получают время с разницей в доли секунды
+            SELECT ps.quantity, ps.timestamp, MAX(ps.timestamp) OVER () AS snapshot
+            FROM products p
+            JOIN product_stocks ps ON ps.product_id = p.id
+            WHERE p.wb_id = %(wb_id)s AND ps.timestamp >= NOW() - %(days)s * INTERVAL '1 day'
+        )
+        SELECT COUNT(*) AS observations,
+               COALESCE(EXTRACT(EPOCH FROM MAX(timestamp) - MIN(timestamp)), 0) AS span_seconds,
+               COUNT(*) FILTER (WHERE current_price <> previous_price) AS price_changes,
+               EXTRACT(EPOCH FROM NOW() - MAX(timestamp) FILTER (
+                   WHERE discount_percentage IS DISTINCT FROM previous_discount AND previous_price IS NOT NULL
+               )) AS discount_changed_ago,
+               (SELECT SUM(quantity) FROM latest_stock
+                WHERE timestamp >= snapshot - INTERVAL '1 minute') AS stock
+        FROM history
+        """
+        row = self.db.fetch_one(query, {'wb_id': str(wb_id), 'days': window_days})
+        return dict(row) if row else None
+
+    def get_legal_entity(self, inn=None, ogrn=None):
+        """Возвращает запись реестра по ИНН или ОГРН/ОГРНИП или None"""
+        column, value = ('inn', inn) if inn else ('ogrn', ogrn)
+        row = self.db.fetch_one(f"SELECT * FROM legal_entities WHERE {column} = %s", (value,))
+        return dict(row) if row else None
+
+    def save_feedback(self, feedback):
+        """Сохраняет отзыв на товар (models.entities.Feedback)"""
         try:
             # Проверяем наличие отзыва в базе
             query = """
@@ -161,7 +658,7 @@ class WildberriesRepository:
             WHERE product_id = %s AND user_id = %s
             """
             
-            feedback_row = self.db.fetch_one(query, (product_id, feedback_data.get('user_id')))
+            feedback_row = self.db.fetch_one(query, (feedback.product_id, feedback.user_id))
             
             if feedback_row:
                 # Обновляем существующий отзыв
@@ -174,11 +671,11 @@ class WildberriesRepository:
                 self.db.execute_query(
                     query,
                     (
-                        feedback_data.get('rating'),
-                        feedback_data.get('text'),
-                        feedback_data.get('likes', 0),
-                        feedback_data.get('dislikes', 0),
-                        datetime.now(),
+                        feedback.rating,
+                        feedback.text,
+                        feedback.likes,
+                        feedback.dislikes,
+                        feedback.parsed_at,
                         feedback_row['id']
                     )
                 )
@@ -192,28 +689,24 @@ class WildberriesRepository:
                 RETURNING id
                 """
                 
-                created_at = None
-                if feedback_data.get('created_timestamp'):
-                    created_at = datetime.fromtimestamp(feedback_data.get('created_timestamp') / 1000)
-                
                 feedback_row = self.db.fetch_one(
                     query,
                     (
-                        product_id,
-                        feedback_data.get('user_id'),
-                        feedback_data.get('rating'),
-                        feedback_data.get('text'),
-                        feedback_data.get('likes', 0),
-                        feedback_data.get('dislikes', 0),
-                        created_at,
-                        datetime.now()
+                        feedback.product_id,
+                        feedback.user_id,
+                        feedback.rating,
+                        feedback.text,
+                        feedback.likes,
+                        feedback.dislikes,
+                        feedback.created_at,
+                        feedback.parsed_at
                     )
                 )
                 
                 return feedback_row['id']
                 
         except Exception as e:
-            logger.error(f"Ошибка при сохранении отзыва для товара {product_id}: {e}")
+            logger.error(f"Ошибка при сохранении отзыва для товара {feedback.product_id}: {e}")
             return None
     
     def close(self):
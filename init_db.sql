@@ -18,16 +18,35 @@ CREATE TABLE IF NOT EXISTS categories (
     updated_at TIMESTAMP DEFAULT NOW()
 );
 
+-- Реестр юридических лиц и ИП продавцов (один ИНН может быть у нескольких магазинов WB)
+CREATE TABLE IF NOT EXISTS legal_entities (
+    id SERIAL PRIMARY KEY,
+    inn VARCHAR(20),
+    ogrn VARCHAR(15),
+    kpp VARCHAR(9),
+    legal_name VARCHAR(512),
+    entity_type VARCHAR(10),
+    address TEXT,
+    created_at TIMESTAMP DEFAULT NOW(),
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
 -- Таблица продавцов
 CREATE TABLE IF NOT EXISTS sellers (
     id INTEGER PRIMARY KEY,
     name VARCHAR(255) NOT NULL,
     rating FLOAT,
     products_count INTEGER,
+    legal_entity_id INTEGER REFERENCES legal_entities(id),
+    legal_info_updated_at TIMESTAMP,
     created_at TIMESTAMP DEFAULT NOW(),
     updated_at TIMESTAMP DEFAULT NOW()
 );
 
+-- Юридические данные для баз, созданных до появления реестра
+ALTER TABLE sellers ADD COLUMN IF NOT EXISTS legal_entity_id INTEGER REFERENCES legal_entities(id);
+ALTER TABLE sellers ADD COLUMN IF NOT EXISTS legal_info_updated_at TIMESTAMP;
+
 -- Таблица товаров
 CREATE TABLE IF NOT EXISTS products (
     id SERIAL PRIMARY KEY,
@@ -75,9 +94,65 @@ CREATE TABLE IF NOT EXISTS feedbacks (
     parsed_at TIMESTAMP DEFAULT NOW()
 );
 
+-- Товары продавцов из CSV-выгрузок inn.py (продавец известен только по юридическим данным)
+CREATE TABLE IF NOT EXISTS legal_entity_products (
+    id SERIAL PRIMARY KEY,
+    wb_id VARCHAR(50) NOT NULL,
+    legal_entity_id INTEGER NOT NULL REFERENCES legal_entities(id),
+    product_name VARCHAR(512),
+    seller_name VARCHAR(255),
+    source VARCHAR(20),
+    created_at TIMESTAMP DEFAULT NOW(),
+    updated_at TIMESTAMP DEFAULT NOW(),
+    UNIQUE (wb_id, legal_entity_id)
+);
+
+-- Загруженные CSV-файлы (по хэшу содержимого), чтобы повторный импорт их пропускал
+CREATE TABLE IF NOT EXISTS imported_files (
+    content_hash CHAR(64) PRIMARY KEY,
+    filename TEXT NOT NULL,
+    rows_count INTEGER,
+    status VARCHAR(20) NOT NULL DEFAULT 'imported',
+    imported_at TIMESTAMP DEFAULT NOW()
+);
+
+-- Статус загрузки для баз, созданных до его появления (failed - загрузить снова)
+ALTER TABLE imported_files ADD COLUMN IF NOT EXISTS status VARCHAR(20) NOT NULL DEFAULT 'imported';
+
+-- Очередь заданий обхода для нескольких хостов (main.py --mode worker)
+-- pending - ждет исполнителя, running - взято под аренду до lease_expires_at,
+-- done - выполнено, dead - исчерпаны попытки (разбирается вручную)
+CREATE TABLE IF NOT EXISTS crawl_jobs (
+    id BIGSERIAL PRIMARY KEY,
+    kind VARCHAR(20) NOT NULL CHECK (kind IN ('product', 'category', 'seller', 'search')),
+    target VARCHAR(255) NOT NULL,
+    pages INTEGER DEFAULT 1,
+    priority INTEGER DEFAULT 0,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'running', 'done', 'dead')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 5,
+    run_after TIMESTAMP NOT NULL DEFAULT NOW(),
+    leased_by VARCHAR(255),
+    lease_expires_at TIMESTAMP,
+    last_error TEXT,
+    created_at TIMESTAMP DEFAULT NOW(),
+    updated_at TIMESTAMP DEFAULT NOW(),
+    finished_at TIMESTAMP
+);
+
 -- Индексы для ускорения запросов
 CREATE INDEX IF NOT EXISTS idx_products_wb_id ON products(wb_id);
 CREATE INDEX IF NOT EXISTS idx_product_prices_product_id ON product_prices(product_id);
 CREATE INDEX IF NOT EXISTS idx_product_prices_timestamp ON product_prices(timestamp);
 CREATE INDEX IF NOT EXISTS idx_product_stocks_product_id ON product_stocks(product_id);
-CREATE INDEX IF NOT EXISTS idx_feedbacks_product_id ON feedbacks(product_id);
\ No newline at end of file
+CREATE INDEX IF NOT EXISTS idx_feedbacks_product_id ON feedbacks(product_id);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_legal_entities_inn ON legal_entities(inn);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_legal_entities_ogrn ON legal_entities(ogrn);
+CREATE INDEX IF NOT EXISTS idx_sellers_legal_entity_id ON sellers(legal_entity_id);
+CREATE INDEX IF NOT EXISTS idx_legal_entity_products_legal_entity_id ON legal_entity_products(legal_entity_id);
+CREATE INDEX IF NOT EXISTS idx_products_seller_id ON products(seller_id);
+CREATE INDEX IF NOT EXISTS idx_sellers_legal_info_updated_at ON sellers(legal_info_updated_at);
+-- Одно активное задание на сущность: повторная постановка не создает двойной работы
+CREATE UNIQUE INDEX IF NOT EXISTS idx_crawl_jobs_active ON crawl_jobs(kind, target) WHERE status IN ('pending', 'running');
+CREATE INDEX IF NOT EXISTS idx_crawl_jobs_pending ON crawl_jobs(priority DESC, run_after) WHERE status = 'pending';
+CREATE INDEX IF NOT EXISTS idx_crawl_jobs_lease ON crawl_jobs(lease_expires_at) WHERE status = 'running';
@@ -2,30 +2,573 @@ from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, StaleElementReferenceException, NoSuchElementException
+from selenium.common.exceptions import StaleElementReferenceException, NoSuchElementException, WebDriverException
 import time
 import os
 import sys
 import random
-import csv
+import argparse
+from functools import partial
 from datetime import datetime
 import re
+from loguru import logger
 
-def scrape_wildberries_sellers(max_total_products=100, batch_size=10):
-    """Скрипт для сбора информации о продавцах на Wildberries
+from parser.csv_sink import BufferedCsvWriter, iter_csv_rows
+from parser.checkpoint import CrawlCheckpoint
+from parser.seller_cache import SellerCache
+from parser.seller_resolver import SellerResolver, has_legal_details, SOURCE_CACHE, SOURCE_BROWSER
+from parser.browser_waits import PageWaiter, any_css, text_present
+from parser.selector_stats import SelectorStats
+from parser.page_extractors import extract_product_cards, find_first_candidate
+from parser.browser_pool import BrowserWorkerPool
+from models.entities import Product, Seller, SellerLegalInfo, LegalEntity, LEGAL_INFO_HEADER, LEGAL_INFO_FOOTER
+from parser.timing import StageTimer
+from parser.browser_profile import PageLoadStats, apply_lean_options, block_heavy_requests, enable_load_metrics
+
+CSV_FIELDNAMES = ['product_name', 'product_url', 'seller_name', 'seller_info', 'source']
+
+# Elements that mark a loaded catalog page and a loaded seller block on a product page
+CATEGORY_READY_SELECTORS = ["a[href*='/detail.aspx']", "*[data-nm-id]", ".product-card", ".j-card-item"]
+PRODUCT_READY_SELECTORS = [".seller-info__name", "span[class*='seller-info']", "a[href*='/seller/']"]
+
+# The page is already loaded when single selectors are probed, so each probe waits briefly
+SELECTOR_TIMEOUT = 1
+
+def configure_logging(level='INFO'):
+    """Направляет лог в stderr с заданным уровнем (DEBUG - подробный ход поиска элементов)"""
+    logger.remove()
+    logger.add(sys.stderr, level=level)
+
+# Page types the selector hit statistics are kept for
+PAGE_PRODUCT_SELLER = 'product_seller'
+PAGE_SELLER_TIP = 'seller_tip'
+PAGE_TOOLTIP = 'tooltip'
+
+def probe_selectors(driver, waiter, selector_stats, page_type, selectors, condition, label, accept=None):
+    """Ищет видимый элемент по списку CSS-селекторов в порядке их прошлой результативности
     
     Args:
-        max_total_products: Максимальное количество товаров для обработки (по умолчанию 100)
-        batch_size: Количество товаров для обработки в одном пакете (по умолчанию 10)
+        driver: Экземпляр WebDriver
+        waiter: PageWaiter для коротких ожиданий при промахе
+        selector_stats: SelectorStats со статистикой попаданий (None - исходный порядок)
+        page_type: Тип страницы, для которого ведется статистика
+        selectors: Список CSS-селекторов
+        condition: Ожидаемое условие для элемента (например, EC.element_to_be_clickable)
+        label: Название искомого элемента для вывода
+        accept: Дополнительная проверка текста найденного элемента
+    
+    Returns:
+        (элемент, селектор) или (None, None), если ни один селектор не сработал
+    """
+    if selector_stats is not None:
+        fast, fallback = selector_stats.split(page_type, selectors)
+    else:
+        fast, fallback = list(selectors), []
+    
+    ordered = fast + fallback
+    
+    # One script call checks every selector at once; per-selector probing below is the fallback
+    element, selector = find_first_candidate(driver, ordered, accept)
+    if element is not None:
+        logger.debug(f"Found visible {label} with selector: {selector} (in-page script)")
+        if selector_stats is not None:
+            for missed in ordered[:ordered.index(selector)]:
+                selector_stats.record(page_type, missed, False)
+            selector_stats.record(page_type, selector, True)
+        return element, selector
+    
+    for selector in ordered:
+        logger.debug(f"Trying to find {label} with selector: {selector}")
+        element = None
+        try:
+            for elem in driver.find_elements(By.CSS_SELECTOR, selector):
+                try:
+                    if elem.is_displayed() and (accept is None or accept(elem.text)):
+                        logger.debug(f"Found visible {label} with selector: {selector}")
+                        element = elem
+                        break
+                except Exception:
+                    continue
+            
+            # Selectors that have not matched for several runs are not waited for
+            if element is None and selector in fast:
+                element = waiter.until(f'{page_type}_selector', condition((By.CSS_SELECTOR, selector)), SELECTOR_TIMEOUT)
+                if element is not None and accept is not None and not accept(element.text):
+                    element = None
+                if element is not None:
+                    logger.debug(f"Found {label} with selector: {selector} after waiting")
+        except (StaleElementReferenceException, NoSuchElementException):
+            element = None
+        
+        if selector_stats is not None:
+            selector_stats.record(page_type, selector, element is not None)
+        if element is not None:
+            return element, selector
+        logger.debug(f"Selector {selector} did not yield results.")
+    
+    return None, None
+
+def is_seller_text(text):
+    """Проверяет, что текст элемента - реальный продавец, а не ссылка «Продавайте на Wildberries»"""
+    return bool(text) and text != "Продавайте на Wildberries"
+
+def fetch_seller_details(driver, seller_info, seller_name, seller_url, waiter=None, selector_stats=None,
+                         load_stats=None, timer=None):
+    """Открывает страницу продавца и извлекает текст подсказки с юридической информацией
+    
+    Args:
+        driver: Экземпляр WebDriver, открытый на странице товара
+        seller_info: Найденный на странице товара элемент продавца
+        seller_name: Текст элемента продавца
+        seller_url: Ссылка на страницу продавца (может быть пустой)
+        waiter: PageWaiter для ожидания элементов (по умолчанию создается новый)
+        selector_stats: SelectorStats для упорядочивания селекторов по результативности
+        load_stats: PageLoadStats для замера загрузки страницы продавца
+        timer: StageTimer для замера этапов seller_page и tooltip
+    
+    Returns:
+        Текст с информацией о продавце (или имя продавца, если подсказка не найдена),
+        None - если страницу продавца открыть не удалось
+    """
+    waiter = waiter or PageWaiter(driver)
+    timer = timer or StageTimer()
+    started = time.perf_counter()
+    
+    # Click on the seller info 
+    logger.debug("Clicking on seller info...")
+    try:
+        # Try navigating to href first
+        if seller_url:
+            logger.debug(f"Navigating to seller URL: {seller_url}")
+            driver.get(seller_url)
+            logger.debug("Navigation to seller URL successful")
+        else:
+            # Try direct click if no URL
+            seller_info.click()
+            logger.debug("Direct click on seller info successful")
+    except Exception as e:
+        logger.debug(f"First attempt to access seller info failed: {str(e)}, trying JavaScript click...")
+        try:
+            driver.execute_script("arguments[0].click();", seller_info)
+            logger.debug("JavaScript click on seller info successful")
+        except Exception as e2:
+            logger.debug(f"JavaScript click on seller info failed: {str(e2)}, trying alternative...")
+            try:
+                # Try to find seller URL in any way possible
+                all_links = driver.find_elements(By.XPATH, "//a[contains(@href, '/seller/') or contains(@href, '/brands/')]")
+                if all_links and len(all_links) > 0:
+                    seller_url = all_links[0].get_attribute('href')
+                    logger.debug(f"Found seller URL: {seller_url}")
+                    driver.get(seller_url)
+                    logger.debug("Navigation to found seller URL successful")
+                else:
+                    raise Exception("No seller URL found")
+            except Exception as e3:
+                logger.warning(f"All attempts to access seller info failed: {str(e3)}")
+                logger.warning("Could not access seller page, skipping detailed info")
+                return None
+                        
+    # Wait for seller details page to load
+    logger.debug("Waiting for seller details to load...")
+    waiter.document_ready('seller_page')
+                        
+    # Print page title and URL for debugging
+    logger.debug(f"Seller page title: {driver.title}")
+    logger.debug(f"Seller page URL: {driver.current_url}")
+                        
+    # Try different selectors for seller details tip
+    tip_selectors = [
+        ".seller-details__tip-info", 
+        "span[class*='seller-details__tip']", 
+        "span[class*='tip-info']",
+        ".seller__tip",
+        "span[class*='info']",
+        "div[class*='seller'] span",
+        ".info-icon",
+        ".info__icon",
+        "i[class*='info']",
+        "*[title*='информац']",  # Elements with title containing "информац" (information in Russian)
+        "*[data-tip-selector]"   # Elements that might trigger tooltips
+    ]
+                        
+    # XPath alternatives
+    tip_xpath_selectors = [
+        "//span[contains(@class, 'tip')]",
+        "//span[contains(@class, 'info')]",
+        "//i[contains(@class, 'info')]",
+        "//*[contains(@class, 'tip-info')]",
+        "//*[contains(@title, 'информац')]",
+        "//*[contains(@class, 'tooltip')]",
+        "//span[contains(@class, 'seller-details')]",
+        "//*[@data-tip-selector]"
+    ]
+    
+    # Block until any tip candidate is rendered instead of sleeping a fixed time
+    waiter.element('seller_tip', tip_selectors)
+    if load_stats is not None:
+        load_stats.measure(driver, 'seller')
+                        
+    # Try CSS selectors first, the ones that matched most often before go first
+    seller_details_tip, tip_selector_used = probe_selectors(
+        driver, waiter, selector_stats, PAGE_SELLER_TIP, tip_selectors,
+        EC.element_to_be_clickable, "seller details tip"
+    )
+                        
+    # If CSS selectors fail, try XPath
+    if not seller_details_tip:
+        logger.debug("CSS selectors failed, trying XPath for seller details tip...")
+        for xpath in tip_xpath_selectors:
+            logger.debug(f"Trying to find seller details tip with XPath: {xpath}")
+            try:
+                elements = driver.find_elements(By.XPATH, xpath)
+                if elements and len(elements) > 0:
+                    for elem in elements:
+                        try:
+                            if elem.is_displayed():
+                                logger.debug(f"Found visible tip element with XPath: {xpath}")
+                                seller_details_tip = elem
+                                tip_selector_used = xpath + " (XPath)"
+                                break
+                        except:
+                            continue
+                    
+                    if seller_details_tip:
+                        break
+            except Exception as e:
+                logger.debug(f"XPath {xpath} failed: {str(e)}")
+                        
+    if not seller_details_tip:
+        logger.debug("Failed to find seller details tip. Looking for any clickable icons...")
+        try:
+            # Look for any small elements that might be info icons
+            icons = driver.find_elements(By.XPATH, "//i | //span[string-length(text()) < 5] | //*[contains(@class, 'icon')]")
+            logger.debug(f"Found {len(icons)} potential icon elements")
+            for i_icon, icon in enumerate(icons[:10]):  # Try first 10 icons
+                try:
+                    if icon.is_displayed():
+                        class_name = icon.get_attribute('class')
+                        title = icon.get_attribute('title')
+                        if 'info' in (class_name or '').lower() or 'tip' in (class_name or '').lower() or (title and len(title) > 0):
+                            seller_details_tip = icon
+                            tip_selector_used = f"Found icon {i_icon}"
+                            break
+                except:
+                    continue
+        except Exception as e:
+            logger.debug(f"Error finding icons: {str(e)}")
+                        
+    seller_info_text = ""
+    timer.record('seller_page', time.perf_counter() - started, seller_url=seller_url)
+                        
+    if seller_details_tip:
+        # Found the tooltip info icon, click it
+        logger.debug(f"Successfully found seller details tip using: {tip_selector_used}")
+        try:
+            logger.debug(f"Seller details tip text: {seller_details_tip.text}")
+            logger.debug(f"Seller details tip attributes: title='{seller_details_tip.get_attribute('title')}', class='{seller_details_tip.get_attribute('class')}'")
+        except:
+            logger.debug("Could not get seller details tip text or attributes")
+        
+        # Click on the seller details tip info
+        tooltip_started = time.perf_counter()
+        logger.debug("Clicking on seller details tip info...")
+        try:
+            # Wait until the tip can take the click (important!)
+            waiter.until('tip_clickable', EC.element_to_be_clickable(seller_details_tip), SELECTOR_TIMEOUT)
+            
+            # Try direct click first
+            seller_details_tip.click()
+            logger.debug("Direct click on seller details tip successful")
+        except Exception as e:
+            logger.debug(f"Direct click on seller details tip failed: {str(e)}, trying JavaScript click...")
+            try:
+                driver.execute_script("arguments[0].click();", seller_details_tip)
+                logger.debug("JavaScript click on seller details tip successful")
+            except Exception as e2:
+                logger.debug(f"JavaScript click on seller details tip failed: {str(e2)}")
+                logger.debug("Could not click on seller details tip")
+        
+        # Try different selectors for tooltip content
+        tooltip_selectors = [
+            ".tooltip_content", 
+            "div[class*='tooltip']", 
+            "div[class*='popup']",
+            ".tippy-content",
+            ".popover-content",
+            ".popover-inner",
+            "div[class*='popover']",
+            "div[class*='modal']",
+            "div[role='tooltip']",
+            ".seller-details__tooltip",
+            "div[class*='tooltip-content']",
+            "div[class*='tip-content']"
+        ]
+        
+        # XPath alternatives
+        tooltip_xpath_selectors = [
+            "//div[contains(@class, 'tooltip')]",
+            "//div[contains(@class, 'popover')]",
+            "//div[contains(@class, 'popup')]",
+            "//div[@role='tooltip']",
+            "//div[contains(@class, 'modal')][contains(., 'ИНН')]",  # Modal containing "ИНН" (Russian tax ID)
+            "//div[contains(@class, 'modal')][contains(., 'ОГРН')]", # Modal containing "ОГРН" (Russian business ID)
+            "//div[contains(@class, 'tippy')]"
+        ]
+        
+        # Wait for tooltip to appear: a visible tooltip element or legal details in the page text
+        logger.debug("Waiting for tooltip content to load...")
+        waiter.until('tooltip', EC.any_of(
+            EC.visibility_of_element_located(any_css(tooltip_selectors)),
+            text_present('ИНН', 'ОГРН')
+        ))
+        
+        # Try CSS selectors first, the ones that matched most often before go first
+        tooltip_content, tooltip_selector_used = probe_selectors(
+            driver, waiter, selector_stats, PAGE_TOOLTIP, tooltip_selectors,
+            EC.presence_of_element_located, "tooltip content"
+        )
+        
+        # If CSS selectors fail, try XPath
+        if not tooltip_content:
+            logger.debug("CSS selectors failed, trying XPath for tooltip content...")
+            for xpath in tooltip_xpath_selectors:
+                logger.debug(f"Trying to find tooltip content with XPath: {xpath}")
+                try:
+                    elements = driver.find_elements(By.XPATH, xpath)
+                    if elements and len(elements) > 0:
+                        for elem in elements:
+                            try:
+                                if elem.is_displayed():
+                                    logger.debug(f"Found visible tooltip with XPath: {xpath}")
+                                    tooltip_content = elem
+                                    tooltip_selector_used = xpath + " (XPath)"
+                                    break
+                            except:
+                                continue
+                        
+                        if tooltip_content:
+                            break
+                except Exception as e:
+                    logger.debug(f"XPath {xpath} failed: {str(e)}")
+        
+        if not tooltip_content:
+            logger.debug("Looking for any recently appeared elements that might be tooltips...")
+            
+            # Check for elements containing INN or OGRN
+            try:
+                text_elements = driver.find_elements(By.XPATH, "//*[string-length(text()) > 0]")
+                logger.debug(f"Found {len(text_elements)} text elements")
+                for j, elem in enumerate(text_elements[:30]):  # Check first 30 elements
+                    try:
+                        if elem.is_displayed():
+                            text = elem.text
+                            # Check for business identifiers
+                            if any(keyword in text for keyword in ['ИНН', 'ОГРН', 'регистрации', 'предприниматель']):
+                                logger.debug(f"Found potential tooltip text: {text[:100]}...")
+                                tooltip_content = elem
+                                tooltip_selector_used = f"Text element containing business identifiers"
+                                break
+                    except:
+                        continue
+            except Exception as e:
+                logger.debug(f"Error finding text elements: {str(e)}")
+        
+        if tooltip_content:
+            logger.debug(f"Successfully found tooltip content using: {tooltip_selector_used}")
+            
+            # Extract the seller information
+            logger.debug("Extracting seller information...")
+            try:
+                seller_info_text = tooltip_content.text
+                logger.debug(f"=== ИНФОРМАЦИЯ О ПРОДАВЦЕ ===\n{seller_info_text}\n============================")
+            except Exception as e:
+                logger.debug(f"Error extracting text from tooltip: {str(e)}")
+                seller_info_text = "Error extracting seller information"
+        else:
+            # If couldn't find tooltip, use seller name
+            seller_info_text = seller_name
+            logger.debug(f"Could not find tooltip content, using seller name: {seller_name}")
+        timer.record('tooltip', time.perf_counter() - tooltip_started, seller_url=seller_url)
+    else:
+        # If no tooltip button found, use seller name
+        seller_info_text = seller_name
+        logger.debug(f"No tooltip button found, using seller name: {seller_name}")
+    
+    return seller_info_text
+
+def open_product_page(driver, waiter, product_url, load_stats=None):
+    """Открывает страницу товара и дожидается блока продавца
+    
+    Returns:
+        False, если страницу открыть не удалось
+    """
+    # Navigate to product URL
+    try:
+        logger.debug(f"Navigating directly to product URL: {product_url}")
+        driver.get(product_url)
+        logger.debug("Navigation successful")
+    except Exception as e:
+        logger.warning(f"Error navigating to product: {str(e)}")
+        return False
+    
+    # Wait for product page to load
+    logger.debug("Waiting for product page to load...")
+    waiter.document_ready('product_page')
+    waiter.element('product_seller', PRODUCT_READY_SELECTORS)
+    if load_stats is not None:
+        load_stats.measure(driver, 'product')
+    
+    # Print page title and URL for debugging
+    logger.debug(f"Product page title: {driver.title}")
+    logger.debug(f"Product page URL: {driver.current_url}")
+    return True
+
+def find_product_seller(driver, waiter, selector_stats):
+    """Находит элемент продавца на открытой странице товара
+    
+    Returns:
+        (элемент продавца, имя продавца, ссылка на продавца) или None,
+        если продавец не найден или исчерпан бюджет времени на товар
+    """
+    # Look for seller info - EXACTLY as in original script
+    seller_info_selectors = [
+        ".seller-info__name", 
+        "span[class*='seller-info']", 
+        "a[href*='/seller/']",
+        ".seller__name",
+        "a[class*='seller']",
+        "div[class*='seller'] a",
+        "div[class*='seller'] span",
+        "span[class*='brand']",
+        "a[class*='brand']",
+        ".brand__info",
+        "a[href*='/brands/']",
+        "*[class*='seller']",
+        "*[class*='vendor']",
+        "*[class*='brand']"
+    ]
+    
+    # XPath alternatives
+    seller_xpath_selectors = [
+        "//span[contains(@class, 'seller')]",
+        "//a[contains(@href, '/seller/')]",
+        "//a[contains(@href, '/brands/')]",
+        "//*[contains(@class, 'seller')]//a",
+        "//*[contains(text(), 'Продавец')]/..//a",  # "Продавец" means "Seller" in Russian
+        "//*[contains(text(), 'Бренд')]/..//a",     # "Бренд" means "Brand" in Russian
+        "//a[contains(@class, 'seller')]"
+    ]
+    
+    # Try CSS selectors first, the ones that matched most often before go first
+    seller_info, seller_selector_used = probe_selectors(
+        driver, waiter, selector_stats, PAGE_PRODUCT_SELLER, seller_info_selectors,
+        EC.element_to_be_clickable, "seller info", accept=is_seller_text
+    )
+    
+    # If CSS selectors fail, try XPath
+    if not seller_info:
+        logger.debug("CSS selectors failed, trying XPath for seller info...")
+        for xpath in seller_xpath_selectors:
+            logger.debug(f"Trying to find seller info with XPath: {xpath}")
+            try:
+                elements = driver.find_elements(By.XPATH, xpath)
+                if elements and len(elements) > 0:
+                    for elem in elements:
+                        try:
+                            if elem.is_displayed():
+                                # Check if this is a real seller element
+                                text = elem.text
+                                if not text or text == "Продавайте на Wildberries":
+                                    continue
+                                    
+                                logger.debug(f"Found visible seller element with XPath: {xpath}")
+                                seller_info = elem
+                                seller_selector_used = xpath + " (XPath)"
+                                break
+                        except:
+                            continue
+                    
+                    if seller_info:
+                        break
+            except Exception as e:
+                logger.debug(f"XPath {xpath} failed: {str(e)}")
+    
+    if not seller_info:
+        logger.warning("Failed to find seller info. Skipping this product.")
+        return None
+    
+    if waiter.budget_exhausted():
+        logger.warning("Time budget for this product is exhausted. Skipping this product.")
+        return None
+    
+    logger.debug(f"Successfully found seller info using: {seller_selector_used}")
+    seller_name = ""
+    seller_url = ""
+    
+    try:
+        seller_name = seller_info.text
+        seller_url = seller_info.get_attribute('href') or ""
+        logger.debug(f"Seller info text: {seller_name}")
+        logger.debug(f"Seller info href: {seller_url}")
+    except:
+        logger.debug("Could not get seller info text or href")
+    
+    return seller_info, seller_name, seller_url
+
+def lookup_product_seller(driver, waiter, selector_stats, seller_cache, product_url, load_stats=None, timer=None):
+    """Получает юридическую информацию о продавце товара через браузер
+    
+    Продавцы из кэша берутся без перехода на их страницу. Новые результаты
+    в кэш не записываются: это делает вызывающий код, который владеет кэшем.
+    
+    Returns:
+        (имя продавца, ключ кэша, текст информации, источник) или None
     """
+    timer = timer or StageTimer()
+    with timer.span('product_navigation', product_url=product_url):
+        opened = open_product_page(driver, waiter, product_url, load_stats)
+    if not opened:
+        return None
+    with timer.span('seller_lookup', product_url=product_url):
+        found = find_product_seller(driver, waiter, selector_stats)
+    if found is None:
+        return None
+    seller_info, seller_name, seller_url = found
     
-    print("Starting the Wildberries scraper...")
+    # Sellers resolved recently are taken from the cache without visiting their page
+    seller_key = SellerCache.key_for(seller_url, seller_name)
+    cached_seller = seller_cache.get(seller_key)
+    if cached_seller is not None:
+        logger.debug(f"Seller info found in cache: {seller_key}")
+        seller_info_text = cached_seller['seller_info']
+        source = SOURCE_CACHE
+    else:
+        seller_info_text = fetch_seller_details(driver, seller_info, seller_name, seller_url, waiter,
+                                                selector_stats, load_stats, timer)
+        if seller_info_text is None:
+            return None
+        source = SOURCE_BROWSER
     
+    return seller_name, seller_key, seller_info_text, source
+
+def create_driver(headless=False, lean=False):
+    """Запускает Chrome с настройками против обнаружения автоматизации
+    
+    Args:
+        headless: Запустить браузер без окна (для воркеров пула)
+        lean: Облегченный режим: без окна, без картинок, медиа, шрифтов и сторонних счетчиков
+    
+    Returns:
+        Экземпляр WebDriver
+    """
     # Configure Chrome options
     chrome_options = Options()
-    chrome_options.add_argument("--start-maximized")
+    if headless or lean:
+        chrome_options.add_argument("--headless=new")
+        chrome_options.add_argument("--window-size=1920,1080")
+    else:
+        chrome_options.add_argument("--start-maximized")
     chrome_options.add_argument("--disable-notifications")
     chrome_options.add_argument("--disable-gpu")
     chrome_options.add_argument("--no-sandbox")
@@ -50,19 +593,141 @@ def scrape_wildberries_sellers(max_total_products=100, batch_size=10):
     chrome_options.add_argument("--ignore-certificate-errors")
     chrome_options.add_argument("--ignore-ssl-errors")
     
+    # Only the DOM text is needed, skip images and other heavy content
+    if lean:
+        apply_lean_options(chrome_options)
+    
+    # Try using an existing Chrome installation or default to ChromeDriver directly
+    logger.debug("Initializing Chrome driver...")
+    driver_path = None
+    
+    # Check if chromedriver exists in the current directory
+    if os.path.exists("chromedriver.exe"):
+        driver_path = "chromedriver.exe"
+        logger.debug(f"Using local chromedriver: {driver_path}")
+        driver = webdriver.Chrome(service=Service(driver_path), options=chrome_options)
+    else:
+        # Try to initialize Chrome without webdriver_manager
+        logger.debug("Trying to initialize Chrome directly...")
+        driver = webdriver.Chrome(options=chrome_options)
+    
+    logger.info("Chrome driver initialized successfully.")
+    
+    # Set a page load timeout
+    driver.set_page_load_timeout(60)
+    
+    # Add bot detection evasion
+    driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
+        "source": """
+        Object.defineProperty(navigator, 'webdriver', {
+            get: () => undefined
+        });
+        """
+    })
+    
+    # Count every request of the page in load metrics; block heavy resources in lean mode
+    enable_load_metrics(driver)
+    if lean:
+        block_heavy_requests(driver)
+    
+    return driver
+
+class SellerPageWorker:
+    """Обработчик товаров в процессе воркера пула
+    
+    Держит свой headless Chrome, ожидания, копию статистики селекторов и
+    замеры загрузки страниц и возвращает найденные данные основному процессу,
+    который один пишет CSV, кэш продавцов и статистику.
+    """
+    
+    def __init__(self, results_dir, product_time_budget=60, selector_skip_runs=5, seller_cache_ttl_days=30,
+                 lean=False, log_level='INFO'):
+        configure_logging(log_level)
+        self.product_time_budget = product_time_budget
+        self.driver = create_driver(headless=True, lean=lean)
+        self.waiter = PageWaiter(self.driver)
+        self.load_stats = PageLoadStats(keep_records=True)
+        self.timer = StageTimer(keep_records=True)
+        self.selector_stats = SelectorStats(os.path.join(results_dir, "selector_stats.json"),
+                                            skip_after_runs=selector_skip_runs, keep_records=True)
+        # Snapshot of the shared cache, updated only in memory with this worker's results
+        self.seller_cache = SellerCache(os.path.join(results_dir, "seller_cache.json"), ttl_days=seller_cache_ttl_days)
+    
+    def __call__(self, task):
+        # A dead browser session raises here, the pool then restarts this worker
+        self.driver.current_url
+        
+        self.waiter.pace('product_interval', random.uniform(2, 4))
+        self.waiter.start_budget(self.product_time_budget)
+        found = lookup_product_seller(self.driver, self.waiter, self.selector_stats, self.seller_cache,
+                                      task['product_url'], self.load_stats, self.timer)
+        if found is not None:
+            seller_name, seller_key, seller_info_text, source = found
+            if source == SOURCE_BROWSER and has_legal_details(seller_info_text):
+                self.seller_cache.set(seller_key, seller_name, seller_info_text, source=SOURCE_BROWSER)
+        return {
+            'seller': found,
+            'selector_records': self.selector_stats.take_records(),
+            'page_loads': self.load_stats.take_records(),
+            'spans': self.timer.take_records()
+        }
+    
+    def close(self):
+        try:
+            self.driver.quit()
+        except WebDriverException:
+            pass
+
+def scrape_wildberries_sellers(max_total_products=100, batch_size=10, output_file=None, resume=False,
+                               state_file=None, seller_cache_ttl_days=30, product_time_budget=60,
+                               selector_skip_runs=5, workers=1, lean=False, discovery='api', trace_file=None,
+                               log_level='INFO', save_to_db=False):
+    """Скрипт для сбора информации о продавцах на Wildberries
+    
+    Args:
+        max_total_products: Максимальное количество товаров для обработки (по умолчанию 100)
+        batch_size: Количество строк, после которого результаты сбрасываются в CSV (по умолчанию 10)
+        output_file: CSV-файл для продолжения прерванного запуска; если не указан,
+            создается новый файл с временной меткой
+        resume: Продолжить обход с последней контрольной точки
+        state_file: Файл контрольной точки (по умолчанию sellers_info/crawl_state.json)
+        seller_cache_ttl_days: Срок жизни записей кэша продавцов в днях (0 - не использовать кэш)
+        product_time_budget: Бюджет времени на ожидания при обработке одного товара в браузере, секунды
+        selector_skip_runs: Через сколько запусков без попаданий селектор пробуется только в резерве
+        workers: Количество headless-браузеров для страниц товаров; при 1 товары
+            обрабатываются последовательно в основном браузере
+        lean: Облегченный профиль браузера: headless, без картинок, медиа, шрифтов
+            и сторонних запросов
+        discovery: Источник товаров: 'api' - JSON-выдача каталога (один товар на продавца,
+            браузер только для юридической информации), 'browser' - страницы категорий
+        trace_file: Файл, в который каждый замер этапа пишется строкой JSON
+        log_level: Уровень логирования воркеров пула (основной процесс настраивается при запуске)
+        save_to_db: Дополнительно сохранять разобранные юридические данные в реестр
+            продавцов в БД (таблицы legal_entities и sellers)
+    """
+    
+    logger.info("Starting the Wildberries scraper...")
+    
     # Create results directory
     results_dir = "sellers_info"
     os.makedirs(results_dir, exist_ok=True)
     
-    # Create CSV file for results
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    csv_filename = os.path.join(results_dir, f"wildberries_sellers_{timestamp}.csv")
+    # Crawl frontier checkpoint
+    checkpoint = CrawlCheckpoint(state_file or os.path.join(results_dir, "crawl_state.json"))
+    resumed = resume and checkpoint.load()
+    if resumed:
+        logger.info(f"Resuming from checkpoint {checkpoint.filename}: category {checkpoint.category_index + 1}, page {checkpoint.page}")
+        output_file = output_file or checkpoint.csv_filename
+    elif resume:
+        logger.info(f"No checkpoint found at {checkpoint.filename}, starting a new run")
     
-    # Create CSV file and write header
-    with open(csv_filename, 'w', newline='', encoding='utf-8') as csvfile:
-        fieldnames = ['product_name', 'product_url', 'seller_name', 'seller_info']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
+    # CSV file for results: continue the given one or create a new timestamped file
+    if output_file:
+        csv_filename = output_file
+    else:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        csv_filename = os.path.join(results_dir, f"wildberries_sellers_{timestamp}.csv")
+    checkpoint.csv_filename = csv_filename
     
     # List of categories to try in case we run out of products
     categories = [
@@ -75,42 +740,73 @@ def scrape_wildberries_sellers(max_total_products=100, batch_size=10):
         "https://www.wildberries.ru/catalog/elektronika/tehnika-dlya-doma"
     ]
     
-    # Keep track of processed products
-    processed_urls = set()
-    processed_ids = set()
-    results = []
+    # Legal info of already visited sellers, shared between runs
+    seller_cache = SellerCache(os.path.join(results_dir, "seller_cache.json"), ttl_days=seller_cache_ttl_days)
+    
+    # Which selectors matched on which page type, shared between runs
+    selector_stats = SelectorStats(os.path.join(results_dir, "selector_stats.json"), skip_after_runs=selector_skip_runs)
+    selector_stats.begin_run()
+    
+    # Plain HTTP lookup of the seller by supplierId; the browser is only a fallback
+    seller_resolver = SellerResolver(cache=seller_cache)
+    
+    # Products and sellers whose results are saved (the sets live in the checkpoint so they are saved with it)
+    processed_urls = checkpoint.processed_urls
+    processed_ids = checkpoint.processed_ids
+    processed_sellers = checkpoint.processed_sellers
     total_processed = 0
-    current_category_index = 0
+    current_category_index = checkpoint.category_index
+    start_page = checkpoint.page
+    finished = False
+    
+    # Products already saved in the file we continue are not visited again
+    if os.path.exists(csv_filename):
+        for row in iter_csv_rows(csv_filename):
+            processed_urls.add(row['product_url'])
+            match = re.search(r'/catalog/(\d+)/', row['product_url'] or '')
+            if match:
+                processed_ids.add(match.group(1))
+            total_processed += 1
+        logger.info(f"Continuing {csv_filename}: {total_processed} products already saved")
+    
+    # Products visited in this run, saved or not; failed and in-flight products are not in the
+    # checkpoint sets, so a resumed run retries them
+    visited_urls = set(processed_urls)
+    visited_ids = set(processed_ids)
+    
+    # Long-lived buffered writer instead of reopening the file for every row
+    csv_writer = BufferedCsvWriter(csv_filename, CSV_FIELDNAMES, flush_rows=batch_size)
+    pool = None
+    
+    # Page load time and transferred bytes per page type
+    load_stats = PageLoadStats()
+    
+    # Per-stage timings, optionally traced span by span into a JSON lines file
+    timer = StageTimer(trace_file)
+    
+    # Seller registry in the database: parsed legal name, INN, OGRN, type and address
+    repo = None
+    if save_to_db:
+        from database.repository import WildberriesRepository
+        repo = WildberriesRepository()
     
     try:
-        # Try using an existing Chrome installation or default to ChromeDriver directly
-        print("Initializing Chrome driver...")
-        driver_path = None
-        
-        # Check if chromedriver exists in the current directory
-        if os.path.exists("chromedriver.exe"):
-            driver_path = "chromedriver.exe"
-            print(f"Using local chromedriver: {driver_path}")
-            driver = webdriver.Chrome(service=Service(driver_path), options=chrome_options)
-        else:
-            # Try to initialize Chrome without webdriver_manager
-            print("Trying to initialize Chrome directly...")
-            driver = webdriver.Chrome(options=chrome_options)
-        
-        print("Chrome driver initialized successfully.")
-        
-        # Set a page load timeout
-        driver.set_page_load_timeout(60)
+        driver = create_driver(lean=lean)
         
         try:
-            # Add bot detection evasion
-            driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
-                "source": """
-                Object.defineProperty(navigator, 'webdriver', {
-                    get: () => undefined
-                });
-                """
-            })
+            # Condition-based waits with a per-product time budget instead of fixed sleeps
+            waiter = PageWaiter(driver)
+            
+            # Product pages go to a pool of headless workers; this browser only discovers products
+            if workers > 1:
+                logger.info(f"Starting {workers} browser workers...")
+                pool = BrowserWorkerPool(
+                    partial(SellerPageWorker, results_dir, product_time_budget, selector_skip_runs,
+                            seller_cache_ttl_days, lean, log_level),
+                    workers=workers,
+                    # A product gets its time budget; a worker stuck far beyond it is restarted
+                    task_timeout=product_time_budget * 3
+                ).start()
             
             # Function to extract product ID from URL
             def extract_product_id(url):
@@ -124,25 +820,104 @@ def scrape_wildberries_sellers(max_total_products=100, batch_size=10):
                 except:
                     return None
             
+            # Function to save a product with full seller info
+            def save_result(product_name, product_url, seller_name, seller_info_text, source, seller_id=None):
+                nonlocal total_processed
+                
+                # Check if we got full seller info with "ИНН" and "ОГРН"
+                if not has_legal_details(seller_info_text):
+                    logger.warning("No full seller info found, not saving to CSV")
+                    return False
+                
+                # Format the seller info text exactly as required
+                formatted_seller_info = f"{LEGAL_INFO_HEADER}\n{seller_info_text}\n{LEGAL_INFO_FOOTER}"
+                
+                # Save the results
+                result = {
+                    'product_name': product_name,
+                    'product_url': product_url,
+                    'seller_name': seller_name,
+                    'seller_info': formatted_seller_info,
+                    'source': source
+                }
+                
+                with timer.span('write', product_url=product_url):
+                    csv_writer.writerow(result)
+                if repo is not None:
+                    with timer.span('db_write', product_url=product_url):
+                        repo.save_seller_legal_info(seller_id, seller_name,
+                                                    LegalEntity.from_seller_info(seller_info_text))
+                
+                # Only saved products and sellers count as done for --resume
+                processed_urls.add(product_url)
+                product_id = extract_product_id(product_url)
+                if product_id:
+                    processed_ids.add(product_id)
+                if seller_id:
+                    processed_sellers.add(seller_id)
+                
+                total_processed += 1
+                logger.info(f"Seller info for product saved to CSV ({source}). Progress: {total_processed}/{max_total_products}")
+                return True
+            
+            # Function to save results returned by the browser workers
+            def save_worker_results(results):
+                for task, result in results:
+                    if result is None:
+                        continue
+                    selector_stats.merge(result['selector_records'])
+                    load_stats.merge(result['page_loads'])
+                    timer.merge(result['spans'])
+                    if result['seller'] is None or total_processed >= max_total_products:
+                        continue
+                    seller_name, seller_key, seller_info_text, source = result['seller']
+                    if source == SOURCE_BROWSER and has_legal_details(seller_info_text):
+                        seller_cache.set(seller_key, seller_name, seller_info_text, source=SOURCE_BROWSER)
+                    saved = save_result(task['product_name'], task['product_url'], seller_name, seller_info_text, source,
+                                        SellerCache.id_from_key(seller_key) or task.get('seller_id'))
+                    if saved and source == SOURCE_BROWSER:
+                        seller_resolver.stats[SOURCE_BROWSER] += 1
+            
+            # Function to get products of a catalog page from the JSON API, one product per new seller
+            def fetch_listing_page(category_node, page):
+                with timer.span('category_load', shard=category_node['shard'], page=page):
+                    items = seller_resolver.scraper.get_category_products(
+                        category_node['shard'], page=page, query=category_node.get('query')
+                    )
+                products = []
+                page_sellers = set()
+                for item in items:
+                    product = Product.from_listing_payload(item)
+                    seller = product.seller
+                    if not product.wb_id or product.wb_id in visited_ids:
+                        continue
+                    if seller.id and (seller.id in processed_sellers or seller.id in page_sellers):
+                        continue
+                    page_sellers.add(seller.id)
+                    product_url = f"https://www.wildberries.ru/catalog/{product.wb_id}/detail.aspx"
+                    products.append((product.name, product_url, product.wb_id, seller if seller.id else None))
+                logger.info(f"Catalog API returned {len(items)} products, {len(products)} of them from new sellers")
+                return len(items), products
+            
             # Function to find product cards in different ways
             def find_product_cards():
                 # First, try product cards with detail links
                 try:
                     detail_links = driver.find_elements(By.XPATH, "//a[contains(@href, '/detail.aspx')]")
                     if detail_links and len(detail_links) > 0:
-                        print(f"Found {len(detail_links)} direct product links with '/detail.aspx'")
+                        logger.debug(f"Found {len(detail_links)} direct product links with '/detail.aspx'")
                         return detail_links, "Direct product links"
                 except Exception as e:
-                    print(f"Failed to find direct product links: {str(e)}")
+                    logger.debug(f"Failed to find direct product links: {str(e)}")
                 
                 # Second, try with data-nm-id attribute
                 try:
                     items_with_nm_id = driver.find_elements(By.XPATH, "//*[@data-nm-id]")
                     if items_with_nm_id and len(items_with_nm_id) > 0:
-                        print(f"Found {len(items_with_nm_id)} elements with 'data-nm-id' attribute")
+                        logger.debug(f"Found {len(items_with_nm_id)} elements with 'data-nm-id' attribute")
                         return items_with_nm_id, "data-nm-id elements"
                 except Exception as e:
-                    print(f"Failed to find elements with data-nm-id: {str(e)}")
+                    logger.debug(f"Failed to find elements with data-nm-id: {str(e)}")
                 
                 # Try different selectors for product cards
                 product_card_selectors = [
@@ -161,10 +936,10 @@ def scrape_wildberries_sellers(max_total_products=100, batch_size=10):
                     try:
                         elements = driver.find_elements(By.CSS_SELECTOR, selector)
                         if elements and len(elements) > 0:
-                            print(f"Found {len(elements)} elements with selector: {selector}")
+                            logger.debug(f"Found {len(elements)} elements with selector: {selector}")
                             return elements, selector
                     except Exception as e:
-                        print(f"Selector {selector} failed: {str(e)}")
+                        logger.debug(f"Selector {selector} failed: {str(e)}")
                 
                 # XPath alternatives
                 xpath_selectors = [
@@ -178,10 +953,10 @@ def scrape_wildberries_sellers(max_total_products=100, batch_size=10):
                     try:
                         elements = driver.find_elements(By.XPATH, xpath)
                         if elements and len(elements) > 0:
-                            print(f"Found {len(elements)} elements with XPath: {xpath}")
+                            logger.debug(f"Found {len(elements)} elements with XPath: {xpath}")
                             return elements, xpath
                     except Exception as e:
-                        print(f"XPath {xpath} failed: {str(e)}")
+                        logger.debug(f"XPath {xpath} failed: {str(e)}")
                 
                 # Last resort - all catalog links
                 try:
@@ -194,10 +969,10 @@ def scrape_wildberries_sellers(max_total_products=100, batch_size=10):
                             valid_links.append(link)
                     
                     if valid_links and len(valid_links) > 0:
-                        print(f"Found {len(valid_links)} potential product links")
+                        logger.debug(f"Found {len(valid_links)} potential product links")
                         return valid_links, "Filtered catalog links"
                 except Exception as e:
-                    print(f"Failed to find catalog links: {str(e)}")
+                    logger.debug(f"Failed to find catalog links: {str(e)}")
                 
                 return None, None
             
@@ -257,7 +1032,7 @@ def scrape_wildberries_sellers(max_total_products=100, batch_size=10):
                     
                     return product_name, product_url, product_id
                 except Exception as e:
-                    print(f"Error getting product details: {str(e)}")
+                    logger.debug(f"Error getting product details: {str(e)}")
                     return None, None, None
             
             # Function to navigate and find products in a category
@@ -271,17 +1046,25 @@ def scrape_wildberries_sellers(max_total_products=100, batch_size=10):
                         else:
                             url = f"{url}?page={page}"
                     
-                    print(f"\n===== Processing category page: {url} =====\n")
+                    # Keep a polite interval between page loads (longer when switching categories);
+                    # time spent on products counts towards it
+                    waiter.pace('page_interval', random.uniform(2, 4) if page > 1 else random.uniform(3, 6))
+                    waiter.start_budget(None)
+                    load_started = time.perf_counter()
+                    
+                    logger.info(f"===== Processing category page: {url} =====")
                     driver.get(url)
                     
                     # Wait for page to load
-                    time.sleep(5)
+                    waiter.document_ready('category_page')
+                    waiter.element('category_cards', CATEGORY_READY_SELECTORS)
+                    load_stats.measure(driver, 'category')
                     
                     # Scroll to load dynamic content
-                    print("Scrolling to load more products...")
+                    logger.debug("Scrolling to load more products...")
                     for i in range(5):
                         driver.execute_script(f"window.scrollBy(0, {random.randint(500, 1000)});")
-                        time.sleep(random.uniform(0.5, 1.5))
+                        waiter.network_idle('scroll', idle_time=0.3, timeout=2)
                     
                     # Try to find 'Show more' button and click it
                     try:
@@ -292,70 +1075,99 @@ def scrape_wildberries_sellers(max_total_products=100, batch_size=10):
                         
                         for button in show_more_buttons:
                             if button.is_displayed():
-                                print("Clicking 'Show more' button...")
+                                logger.debug("Clicking 'Show more' button...")
+                                card_locator = any_css(CATEGORY_READY_SELECTORS)
+                                cards_before = len(driver.find_elements(*card_locator))
                                 driver.execute_script("arguments[0].click();", button)
-                                time.sleep(3)
+                                waiter.until('show_more', lambda d: len(d.find_elements(*card_locator)) > cards_before, 5)
                                 # Scroll more after clicking
                                 for i in range(3):
                                     driver.execute_script(f"window.scrollBy(0, {random.randint(500, 1000)});")
-                                    time.sleep(random.uniform(0.5, 1.0))
+                                    waiter.network_idle('scroll', idle_time=0.3, timeout=2)
                                 break
                     except Exception as e:
-                        print(f"Failed to click 'Show more' button: {str(e)}")
-                    
-                    # Find product cards
-                    product_cards, selector_used = find_product_cards()
+                        logger.debug(f"Failed to click 'Show more' button: {str(e)}")
                     
-                    if not product_cards or len(product_cards) == 0:
-                        print("No product cards found on this page")
-                        return []
+                    timer.record('category_load', time.perf_counter() - load_started, url=url)
                     
-                    print(f"Found {len(product_cards)} product cards using {selector_used}")
+                    # Extract all cards with a single in-page script call
+                    started = time.perf_counter()
+                    page_products = extract_product_cards(driver)
+                    if page_products:
+                        logger.debug(f"Extracted {len(page_products)} product cards in-page in {(time.perf_counter() - started) * 1000:.0f} ms")
+                    else:
+                        # Fall back to per-element lookups with the selector lists
+                        product_cards, selector_used = find_product_cards()
+                        
+                        if not product_cards or len(product_cards) == 0:
+                            logger.debug("No product cards found on this page")
+                            return []
+                        
+                        logger.debug(f"Found {len(product_cards)} product cards using {selector_used}")
+                        page_products = [get_product_details(card, i + 1) for i, card in enumerate(product_cards)]
+                    timer.record('card_extraction', time.perf_counter() - started, url=url)
                     
                     # Get unique products
                     unique_products = []
-                    for i, card in enumerate(product_cards):
-                        name, url, product_id = get_product_details(card, i + 1)
-                        
+                    for name, url, product_id in page_products:
                         # Skip invalid products
                         if not url:
                             continue
                         
-                        # Skip already processed products
-                        if url in processed_urls:
+                        # Skip products already visited
+                        if url in visited_urls:
                             continue
                         
-                        if product_id and product_id in processed_ids:
+                        if product_id and product_id in visited_ids:
                             continue
                         
                         unique_products.append((name, url, product_id))
                     
-                    print(f"Found {len(unique_products)} unique products on this page")
+                    logger.debug(f"Found {len(unique_products)} unique products on this page")
                     return unique_products
                     
                 except Exception as e:
-                    print(f"Error processing category: {str(e)}")
+                    logger.warning(f"Error processing category: {str(e)}")
                     return []
             
             # Main processing loop
             while total_processed < max_total_products and current_category_index < len(categories):
                 category_url = categories[current_category_index]
-                print(f"\n===== Processing category {current_category_index + 1}/{len(categories)}: {category_url} =====\n")
+                logger.info(f"===== Processing category {current_category_index + 1}/{len(categories)}: {category_url} =====")
+                
+                # Products and sellers come from the JSON catalog API when the category is known there
+                category_node = None
+                if discovery == 'api':
+                    category_node = seller_resolver.scraper.find_category(category_url)
+                    if category_node is None:
+                        logger.warning("Category not found in the catalog API, falling back to browser listing pages")
                 
-                # Process pages of the current category
-                page = 1
+                # Process pages of the current category (a resumed run starts at the saved page)
+                page = start_page
+                start_page = 1
                 consecutive_empty_pages = 0
                 max_consecutive_empty_pages = 3
                 
-                while total_processed < max_total_products and page <= 10 and consecutive_empty_pages < max_consecutive_empty_pages:
-                    print(f"\n===== Processing page {page} of category {current_category_index + 1} =====\n")
+                # The API is read until it runs out of products; browser listing stays capped at 10 pages
+                while (total_processed < max_total_products and consecutive_empty_pages < max_consecutive_empty_pages
+                       and (category_node is not None or page <= 10)):
+                    logger.info(f"===== Processing page {page} of category {current_category_index + 1} =====")
                     
                     # Get products from current page
-                    products = process_category(category_url, page)
+                    if category_node is not None:
+                        waiter.pace('listing_interval', random.uniform(0.5, 1.5))
+                        listed, products = fetch_listing_page(category_node, page)
+                        if listed == 0:
+                            logger.info(f"No more products in the catalog API after page {page - 1}")
+                            break
+                    else:
+                        products = [(name, url, product_id, None) for name, url, product_id in process_category(category_url, page)]
                     
                     if not products or len(products) == 0:
-                        print(f"No new products found on page {page}")
-                        consecutive_empty_pages += 1
+                        logger.debug(f"No new products found on page {page}")
+                        # A listing page where every seller is already known is not the end of the category
+                        if category_node is None:
+                            consecutive_empty_pages += 1
                         page += 1
                         continue
                     
@@ -363,541 +1175,292 @@ def scrape_wildberries_sellers(max_total_products=100, batch_size=10):
                     consecutive_empty_pages = 0
                     
                     # Process each product
-                    for product_name, product_url, product_id in products:
-                        if total_processed >= max_total_products:
+                    for product_name, product_url, product_id, seller in products:
+                        # Products already handed to the workers count towards the limit
+                        if total_processed + (pool.pending if pool is not None else 0) >= max_total_products:
                             break
                         
-                        print(f"\n--- Processing product {total_processed + 1}/{max_total_products} ---")
-                        print(f"Product name: {product_name}")
-                        print(f"Product URL: {product_url}")
-                        print(f"Product ID: {product_id}")
+                        # Periodically save the crawl frontier
+                        checkpoint.category_index = current_category_index
+                        checkpoint.page = page
+                        checkpoint.maybe_save()
+                        
+                        logger.info(f"--- Processing product {total_processed + 1}/{max_total_products} ---")
+                        logger.debug(f"Product name: {product_name}")
+                        logger.debug(f"Product URL: {product_url}")
+                        logger.debug(f"Product ID: {product_id}")
                         
-                        # Add to processed sets
-                        processed_urls.add(product_url)
+                        # Not visited again in this run; the checkpoint marks it only once saved
+                        visited_urls.add(product_url)
                         if product_id:
-                            processed_ids.add(product_id)
+                            visited_ids.add(product_id)
                         
-                        # Navigate to product URL
-                        try:
-                            print(f"Navigating directly to product URL: {product_url}")
-                            driver.get(product_url)
-                            print("Navigation successful")
-                        except Exception as e:
-                            print(f"Error navigating to product: {str(e)}")
+                        # Try to resolve the seller over HTTP first, without opening any page;
+                        # JSON requests are cheap, a short interval between them is enough
+                        waiter.pace('http_interval', random.uniform(0.3, 0.8))
+                        with timer.span('http_resolve', product_id=product_id):
+                            if seller is not None:
+                                legal_info = seller_resolver.resolve_seller(seller)
+                            else:
+                                legal_info = seller_resolver.resolve(product_id) if product_id else None
+                        if legal_info is not None:
+                            logger.debug(f"Seller info resolved via {legal_info.source}: {legal_info.seller_name}")
+                            save_result(product_name, product_url, legal_info.seller_name,
+                                        legal_info.seller_info, legal_info.source, legal_info.seller_id)
                             continue
                         
-                        # Wait for product page to load
-                        print("Waiting for product page to load...")
-                        time.sleep(5)
-                        
-                        # Print page title and URL for debugging
-                        print(f"Product page title: {driver.title}")
-                        print(f"Product page URL: {driver.current_url}")
-                        
-                        # Look for seller info - EXACTLY as in original script
-                        seller_info_selectors = [
-                            ".seller-info__name", 
-                            "span[class*='seller-info']", 
-                            "a[href*='/seller/']",
-                            ".seller__name",
-                            "a[class*='seller']",
-                            "div[class*='seller'] a",
-                            "div[class*='seller'] span",
-                            "span[class*='brand']",
-                            "a[class*='brand']",
-                            ".brand__info",
-                            "a[href*='/brands/']",
-                            "*[class*='seller']",
-                            "*[class*='vendor']",
-                            "*[class*='brand']"
-                        ]
-                        
-                        # XPath alternatives
-                        seller_xpath_selectors = [
-                            "//span[contains(@class, 'seller')]",
-                            "//a[contains(@href, '/seller/')]",
-                            "//a[contains(@href, '/brands/')]",
-                            "//*[contains(@class, 'seller')]//a",
-                            "//*[contains(text(), 'Продавец')]/..//a",  # "Продавец" means "Seller" in Russian
-                            "//*[contains(text(), 'Бренд')]/..//a",     # "Бренд" means "Brand" in Russian
-                            "//a[contains(@class, 'seller')]"
-                        ]
-                        
-                        seller_info = None
-                        seller_selector_used = None
-                        
-                        # Try CSS selectors first
-                        for selector in seller_info_selectors:
-                            print(f"Trying to find seller info with selector: {selector}")
-                            try:
-                                # First try find_elements
-                                elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                                if elements and len(elements) > 0:
-                                    for elem in elements:
-                                        try:
-                                            if elem.is_displayed():
-                                                # Check if this is a real seller element (not "Sell on Wildberries")
-                                                text = elem.text
-                                                if not text or text == "Продавайте на Wildberries":
-                                                    continue
-                                                
-                                                print(f"Found visible seller element with selector: {selector}")
-                                                seller_info = elem
-                                                seller_selector_used = selector
-                                                break
-                                        except:
-                                            continue
-                                    
-                                    if seller_info:
-                                        break
-                                
-                                # If not found, try WebDriverWait
-                                seller_info = WebDriverWait(driver, 5).until(
-                                    EC.element_to_be_clickable((By.CSS_SELECTOR, selector))
-                                )
-                                # Check if this is a real seller element
-                                if seller_info:
-                                    text = seller_info.text
-                                    if not text or text == "Продавайте на Wildberries":
-                                        seller_info = None
-                                        continue
-                                        
-                                    print(f"Found seller info with selector: {selector} using WebDriverWait")
-                                    seller_selector_used = selector
-                                    break
-                            except (TimeoutException, NoSuchElementException):
-                                print(f"Selector {selector} did not yield results.")
-                        
-                        # If CSS selectors fail, try XPath
-                        if not seller_info:
-                            print("CSS selectors failed, trying XPath for seller info...")
-                            for xpath in seller_xpath_selectors:
-                                print(f"Trying to find seller info with XPath: {xpath}")
-                                try:
-                                    elements = driver.find_elements(By.XPATH, xpath)
-                                    if elements and len(elements) > 0:
-                                        for elem in elements:
-                                            try:
-                                                if elem.is_displayed():
-                                                    # Check if this is a real seller element
-                                                    text = elem.text
-                                                    if not text or text == "Продавайте на Wildberries":
-                                                        continue
-                                                        
-                                                    print(f"Found visible seller element with XPath: {xpath}")
-                                                    seller_info = elem
-                                                    seller_selector_used = xpath + " (XPath)"
-                                                    break
-                                            except:
-                                                continue
-                                        
-                                        if seller_info:
-                                            break
-                                except Exception as e:
-                                    print(f"XPath {xpath} failed: {str(e)}")
-                        
-                        if not seller_info:
-                            print("Failed to find seller info. Skipping this product.")
+                        if pool is not None:
+                            pool.submit({'product_name': product_name, 'product_url': product_url, 'product_id': product_id,
+                                         'seller_id': seller.id if seller is not None else None})
+                            save_worker_results(pool.poll())
                             continue
                         
-                        print(f"Successfully found seller info using: {seller_selector_used}")
-                        seller_name = ""
-                        seller_url = ""
-                        
-                        try:
-                            seller_name = seller_info.text
-                            seller_url = seller_info.get_attribute('href') or ""
-                            print(f"Seller info text: {seller_name}")
-                            print(f"Seller info href: {seller_url}")
-                        except:
-                            print("Could not get seller info text or href")
+                        # Keep a polite interval between product page loads
+                        waiter.pace('product_interval', random.uniform(2, 4))
+                        waiter.start_budget(product_time_budget)
                         
-                        # Click on the seller info 
-                        print("Clicking on seller info...")
-                        try:
-                            # Try navigating to href first
-                            if seller_url:
-                                print(f"Navigating to seller URL: {seller_url}")
-                                driver.get(seller_url)
-                                print("Navigation to seller URL successful")
-                            else:
-                                # Try direct click if no URL
-                                seller_info.click()
-                                print("Direct click on seller info successful")
-                        except Exception as e:
-                            print(f"First attempt to access seller info failed: {str(e)}, trying JavaScript click...")
-                            try:
-                                driver.execute_script("arguments[0].click();", seller_info)
-                                print("JavaScript click on seller info successful")
-                            except Exception as e2:
-                                print(f"JavaScript click on seller info failed: {str(e2)}, trying alternative...")
-                                try:
-                                    # Try to find seller URL in any way possible
-                                    all_links = driver.find_elements(By.XPATH, "//a[contains(@href, '/seller/') or contains(@href, '/brands/')]")
-                                    if all_links and len(all_links) > 0:
-                                        seller_url = all_links[0].get_attribute('href')
-                                        print(f"Found seller URL: {seller_url}")
-                                        driver.get(seller_url)
-                                        print("Navigation to found seller URL successful")
-                                    else:
-                                        raise Exception("No seller URL found")
-                                except Exception as e3:
-                                    print(f"All attempts to access seller info failed: {str(e3)}")
-                                    print("Could not access seller page, skipping detailed info")
-                                    
-                                    # Move to next product
-                                    continue
-                        
-                        # Wait for seller details page to load
-                        print("Waiting for seller details to load...")
-                        time.sleep(5)
-                        
-                        # Print page title and URL for debugging
-                        print(f"Seller page title: {driver.title}")
-                        print(f"Seller page URL: {driver.current_url}")
-                        
-                        # Try different selectors for seller details tip
-                        tip_selectors = [
-                            ".seller-details__tip-info", 
-                            "span[class*='seller-details__tip']", 
-                            "span[class*='tip-info']",
-                            ".seller__tip",
-                            "span[class*='info']",
-                            "div[class*='seller'] span",
-                            ".info-icon",
-                            ".info__icon",
-                            "i[class*='info']",
-                            "*[title*='информац']",  # Elements with title containing "информац" (information in Russian)
-                            "*[data-tip-selector]"   # Elements that might trigger tooltips
-                        ]
-                        
-                        # XPath alternatives
-                        tip_xpath_selectors = [
-                            "//span[contains(@class, 'tip')]",
-                            "//span[contains(@class, 'info')]",
-                            "//i[contains(@class, 'info')]",
-                            "//*[contains(@class, 'tip-info')]",
-                            "//*[contains(@title, 'информац')]",
-                            "//*[contains(@class, 'tooltip')]",
-                            "//span[contains(@class, 'seller-details')]",
-                            "//*[@data-tip-selector]"
-                        ]
-                        
-                        seller_details_tip = None
-                        tip_selector_used = None
-                        
-                        # Try CSS selectors first
-                        for selector in tip_selectors:
-                            print(f"Trying to find seller details tip with selector: {selector}")
-                            try:
-                                elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                                if elements and len(elements) > 0:
-                                    for elem in elements:
-                                        try:
-                                            if elem.is_displayed():
-                                                print(f"Found visible tip element with selector: {selector}")
-                                                seller_details_tip = elem
-                                                tip_selector_used = selector
-                                                break
-                                        except:
-                                            continue
-                                    
-                                    if seller_details_tip:
-                                        break
-                                
-                                seller_details_tip = WebDriverWait(driver, 5).until(
-                                    EC.element_to_be_clickable((By.CSS_SELECTOR, selector))
-                                )
-                                if seller_details_tip:
-                                    print(f"Found seller details tip with selector: {selector} using WebDriverWait")
-                                    tip_selector_used = selector
-                                    break
-                            except TimeoutException:
-                                print(f"Selector {selector} did not yield results.")
-                        
-                        # If CSS selectors fail, try XPath
-                        if not seller_details_tip:
-                            print("CSS selectors failed, trying XPath for seller details tip...")
-                            for xpath in tip_xpath_selectors:
-                                print(f"Trying to find seller details tip with XPath: {xpath}")
-                                try:
-                                    elements = driver.find_elements(By.XPATH, xpath)
-                                    if elements and len(elements) > 0:
-                                        for elem in elements:
-                                            try:
-                                                if elem.is_displayed():
-                                                    print(f"Found visible tip element with XPath: {xpath}")
-                                                    seller_details_tip = elem
-                                                    tip_selector_used = xpath + " (XPath)"
-                                                    break
-                                            except:
-                                                continue
-                                        
-                                        if seller_details_tip:
-                                            break
-                                except Exception as e:
-                                    print(f"XPath {xpath} failed: {str(e)}")
-                        
-                        if not seller_details_tip:
-                            print("Failed to find seller details tip. Looking for any clickable icons...")
-                            try:
-                                # Look for any small elements that might be info icons
-                                icons = driver.find_elements(By.XPATH, "//i | //span[string-length(text()) < 5] | //*[contains(@class, 'icon')]")
-                                print(f"Found {len(icons)} potential icon elements")
-                                for i_icon, icon in enumerate(icons[:10]):  # Try first 10 icons
-                                    try:
-                                        if icon.is_displayed():
-                                            class_name = icon.get_attribute('class')
-                                            title = icon.get_attribute('title')
-                                            if 'info' in (class_name or '').lower() or 'tip' in (class_name or '').lower() or (title and len(title) > 0):
-                                                seller_details_tip = icon
-                                                tip_selector_used = f"Found icon {i_icon}"
-                                                break
-                                    except:
-                                        continue
-                            except Exception as e:
-                                print(f"Error finding icons: {str(e)}")
-                        
-                        seller_info_text = ""
-                        
-                        if seller_details_tip:
-                            # Found the tooltip info icon, click it
-                            print(f"Successfully found seller details tip using: {tip_selector_used}")
-                            try:
-                                print(f"Seller details tip text: {seller_details_tip.text}")
-                                print(f"Seller details tip attributes: title='{seller_details_tip.get_attribute('title')}', class='{seller_details_tip.get_attribute('class')}'")
-                            except:
-                                print("Could not get seller details tip text or attributes")
-                            
-                            # Click on the seller details tip info
-                            print("Clicking on seller details tip info...")
-                            try:
-                                # Wait a bit before clicking (important!)
-                                time.sleep(1)
-                                
-                                # Try direct click first
-                                seller_details_tip.click()
-                                print("Direct click on seller details tip successful")
-                            except Exception as e:
-                                print(f"Direct click on seller details tip failed: {str(e)}, trying JavaScript click...")
-                                try:
-                                    driver.execute_script("arguments[0].click();", seller_details_tip)
-                                    print("JavaScript click on seller details tip successful")
-                                except Exception as e2:
-                                    print(f"JavaScript click on seller details tip failed: {str(e2)}")
-                                    print("Could not click on seller details tip")
-                            
-                            # Wait for tooltip to appear
-                            print("Waiting for tooltip content to load...")
-                            time.sleep(5)
-                            
-                            # Try different selectors for tooltip content
-                            tooltip_selectors = [
-                                ".tooltip_content", 
-                                "div[class*='tooltip']", 
-                                "div[class*='popup']",
-                                ".tippy-content",
-                                ".popover-content",
-                                ".popover-inner",
-                                "div[class*='popover']",
-                                "div[class*='modal']",
-                                "div[role='tooltip']",
-                                ".seller-details__tooltip",
-                                "div[class*='tooltip-content']",
-                                "div[class*='tip-content']"
-                            ]
-                            
-                            # XPath alternatives
-                            tooltip_xpath_selectors = [
-                                "//div[contains(@class, 'tooltip')]",
-                                "//div[contains(@class, 'popover')]",
-                                "//div[contains(@class, 'popup')]",
-                                "//div[@role='tooltip']",
-                                "//div[contains(@class, 'modal')][contains(., 'ИНН')]",  # Modal containing "ИНН" (Russian tax ID)
-                                "//div[contains(@class, 'modal')][contains(., 'ОГРН')]", # Modal containing "ОГРН" (Russian business ID)
-                                "//div[contains(@class, 'tippy')]"
-                            ]
-                            
-                            tooltip_content = None
-                            tooltip_selector_used = None
-                            
-                            # Try CSS selectors first
-                            for selector in tooltip_selectors:
-                                print(f"Trying to find tooltip content with selector: {selector}")
-                                try:
-                                    elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                                    if elements and len(elements) > 0:
-                                        for elem in elements:
-                                            try:
-                                                if elem.is_displayed():
-                                                    print(f"Found visible tooltip with selector: {selector}")
-                                                    tooltip_content = elem
-                                                    tooltip_selector_used = selector
-                                                    break
-                                            except:
-                                                continue
-                                        
-                                        if tooltip_content:
-                                            break
-                                    
-                                    tooltip_content = WebDriverWait(driver, 5).until(
-                                        EC.presence_of_element_located((By.CSS_SELECTOR, selector))
-                                    )
-                                    if tooltip_content:
-                                        print(f"Found tooltip content with selector: {selector} using WebDriverWait")
-                                        tooltip_selector_used = selector
-                                        break
-                                except TimeoutException:
-                                    print(f"Selector {selector} did not yield results.")
-                            
-                            # If CSS selectors fail, try XPath
-                            if not tooltip_content:
-                                print("CSS selectors failed, trying XPath for tooltip content...")
-                                for xpath in tooltip_xpath_selectors:
-                                    print(f"Trying to find tooltip content with XPath: {xpath}")
-                                    try:
-                                        elements = driver.find_elements(By.XPATH, xpath)
-                                        if elements and len(elements) > 0:
-                                            for elem in elements:
-                                                try:
-                                                    if elem.is_displayed():
-                                                        print(f"Found visible tooltip with XPath: {xpath}")
-                                                        tooltip_content = elem
-                                                        tooltip_selector_used = xpath + " (XPath)"
-                                                        break
-                                                except:
-                                                    continue
-                                            
-                                            if tooltip_content:
-                                                break
-                                    except Exception as e:
-                                        print(f"XPath {xpath} failed: {str(e)}")
-                            
-                            if not tooltip_content:
-                                print("Looking for any recently appeared elements that might be tooltips...")
-                                
-                                # Check for elements containing INN or OGRN
-                                try:
-                                    text_elements = driver.find_elements(By.XPATH, "//*[string-length(text()) > 0]")
-                                    print(f"Found {len(text_elements)} text elements")
-                                    for j, elem in enumerate(text_elements[:30]):  # Check first 30 elements
-                                        try:
-                                            if elem.is_displayed():
-                                                text = elem.text
-                                                # Check for business identifiers
-                                                if any(keyword in text for keyword in ['ИНН', 'ОГРН', 'регистрации', 'предприниматель']):
-                                                    print(f"Found potential tooltip text: {text[:100]}...")
-                                                    tooltip_content = elem
-                                                    tooltip_selector_used = f"Text element containing business identifiers"
-                                                    break
-                                        except:
-                                            continue
-                                except Exception as e:
-                                    print(f"Error finding text elements: {str(e)}")
-                            
-                            if tooltip_content:
-                                print(f"Successfully found tooltip content using: {tooltip_selector_used}")
-                                
-                                # Extract the seller information
-                                print("Extracting seller information...")
-                                try:
-                                    seller_info_text = tooltip_content.text
-                                    print("\n=== ИНФОРМАЦИЯ О ПРОДАВЦЕ ===")
-                                    print(seller_info_text)
-                                    print("============================\n")
-                                except Exception as e:
-                                    print(f"Error extracting text from tooltip: {str(e)}")
-                                    seller_info_text = "Error extracting seller information"
-                            else:
-                                # If couldn't find tooltip, use seller name
-                                seller_info_text = seller_name
-                                print(f"Could not find tooltip content, using seller name: {seller_name}")
-                        else:
-                            # If no tooltip button found, use seller name
-                            seller_info_text = seller_name
-                            print(f"No tooltip button found, using seller name: {seller_name}")
-                        
-                        # Check if we got full seller info with "ИНН" and "ОГРН"
-                        has_full_info = "ИНН" in seller_info_text or "ОГРН" in seller_info_text
-                        
-                        if has_full_info:
-                            # Format the seller info text exactly as required
-                            formatted_seller_info = f"=== ИНФОРМАЦИЯ О ПРОДАВЦЕ ===\n{seller_info_text}\n============================"
-                            
-                            # Save the results
-                            result = {
-                                'product_name': product_name,
-                                'product_url': product_url,
-                                'seller_name': seller_name,
-                                'seller_info': formatted_seller_info
-                            }
-                            
-                            results.append(result)
-                            
-                            # Write to CSV
-                            with open(csv_filename, 'a', newline='', encoding='utf-8') as csvfile:
-                                fieldnames = ['product_name', 'product_url', 'seller_name', 'seller_info']
-                                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                                writer.writerow(result)
-                            
-                            total_processed += 1
-                            print(f"Seller info for product saved to CSV. Progress: {total_processed}/{max_total_products}")
-                        else:
-                            print("No full seller info found, not saving to CSV")
+                        found = lookup_product_seller(driver, waiter, selector_stats, seller_cache, product_url,
+                                                      load_stats, timer)
+                        if found is None:
+                            continue
+                        seller_name, seller_key, seller_info_text, source = found
+                        if source == SOURCE_BROWSER and has_legal_details(seller_info_text):
+                            seller_cache.set(seller_key, seller_name, seller_info_text, source=SOURCE_BROWSER)
                         
-                        # Add a delay between products
-                        delay = random.uniform(2, 4)
-                        print(f"Waiting {delay:.2f} seconds before next product...")
-                        time.sleep(delay)
+                        seller_id = SellerCache.id_from_key(seller_key) or (seller.id if seller is not None else None)
+                        saved = save_result(product_name, product_url, seller_name, seller_info_text, source,
+                                            seller_id)
+                        if saved and source == SOURCE_BROWSER:
+                            seller_resolver.stats[SOURCE_BROWSER] += 1
+                    
+                    # Wait for the workers so the page checkpoint covers all its products
+                    if pool is not None:
+                        save_worker_results(pool.drain())
                     
                     # Move to next page
                     page += 1
                     
-                    # Add a delay between pages
-                    delay = random.uniform(2, 4)
-                    print(f"Waiting {delay:.2f} seconds before next page...")
-                    time.sleep(delay)
+                    # Checkpoint results and crawl frontier on disk after every page
+                    csv_writer.checkpoint()
+                    seller_cache.save()
+                    selector_stats.save()
+                    checkpoint.category_index = current_category_index
+                    checkpoint.page = page
+                    checkpoint.save()
                 
                 # Move to next category if we've finished this one
                 current_category_index += 1
+                checkpoint.category_index = current_category_index
+                checkpoint.page = 1
                 
                 # If we've processed enough products, break
                 if total_processed >= max_total_products:
-                    print(f"\nReached the maximum number of products to process ({max_total_products})")
+                    logger.info(f"Reached the maximum number of products to process ({max_total_products})")
                     break
-                
-                # Add a longer delay between categories
-                if current_category_index < len(categories):
-                    delay = random.uniform(3, 6)
-                    print(f"Waiting {delay:.2f} seconds before next category...")
-                    time.sleep(delay)
             
             # Print summary statistics
-            print("\n===== Итоговая статистика =====")
-            print(f"Всего обработано товаров: {total_processed}")
-            print(f"Товаров с полной информацией о продавце: {len(results)}/{total_processed} ({len(results)/max(total_processed, 1)*100:.1f}% успешных)")
-            print(f"Результаты сохранены в файл: {csv_filename}")
+            logger.info("===== Итоговая статистика =====")
+            logger.info(f"Всего обработано товаров: {total_processed}")
+            logger.info(f"Из них сохранено в этом запуске: {csv_writer.count}")
+            logger.info(f"Кэш продавцов: {seller_cache.hits} попаданий, {seller_cache.misses} промахов")
+            logger.info("Источники данных о продавцах: " + ", ".join(f"{source}: {count}" for source, count in seller_resolver.stats.items()))
+            waiter.print_summary()
+            load_stats.print_summary()
+            timer.print_summary()
+            if pool is not None:
+                pool.print_summary()
+            logger.info(f"Результаты сохранены в файл: {csv_filename}")
+            
+            # The crawl is complete, nothing left to resume
+            finished = True
+            checkpoint.clear()
             
-            return results
+            return csv_filename
             
         except Exception as e:
-            print(f"Error during navigation: {e}")
+            logger.error(f"Error during navigation: {e}")
             driver.save_screenshot(os.path.join(results_dir, "error_screenshot.png"))
             return None
             
     except Exception as e:
-        print(f"Error initializing Chrome driver: {e}")
+        logger.error(f"Error initializing Chrome driver: {e}")
         return None
         
     finally:
+        if pool is not None:
+            pool.close()
+        csv_writer.close()
+        timer.close()
+        if repo is not None:
+            repo.close()
+        seller_cache.save()
+        selector_stats.save()
+        if not finished:
+            checkpoint.save()
+            logger.info(f"Crawl state saved to {checkpoint.filename}, continue with --resume")
+        
         try:
             # Close the browser
             if 'driver' in locals() and driver:
                 driver.quit()
-                print("Browser closed. Scraping completed.")
+                logger.info("Browser closed. Scraping completed.")
         except Exception as e:
-            print(f"Error closing browser: {e}")
+            logger.error(f"Error closing browser: {e}")
+
+def resolve_sellers_from_db(max_sellers=100, stale_days=30, seller_cache_ttl_days=30, product_time_budget=60,
+                            selector_skip_runs=5, lean=False, use_browser=True, trace_file=None):
+    """Получает юридическую информацию для продавцов из таблицы sellers
+    
+    Вместо обхода категорий берутся только продавцы, у которых юридических
+    данных нет или они старше stale_days, начиная с продавцов с наибольшим
+    числом товаров в базе. Каждый продавец сначала разрешается по HTTP
+    (кэш, JSON-справочник WB), затем, если нужно, через его страницу в
+    браузере; результат записывается обратно в реестр продавцов.
+    
+    Args:
+        max_sellers: Максимальное количество продавцов за запуск
+        stale_days: Через сколько дней юридические данные считаются устаревшими
+        seller_cache_ttl_days: Срок жизни записей кэша продавцов в днях (0 - не использовать кэш)
+        product_time_budget: Бюджет времени на ожидания при обработке одного продавца в браузере, секунды
+        selector_skip_runs: Через сколько запусков без попаданий селектор пробуется только в резерве
+        lean: Облегченный профиль браузера
+        use_browser: Открывать страницу продавца, если по HTTP данные не получены
+        trace_file: Файл, в который каждый замер этапа пишется строкой JSON
+    
+    Returns:
+        Словарь со счетчиками resolved/unresolved и источниками данных
+    """
+    from database.repository import WildberriesRepository
+    
+    results_dir = "sellers_info"
+    os.makedirs(results_dir, exist_ok=True)
+    
+    repo = WildberriesRepository()
+    seller_cache = SellerCache(os.path.join(results_dir, "seller_cache.json"), ttl_days=seller_cache_ttl_days)
+    selector_stats = SelectorStats(os.path.join(results_dir, "selector_stats.json"), skip_after_runs=selector_skip_runs)
+    selector_stats.begin_run()
+    seller_resolver = SellerResolver(cache=seller_cache)
+    load_stats = PageLoadStats()
+    timer = StageTimer(trace_file)
+    stats = {'resolved': 0, 'unresolved': 0}
+    driver = None
+    waiter = None
+    
+    try:
+        sellers = repo.get_sellers_without_legal_info(stale_days, max_sellers)
+        logger.info(f"Sellers without fresh legal info: {len(sellers)}")
+        
+        for index, row in enumerate(sellers, start=1):
+            seller = Seller(row['id'], row['name'])
+            logger.info(f"[{index}/{len(sellers)}] Seller {seller.id} ({seller.name}), products: {row['products']}")
+            
+            # Plain HTTP first; JSON requests are cheap, a short interval between them is enough
+            time.sleep(random.uniform(0.3, 0.8))
+            with timer.span('http_resolve', seller_id=seller.id):
+                legal_info = seller_resolver.resolve_seller(seller)
+            
+            if legal_info is None and use_browser:
+                # The browser is started only when some seller actually needs it
+                if driver is None:
+                    driver = create_driver(lean=lean)
+                    waiter = PageWaiter(driver)
+                waiter.pace('seller_interval', random.uniform(2, 4))
+                waiter.start_budget(product_time_budget)
+                seller_url = f"https://www.wildberries.ru/seller/{seller.id}"
+                seller_info_text = fetch_seller_details(driver, None, seller.name, seller_url, waiter,
+                                                        selector_stats, load_stats, timer)
+                if has_legal_details(seller_info_text):
+                    seller_cache.set(SellerCache.key_for_id(seller.id), seller.name, seller_info_text,
+                                     source=SOURCE_BROWSER)
+                    seller_resolver.stats[SOURCE_BROWSER] += 1
+                    legal_info = SellerLegalInfo(seller.id, seller.name, seller_info_text, SOURCE_BROWSER)
+            
+            if legal_info is None:
+                logger.warning(f"No legal info found for seller {seller.id}")
+                repo.mark_seller_legal_info_checked(seller.id)
+                stats['unresolved'] += 1
+                continue
+            
+            # Keep the name from the sellers table, the legal name goes to the registry
+            with timer.span('db_write', seller_id=seller.id):
+                repo.save_seller_legal_info(seller.id, seller.name, LegalEntity.from_seller_info(legal_info.seller_info))
+            stats['resolved'] += 1
+            logger.info(f"Legal info for seller {seller.id} saved ({legal_info.source})")
+            
+            if index % 10 == 0:
+                seller_cache.save()
+                selector_stats.save()
+        
+        logger.info(f"Продавцов обработано: {stats['resolved']}, без юридических данных: {stats['unresolved']}")
+        logger.info("Источники данных о продавцах: " + ", ".join(f"{source}: {count}" for source, count in seller_resolver.stats.items()))
+        if waiter is not None:
+            waiter.print_summary()
+        load_stats.print_summary()
+        timer.print_summary()
+        stats.update(seller_resolver.stats)
+        return stats
+    
+    finally:
+        timer.close()
+        seller_cache.save()
+        selector_stats.save()
+        repo.close()
+        if driver is not None:
+            try:
+                driver.quit()
+            except Exception as e:
+                logger.error(f"Error closing browser: {e}")
 
 if __name__ == "__main__":
-    # Запуск скрипта с обработкой 100 товаров
-    scrape_wildberries_sellers(max_total_products=100, batch_size=10)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Сбор информации о продавцах Wildberries')
+    parser.add_argument('--mode', type=str, choices=['crawl', 'db'], default='crawl',
+                        help='crawl - обход категорий каталога, db - продавцы из таблицы sellers '
+                             'без юридических данных или с устаревшими данными')
+    parser.add_argument('--max-products', type=int, default=100,
+                        help='Максимальное количество товаров, в режиме db - продавцов (по умолчанию 100)')
+    parser.add_argument('--stale-days', type=int, default=30,
+                        help='Режим db: через сколько дней юридические данные продавца обновляются (по умолчанию 30)')
+    parser.add_argument('--no-browser', action='store_true',
+                        help='Режим db: не открывать страницу продавца, если данных нет по HTTP')
+    parser.add_argument('--batch-size', type=int, default=10,
+                        help='Размер пакета строк для записи в CSV (по умолчанию 10)')
+    parser.add_argument('--output', type=str,
+                        help='CSV-файл прерванного запуска, который нужно продолжить')
+    parser.add_argument('--resume', action='store_true',
+                        help='Продолжить обход с последней контрольной точки')
+    parser.add_argument('--state-file', type=str,
+                        help='Файл контрольной точки (по умолчанию sellers_info/crawl_state.json)')
+    parser.add_argument('--seller-cache-ttl', type=int, default=30,
+                        help='Срок жизни кэша продавцов в днях (0 - не использовать кэш)')
+    parser.add_argument('--selector-skip-runs', type=int, default=5,
+                        help='Число запусков без попаданий, после которого селектор пробуется только в резерве')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Количество параллельных headless-браузеров для страниц товаров (по умолчанию 1)')
+    parser.add_argument('--lean', action='store_true',
+                        help='Облегченный браузер: без окна, картинок, медиа, шрифтов и сторонних запросов')
+    parser.add_argument('--discovery', type=str, choices=['api', 'browser'], default='api',
+                        help='Источник товаров: JSON-выдача каталога (api) или страницы категорий в браузере (browser)')
+    parser.add_argument('--trace', type=str,
+                        help='Файл для трассировки этапов (JSON lines, по строке на замер)')
+    parser.add_argument('--log-level', type=str, default='INFO',
+                        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        help='Уровень логирования (DEBUG - подробный ход поиска элементов)')
+    parser.add_argument('--product-budget', type=int, default=60,
+                        help='Бюджет времени на обработку товара в браузере, секунды (по умолчанию 60)')
+    parser.add_argument('--db', action='store_true',
+                        help='Сохранять юридические данные продавцов (ИНН, ОГРН, адрес) в реестр в БД')
+    args = parser.parse_args()
+    configure_logging(args.log_level)
+    
+    if args.mode == 'db':
+        resolve_sellers_from_db(max_sellers=args.max_products, stale_days=args.stale_days,
+                                seller_cache_ttl_days=args.seller_cache_ttl, product_time_budget=args.product_budget,
+                                selector_skip_runs=args.selector_skip_runs, lean=args.lean,
+                                use_browser=not args.no_browser, trace_file=args.trace)
+    else:
+        scrape_wildberries_sellers(max_total_products=args.max_products, batch_size=args.batch_size,
+                                   output_file=args.output, resume=args.resume, state_file=args.state_file,
+                                   seller_cache_ttl_days=args.seller_cache_ttl, product_time_budget=args.product_budget,
+                                   selector_skip_runs=args.selector_skip_runs, workers=args.workers,
+                                   lean=args.lean, discovery=args.discovery,
+                                   trace_file=args.trace, log_level=args.log_level, save_to_db=args.db)
\ No newline at end of file
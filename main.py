@@ -5,20 +5,68 @@ import argparse
 from loguru import logger
 from pathlib import Path
 from datetime import datetime
+from contextlib import nullcontext
 
-from parser.scraper import WildBerriesScraper
-from database.repository import WildberriesRepository
-from parser.helpers import save_to_json
+from models.entities import Product
+from parser.metrics import REGISTRY
+from parser.profiling import stage
 
-# Настройка логирования
-logger.remove()
-logger.add(sys.stderr, level="INFO")
-logger.add("logs/parser_{time}.log", rotation="10 MB", retention="1 week", level="DEBUG")
+# Тяжелые зависимости (requests, psycopg2, pandas, pyarrow) импортируются внутри
+# функций режимов, которым они нужны: разовый запуск --mode product --no-db
+# не должен платить за загрузку драйвера БД и pandas
 
-def parse_product(product_id, save_to_db=True, save_json=False):
-    """Парсит данные о товаре"""
-    scraper = WildBerriesScraper()
-    repo = WildberriesRepository() if save_to_db else None
+def configure_logging():
+    """Лог в stderr и в файл logs/parser_<время>.log (файл создается только при запуске из командной строки)"""
+    logger.remove()
+    logger.add(sys.stderr, level="INFO")
+    logger.add("logs/parser_{time}.log", rotation="10 MB", retention="1 week", level="DEBUG")
+
+# Ключ раздела Parquet-датасета для каждого вида выгрузки
+PARQUET_PARTITION_KEYS = {
+    'categories': 'category_id',
+    'sellers': 'seller_id',
+    'search': 'query'
+}
+
+def open_output(dataset, name, output_format='json', compression=None):
+    """Открывает потоковую запись результатов
+    
+    Args:
+        dataset: Вид выгрузки (products, categories, sellers, search)
+        name: ID товара, категории, продавца или поисковый запрос
+        output_format: json - NDJSON-файл data/<dataset>/<name>.ndjson,
+            parquet - датасет data/parquet/<dataset> с разбиением по дате обхода
+        compression: Сжатие (gzip или zstd)
+    """
+    if output_format == 'parquet':
+        from parser.parquet_sink import ParquetDatasetWriter
+        
+        root = str(Path("data/parquet") / dataset)
+        if dataset in PARQUET_PARTITION_KEYS:
+            return ParquetDatasetWriter(root, partitions={PARQUET_PARTITION_KEYS[dataset]: name},
+                                        compression=compression)
+        # Отдельные товары раскладываем по продавцу
+        return ParquetDatasetWriter(root, partition_column='seller_id', compression=compression)
+    
+    from parser.helpers import NdjsonWriter
+    
+    json_path = Path(f"data/{dataset}/{name}.ndjson")
+    json_path.parent.mkdir(parents=True, exist_ok=True)
+    return NdjsonWriter(str(json_path), compression=compression)
+
+def parse_product(product_id, save_to_db=True, save_json=False, compression=None, output_format='json',
+                  scraper=None, repo=None):
+    """Парсит данные о товаре
+    
+    Скрапер и репозиторий можно передать уже созданными (режим daemon),
+    чтобы не открывать заново HTTP-сессию и соединение с БД.
+    """
+    if scraper is None:
+        from parser.scraper import WildBerriesScraper
+        scraper = WildBerriesScraper()
+    if save_to_db and repo is None:
+        from database.repository import WildberriesRepository
+        repo = WildberriesRepository()
     
     logger.info(f"Начинаем парсинг товара: {product_id}")
     
@@ -32,202 +80,588 @@ def parse_product(product_id, save_to_db=True, save_json=False):
     
     # Сохраняем в базу данных
     if save_to_db:
-        db_id = repo.save_product(product_data)
+        with stage('persist'):
+            db_id = repo.save_product(product_data)
         logger.info(f"Товар {product_id} сохранен в БД с ID: {db_id}")
     
     # Сохраняем в JSON
     if save_json:
-        json_path = Path(f"data/products/{product_id}.json")
-        json_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        save_to_json(product_data, str(json_path))
-        logger.info(f"Товар {product_id} сохранен в JSON: {json_path}")
+        with stage('persist'), open_output('products', product_id, output_format, compression) as writer:
+            writer.write_product(product_data)
+        logger.info(f"Товар {product_id} сохранен в {output_format}: {writer.filename}")
     
     return product_data
 
-def parse_category(category_id, max_pages=1, save_to_db=True, save_json=False):
-    """Парсит товары из категории"""
-    scraper = WildBerriesScraper()
+def save_listing_batch(items, writer=None, save_to_db=True, repo=None):
+    """Обрабатывает выдачу колоночным пакетом и сохраняет ее целиком
     
-    logger.info(f"Начинаем парсинг категории: {category_id}")
+    Переданный repo не закрывается: им владеет вызывающий код.
+    """
+    from parser.batch import ListingBatch
     
-    all_products = []
+    with stage('normalize'):
+        batch = ListingBatch()
+        batch.add_page(items)
+        products, stocks = batch.frames()
     
-    for page in range(1, max_pages + 1):
-        logger.info(f"Парсинг страницы {page} категории {category_id}")
-        
-        products = scraper.get_category_products(category_id, page=page)
-        
-        if not products:
-            logger.warning(f"Нет товаров на странице {page} категории {category_id}")
-            break
-        
-        logger.info(f"Найдено {len(products)} товаров на странице {page}")
-        all_products.extend(products)
+    logger.info(f"В пакете {len(products)} уникальных товаров из {len(batch)}")
+    
+    if writer is not None:
+        with stage('persist'):
+            writer.write_many(batch.records(products))
+    
+    if save_to_db and repo is not None:
+        with stage('persist'):
+            repo.save_listing_batch(products, stocks)
+    elif save_to_db:
+        from database.repository import WildberriesRepository
         
-        # Задержка между запросами страниц
-        time.sleep(2)
+        repo = WildberriesRepository()
+        try:
+            with stage('persist'):
+                repo.save_listing_batch(products, stocks)
+        finally:
+            repo.close()
     
-    logger.info(f"Всего найдено {len(all_products)} товаров в категории {category_id}")
+    return products
+
+def parse_listing(fetch_page, max_pages, label, output=None, save_to_db=True, batch=False, scraper=None, repo=None):
+    """Обходит страницы выдачи (категория, продавец, поиск) и сохраняет товары
     
-    # Если нужно сохранить в JSON
-    if save_json:
-        json_path = Path(f"data/categories/{category_id}.json")
-        json_path.parent.mkdir(parents=True, exist_ok=True)
+    Args:
+        fetch_page: Функция, возвращающая товары страницы по ее номеру
+        max_pages: Максимальное количество страниц
+        label: Описание выдачи для логов, например "категории 123"
+        output: Аргументы open_output (вид выгрузки, имя, формат, сжатие) или None
+        save_to_db: Сохранять ли товары в БД
+        batch: Обрабатывать выдачу колоночным пакетом
+        scraper: Скрапер для получения полных данных товаров (если не пакетом)
+        repo: Общий репозиторий (режим daemon); без него создается свой
+    """
+    all_products = []
+    writer = open_output(*output) if output is not None else None
+    
+    with writer or nullcontext():
+        for page in range(1, max_pages + 1):
+            logger.info(f"Парсинг страницы {page} {label}")
+            
+            products = fetch_page(page)
+            
+            if not products:
+                logger.warning(f"Нет товаров на странице {page} {label}")
+                break
+            
+            logger.info(f"Найдено {len(products)} товаров на странице {page}")
+            
+            if batch:
+                all_products.extend(products)
+            else:
+                with stage('normalize'):
+                    products = [Product.from_listing_payload(item) for item in products]
+                all_products.extend(products)
+                # Пишем товары сразу по мере разбора страницы
+                if writer is not None:
+                    with stage('persist'):
+                        for product in products:
+                            writer.write_product(product)
+            
+            # Задержка между запросами страниц
+            time.sleep(2)
         
-        save_to_json(all_products, str(json_path))
-        logger.info(f"Товары категории {category_id} сохранены в JSON: {json_path}")
+        logger.info(f"Всего найдено {len(all_products)} товаров {label}")
+        
+        # Колоночный режим: вся выдача обрабатывается и сохраняется одним пакетом
+        if batch:
+            all_products = save_listing_batch(all_products, writer=writer, save_to_db=save_to_db, repo=repo)
+    
+    if writer is not None:
+        logger.info(f"Товары {label} сохранены: {writer.filename}")
     
     # Если нужно сохранить в БД, парсим каждый товар отдельно для получения полных данных
-    if save_to_db:
-        logger.info(f"Начинаем сохранение товаров категории {category_id} в БД")
+    if save_to_db and not batch:
+        logger.info(f"Начинаем сохранение товаров {label} в БД")
         
         for product in all_products:
-            product_id = product.get('id', product.get('nmId'))
-            if product_id:
-                parse_product(product_id, save_to_db=True, save_json=False)
+            if product.wb_id:
+                parse_product(product.wb_id, save_to_db=True, save_json=False, scraper=scraper, repo=repo)
                 # Задержка между запросами
                 time.sleep(2)
     
     return all_products
 
-def parse_seller(seller_id, max_pages=1, save_to_db=True, save_json=False):
+def parse_category(category_id, max_pages=1, save_to_db=True, save_json=False, batch=False,
+                   compression=None, output_format='json', scraper=None, repo=None):
+    """Парсит товары из категории"""
+    if scraper is None:
+        from parser.scraper import WildBerriesScraper
+        scraper = WildBerriesScraper()
+    
+    logger.info(f"Начинаем парсинг категории: {category_id}")
+    
+    return parse_listing(
+        lambda page: scraper.get_category_products(category_id, page=page),
+        max_pages,
+        f"категории {category_id}",
+        output=('categories', category_id, output_format, compression) if save_json else None,
+        save_to_db=save_to_db,
+        batch=batch,
+        scraper=scraper,
+        repo=repo
+    )
+
+def parse_seller(seller_id, max_pages=1, save_to_db=True, save_json=False, batch=False,
+                 compression=None, output_format='json', scraper=None, repo=None):
     """Парсит товары продавца"""
-    scraper = WildBerriesScraper()
+    if scraper is None:
+        from parser.scraper import WildBerriesScraper
+        scraper = WildBerriesScraper()
     
     logger.info(f"Начинаем парсинг продавца: {seller_id}")
     
-    all_products = []
+    return parse_listing(
+        lambda page: scraper.get_seller_products(seller_id, page=page),
+        max_pages,
+        f"продавца {seller_id}",
+        output=('sellers', seller_id, output_format, compression) if save_json else None,
+        save_to_db=save_to_db,
+        batch=batch,
+        scraper=scraper,
+        repo=repo
+    )
+
+def search_and_parse(query, max_pages=1, save_to_db=True, save_json=False, batch=False,
+                     compression=None, output_format='json', scraper=None, repo=None):
+    """Ищет и парсит товары по запросу"""
+    if scraper is None:
+        from parser.scraper import WildBerriesScraper
+        scraper = WildBerriesScraper()
     
-    for page in range(1, max_pages + 1):
-        logger.info(f"Парсинг страницы {page} продавца {seller_id}")
-        
-        products = scraper.get_seller_products(seller_id, page=page)
-        
-        if not products:
-            logger.warning(f"Нет товаров на странице {page} продавца {seller_id}")
-            break
-        
-        logger.info(f"Найдено {len(products)} товаров на странице {page}")
-        all_products.extend(products)
-        
-        # Задержка между запросами страниц
-        time.sleep(2)
+    logger.info(f"Начинаем поиск товаров по запросу: {query}")
     
-    logger.info(f"Всего найдено {len(all_products)} товаров у продавца {seller_id}")
+    safe_query = "".join(c for c in query if c.isalnum() or c in [' ', '_']).strip().replace(' ', '_')
     
-    # Если нужно сохранить в JSON
-    if save_json:
-        json_path = Path(f"data/sellers/{seller_id}.json")
-        json_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        save_to_json(all_products, str(json_path))
-        logger.info(f"Товары продавца {seller_id} сохранены в JSON: {json_path}")
+    return parse_listing(
+        lambda page: scraper.search_products(query, page=page),
+        max_pages,
+        f"поискового запроса '{query}'",
+        output=('search', safe_query, output_format, compression) if save_json else None,
+        save_to_db=save_to_db,
+        batch=batch,
+        scraper=scraper,
+        repo=repo
+    )
+
+def find_sellers_by_inn(inn):
+    """Выводит всех продавцов с данным ИНН из реестра юридических лиц
     
-    # Если нужно сохранить в БД, парсим каждый товар отдельно для получения полных данных
-    if save_to_db:
-        logger.info(f"Начинаем сохранение товаров продавца {seller_id} в БД")
-        
-        for product in all_products:
-            product_id = product.get('id', product.get('nmId'))
-            if product_id:
-                parse_product(product_id, save_to_db=True, save_json=False)
-                # Задержка между запросами
-                time.sleep(2)
+    Кроме магазинов WB выводятся товары, загруженные из CSV-выгрузок inn.py:
+    в них продавец известен только по юридическим данным.
+    """
+    from database.repository import WildberriesRepository
     
-    return all_products
+    repo = WildberriesRepository()
+    try:
+        sellers = repo.get_sellers_by_inn(inn)
+        products = repo.get_products_by_inn(inn)
+    finally:
+        repo.close()
+    
+    if not sellers and not products:
+        logger.warning(f"Продавцы с ИНН {inn} не найдены")
+        return []
+    
+    logger.info(f"Продавцов с ИНН {inn}: {len(sellers)}, товаров из CSV-выгрузок: {len(products)}")
+    for seller in sellers:
+        print(json.dumps(seller, ensure_ascii=False, default=str))
+    for product in products:
+        print(json.dumps(product, ensure_ascii=False, default=str))
+    return sellers
 
-def search_and_parse(query, max_pages=1, save_to_db=True, save_json=False):
-    """Ищет и парсит товары по запросу"""
+def import_seller_csv(paths, force=False):
+    """Загружает CSV-выгрузки inn.py в реестр юридических лиц"""
+    from database.csv_import import SellerCsvImporter, LEGACY_CSV_PATTERN
+    from database.repository import WildberriesRepository
+    
+    repo = WildberriesRepository()
+    try:
+        return SellerCsvImporter(repo, force=force).import_files(paths or [LEGACY_CSV_PATTERN])
+    finally:
+        repo.close()
+
+def refresh_entity(entity, scraper, repo, save_json=False, batch=False, compression=None, output_format='json'):
+    """Обновляет отслеживаемую сущность демона; возвращает True при успехе"""
+    options = dict(save_to_db=repo is not None, save_json=save_json, compression=compression,
+                   output_format=output_format, scraper=scraper, repo=repo)
+    kind, entity_id = entity['kind'], entity['id']
+    if kind == 'product':
+        return parse_product(entity_id, **options) is not None
+    
+    listings = {'category': parse_category, 'seller': parse_seller, 'search': search_and_parse}
+    # Пустая выдача у отслеживаемой сущности обычно означает блокировку или сбой API
+    return bool(listings[kind](entity_id, max_pages=entity.get('pages', 1), batch=batch, **options))
+
+def run_daemon(args, save_output, output_format):
+    """Обновляет отслеживаемые сущности по расписанию в одном долгоживущем процессе
+    
+    HTTP-сессия скрапера (с кэшами), соединение с БД и кэши репозитория
+    создаются один раз и переиспользуются всеми обновлениями. Набор
+    сущностей хранится в args.state_file и меняется через локальный
+    интерфейс управления (режимы track и untrack).
+    """
+    import signal
+    import threading
+    from parser.scraper import WildBerriesScraper
+    from parser.scheduler import RefreshScheduler, serve_control
+    
     scraper = WildBerriesScraper()
+    repo = planner = None
+    if not args.no_db:
+        from database.repository import WildberriesRepository
+        repo = WildberriesRepository()
+        if not args.fixed_intervals:
+            from parser.revisit import RevisitPlanner
+            # Интервалы товаров подстраиваются под частоту смены их цен
+            planner = RevisitPlanner(repo, min_interval=args.min_interval, max_interval=args.max_interval)
     
-    logger.info(f"Начинаем поиск товаров по запросу: {query}")
+    scheduler = RefreshScheduler(args.state_file, planner=planner)
+    server = serve_control(scheduler, args.control_port)
+    logger.info(f"Демон запущен: отслеживается {len(scheduler)} сущностей, "
+                f"управление на http://127.0.0.1:{args.control_port}/entities")
     
-    all_products = []
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    try:
+        while not stop.is_set():
+            entity = scheduler.wait_due(stop=stop)
+            if entity is None:
+                continue
+            
+            logger.info(f"Обновление {entity['kind']} {entity['id']}")
+            started = time.perf_counter()
+            try:
+                success = refresh_entity(entity, scraper, repo, save_json=save_output, batch=args.batch,
+                                         compression=args.compress, output_format=output_format)
+            except Exception as e:
+                logger.error(f"Ошибка при обновлении {entity['kind']} {entity['id']}: {e}")
+                success = False
+            REGISTRY.observe('wb_daemon_refresh_duration_seconds', time.perf_counter() - started,
+                             kind=entity['kind'])
+            REGISTRY.inc('wb_daemon_refreshes_total', kind=entity['kind'], status='ok' if success else 'error')
+            
+            scheduler.complete(entity, success)
+            scheduler.save()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        logger.info("Демон останавливается")
+        server.shutdown()
+        scheduler.save()
+        if repo is not None:
+            repo.close()
+
+def control_daemon(args):
+    """Добавляет (track) или удаляет (untrack) отслеживаемую сущность работающего демона"""
+    from parser.scheduler import control_request
     
-    for page in range(1, max_pages + 1):
-        logger.info(f"Парсинг страницы {page} поискового запроса '{query}'")
-        
-        products = scraper.search_products(query, page=page)
-        
-        if not products:
-            logger.warning(f"Нет товаров на странице {page} поискового запроса '{query}'")
-            break
-        
-        logger.info(f"Найдено {len(products)} товаров на странице {page}")
-        all_products.extend(products)
-        
-        # Задержка между запросами страниц
-        time.sleep(2)
+    entity_id = args.query if args.kind == 'search' and args.query else args.id
+    if args.mode == 'track' and not args.kind:
+        # Без --kind выводим текущий набор сущностей
+        status, response = control_request(args.control_port, 'GET', '/entities')
+    elif not args.kind or not entity_id:
+        logger.error("Необходимо указать --kind и --id (или --query для поиска)")
+        return
+    elif args.mode == 'track':
+        status, response = control_request(args.control_port, 'POST', '/entities', {
+            'kind': args.kind, 'id': entity_id, 'interval': args.interval,
+            'priority': args.priority, 'pages': args.pages
+        })
+    else:
+        from urllib.parse import quote
+        status, response = control_request(args.control_port, 'DELETE',
+                                           f"/entities/{args.kind}/{quote(entity_id, safe='')}")
     
-    logger.info(f"Всего найдено {len(all_products)} товаров по запросу '{query}'")
+    if status >= 400:
+        logger.error(f"Демон вернул ошибку {status}: {response}")
+        return
+    if response is not None:
+        print(json.dumps(response, ensure_ascii=False, indent=2))
+
+def run_worker(args, save_output, output_format):
+    """Исполнитель заданий из общей очереди в PostgreSQL (crawl_jobs)
     
-    # Если нужно сохранить в JSON
-    if save_json:
-        safe_query = "".join(c for c in query if c.isalnum() or c in [' ', '_']).strip().replace(' ', '_')
-        json_path = Path(f"data/search/{safe_query}.json")
-        json_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        save_to_json(all_products, str(json_path))
-        logger.info(f"Товары по запросу '{query}' сохранены в JSON: {json_path}")
+    Исполнители на разных хостах забирают задания по одному, не мешая друг
+    другу (SKIP LOCKED), поэтому каждый новый хост добавляет пропускную
+    способность. Пока задание выполняется, фоновый поток продлевает его
+    аренду через отдельное соединение. Неудачное задание возвращается в
+    очередь с экспоненциальной задержкой или, когда попытки исчерпаны,
+    переводится в dead.
+    """
+    import os
+    import socket
+    import signal
+    import threading
+    from parser.scraper import WildBerriesScraper
+    from parser.anti_block import exponential_backoff
+    from database.job_queue import JobQueue
     
-    # Если нужно сохранить в БД, парсим каждый товар отдельно для получения полных данных
-    if save_to_db:
-        logger.info(f"Начинаем сохранение товаров по запросу '{query}' в БД")
-        
-        for product in all_products:
-            product_id = product.get('id', product.get('nmId'))
-            if product_id:
-                parse_product(product_id, save_to_db=True, save_json=False)
-                # Задержка между запросами
-                time.sleep(2)
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    queue = JobQueue(worker_id=worker_id)
+    leases = JobQueue(worker_id=worker_id)
+    scraper = WildBerriesScraper()
+    repo = None
+    if not args.no_db:
+        from database.repository import WildberriesRepository
+        repo = WildberriesRepository()
     
-    return all_products
+    stop = threading.Event()
+    running = set()
+    
+    def extend_leases():
+        while not stop.wait(args.lease / 3):
+            job_ids = list(running)
+            try:
+                kept = leases.extend_leases(job_ids, lease_seconds=args.lease)
+            except Exception as e:
+                logger.error(f"Ошибка при продлении аренды заданий: {e}")
+                continue
+            for job_id in set(job_ids) - set(kept):
+                logger.warning(f"Аренда задания {job_id} потеряна: его может выполнить другой исполнитель")
+    
+    threading.Thread(target=extend_leases, name='job-leases', daemon=True).start()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    logger.info(f"Исполнитель {worker_id} запущен")
+    try:
+        while not stop.is_set():
+            jobs = queue.claim(limit=1, lease_seconds=args.lease)
+            if not jobs:
+                stop.wait(args.poll)
+                continue
+            
+            job = jobs[0]
+            logger.info(f"Задание {job['id']}: {job['kind']} {job['target']} (попытка {job['attempts']})")
+            running.add(job['id'])
+            error = None
+            try:
+                entity = {'kind': job['kind'], 'id': job['target'], 'pages': job['pages']}
+                if not refresh_entity(entity, scraper, repo, save_json=save_output, batch=args.batch,
+                                      compression=args.compress, output_format=output_format):
+                    error = "не удалось получить данные"
+            except Exception as e:
+                error = str(e)
+            finally:
+                running.discard(job['id'])
+            
+            try:
+                if error is None:
+                    status = 'done' if queue.complete(job['id']) else None
+                else:
+                    logger.error(f"Задание {job['id']} не выполнено: {error}")
+                    status = queue.fail(job['id'], error, retry_delay=exponential_backoff(
+                        job['attempts'], base_delay=30, max_delay=3600))
+            except Exception as e:
+                # Отчет не записан: по истечении аренды задание заберут снова
+                logger.error(f"Ошибка при отчете о задании {job['id']}: {e}")
+                continue
+            if status is None:
+                logger.warning(f"Задание {job['id']} уже передано другому исполнителю")
+                status = 'lost'
+            REGISTRY.inc('wb_queue_jobs_total', kind=job['kind'], status=status)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        logger.info(f"Исполнитель {worker_id} останавливается")
+        queue.close()
+        leases.close()
+        if repo is not None:
+            repo.close()
 
-def main():
-    """Основная функция"""
-    parser = argparse.ArgumentParser(description='Парсер WildBerries')
-    parser.add_argument('--mode', type=str, choices=['product', 'category', 'seller', 'search'], required=True,
-                        help='Режим работы парсера')
-    parser.add_argument('--id', type=str, help='ID товара, категории или продавца')
-    parser.add_argument('--query', type=str, help='Поисковый запрос')
-    parser.add_argument('--pages', type=int, default=1, help='Количество страниц для парсинга (по умолчанию 1)')
-    parser.add_argument('--no-db', action='store_true', help='Не сохранять в базу данных')
-    parser.add_argument('--json', action='store_true', help='Сохранять результаты в JSON')
+def enqueue_jobs(args):
+    """Ставит задания в общую очередь; --id может содержать несколько ID через запятую"""
+    from database.job_queue import JobQueue
     
-    args = parser.parse_args()
+    if args.kind == 'search' and args.query:
+        targets = [args.query]
+    else:
+        targets = [target.strip() for target in (args.id or '').split(',') if target.strip()]
+    if not args.kind or not targets:
+        logger.error("Необходимо указать --kind и --id (или --query для поиска)")
+        return
     
-    # Создаем папку для логов
-    Path("logs").mkdir(exist_ok=True)
+    queue = JobQueue()
+    try:
+        created = queue.enqueue([{'kind': args.kind, 'target': target, 'pages': args.pages, 'priority': args.priority}
+                                 for target in targets], max_attempts=args.max_attempts)
+    finally:
+        queue.close()
+    if created is not None:
+        logger.info(f"Поставлено заданий: {created} из {len(targets)} (остальные уже в очереди)")
+
+def show_queue(args):
+    """Выводит состояние очереди заданий и задания в dead; с --requeue возвращает их в очередь"""
+    from database.job_queue import JobQueue
     
-    # Режим работы
+    queue = JobQueue()
+    try:
+        if args.requeue:
+            logger.info(f"Возвращено в очередь заданий из dead: {queue.requeue_dead(args.kind)}")
+        for row in queue.stats():
+            print(json.dumps(row, ensure_ascii=False, default=str))
+        for row in queue.dead_jobs():
+            print(json.dumps(row, ensure_ascii=False, default=str))
+    finally:
+        queue.close()
+
+def run_mode(args, save_output, output_format):
+    """Запускает выбранный режим работы парсера"""
     if args.mode == 'product':
         if not args.id:
             logger.error("Необходимо указать ID товара для режима 'product'")
             return
         
-        parse_product(args.id, save_to_db=not args.no_db, save_json=args.json)
+        parse_product(args.id, save_to_db=not args.no_db, save_json=save_output, compression=args.compress,
+                      output_format=output_format)
         
     elif args.mode == 'category':
         if not args.id:
             logger.error("Необходимо указать ID категории для режима 'category'")
             return
         
-        parse_category(args.id, max_pages=args.pages, save_to_db=not args.no_db, save_json=args.json)
+        parse_category(args.id, max_pages=args.pages, save_to_db=not args.no_db, save_json=save_output,
+                       batch=args.batch, compression=args.compress, output_format=output_format)
         
     elif args.mode == 'seller':
         if not args.id:
             logger.error("Необходимо указать ID продавца для режима 'seller'")
             return
         
-        parse_seller(args.id, max_pages=args.pages, save_to_db=not args.no_db, save_json=args.json)
+        parse_seller(args.id, max_pages=args.pages, save_to_db=not args.no_db, save_json=save_output,
+                     batch=args.batch, compression=args.compress, output_format=output_format)
         
     elif args.mode == 'search':
         if not args.query:
             logger.error("Необходимо указать поисковый запрос для режима 'search'")
             return
         
-        search_and_parse(args.query, max_pages=args.pages, save_to_db=not args.no_db, save_json=args.json)
+        search_and_parse(args.query, max_pages=args.pages, save_to_db=not args.no_db, save_json=save_output,
+                         batch=args.batch, compression=args.compress, output_format=output_format)
+        
+    elif args.mode == 'inn':
+        if not args.id:
+            logger.error("Необходимо указать ИНН для режима 'inn'")
+            return
+        
+        find_sellers_by_inn(args.id)
+        
+    elif args.mode == 'import':
+        import_seller_csv(args.path, force=args.force)
+        
+    elif args.mode == 'daemon':
+        run_daemon(args, save_output, output_format)
+        
+    elif args.mode in ('track', 'untrack'):
+        control_daemon(args)
+        
+    elif args.mode == 'worker':
+        run_worker(args, save_output, output_format)
+        
+    elif args.mode == 'enqueue':
+        enqueue_jobs(args)
+        
+    elif args.mode == 'queue':
+        show_queue(args)
+
+def main():
+    """Основная функция"""
+    parser = argparse.ArgumentParser(description='Парсер WildBerries')
+    parser.add_argument('--mode', type=str, choices=['product', 'category', 'seller', 'search', 'inn', 'import',
+                                                      'daemon', 'track', 'untrack', 'worker', 'enqueue', 'queue'],
+                        required=True,
+                        help='Режим работы парсера')
+    parser.add_argument('--id', type=str, help='ID товара, категории или продавца, ИНН для режима inn, '
+                             'несколько ID через запятую для режима enqueue')
+    parser.add_argument('--query', type=str, help='Поисковый запрос')
+    parser.add_argument('--pages', type=int, default=1, help='Количество страниц для парсинга (по умолчанию 1)')
+    parser.add_argument('--no-db', action='store_true', help='Не сохранять в базу данных')
+    parser.add_argument('--json', action='store_true', help='Сохранять результаты в JSON (NDJSON, по записи на строку)')
+    parser.add_argument('--format', type=str, choices=['json', 'parquet'],
+                        help='Формат выгрузки: json (NDJSON) или parquet (датасет с разбиением по дате обхода)')
+    parser.add_argument('--compress', type=str, choices=['gzip', 'zstd'],
+                        help='Сжатие файлов с результатами')
+    parser.add_argument('--path', type=str, nargs='*',
+                        help='CSV-файлы inn.py, маски или каталоги для режима import '
+                             '(по умолчанию sellers_info/wildberries_sellers_*.csv)')
+    parser.add_argument('--force', action='store_true',
+                        help='Загружать в режиме import и уже загруженные файлы')
+    parser.add_argument('--kind', type=str, choices=['product', 'seller', 'category', 'search'],
+                        help='Вид сущности для режимов track, untrack и enqueue (track без --kind выводит набор '
+                             'сущностей, queue с --kind возвращает из dead только задания этого вида)')
+    parser.add_argument('--interval', type=int,
+                        help='Интервал обновления сущности в режиме track, секунды (по умолчанию зависит от вида)')
+    parser.add_argument('--priority', type=int, default=0,
+                        help='Приоритет сущности в режиме track (при одинаковом сроке раньше обновляется больший) '
+                             'и задания в режиме enqueue (раньше забирается больший)')
+    parser.add_argument('--min-interval', type=int, default=900,
+                        help='Минимальный интервал обновления товара в режиме daemon, секунды (по умолчанию 900)')
+    parser.add_argument('--max-interval', type=int, default=86400,
+                        help='Максимальный интервал обновления товара в режиме daemon, секунды (по умолчанию 86400)')
+    parser.add_argument('--fixed-intervals', action='store_true',
+                        help='Обновлять товары в режиме daemon с постоянным интервалом, '
+                             'без подстройки под историю цен и остатков')
+    parser.add_argument('--lease', type=int, default=600,
+                        help='Аренда задания исполнителем в режиме worker, секунды (по умолчанию 600)')
+    parser.add_argument('--poll', type=float, default=5,
+                        help='Пауза исполнителя при пустой очереди, секунды (по умолчанию 5)')
+    parser.add_argument('--max-attempts', type=int, default=5,
+                        help='Попыток задания до перевода в dead в режиме enqueue (по умолчанию 5)')
+    parser.add_argument('--requeue', action='store_true',
+                        help='Вернуть в очередь задания из dead в режиме queue')
+    parser.add_argument('--control-port', type=int, default=8765,
+                        help='Порт локального интерфейса управления демона (по умолчанию 8765)')
+    parser.add_argument('--state-file', type=str, default='data/daemon_state.json',
+                        help='Файл с набором отслеживаемых сущностей демона (по умолчанию data/daemon_state.json)')
+    parser.add_argument('--metrics-port', type=int,
+                        help='Отдавать метрики в формате Prometheus на http://127.0.0.1:<порт>/metrics')
+    parser.add_argument('--metrics-file', type=str,
+                        help='Файл метрик в формате Prometheus (для textfile collector node_exporter), '
+                             'обновляется во время работы и при завершении')
+    parser.add_argument('--profile', type=str, nargs='?', const='profiles',
+                        help='Профилировать запуск (CPU и память по этапам fetch/decode/normalize/persist) '
+                             'и записать отчет в каталог (по умолчанию profiles/<время запуска>)')
+    parser.add_argument('--batch', action='store_true',
+                        help='Обрабатывать выдачу колоночным пакетом и сохранять в БД одной транзакцией')
+    
+    args = parser.parse_args()
+    
+    # --json оставлен для совместимости и равнозначен --format json
+    save_output = args.json or args.format is not None
+    output_format = args.format or 'json'
+    
+    # Создаем папку для логов
+    Path("logs").mkdir(exist_ok=True)
+    configure_logging()
+    
+    # Метрики HTTP-запросов и записи в БД
+    if args.metrics_port:
+        REGISTRY.serve(args.metrics_port)
+        logger.info(f"Метрики доступны на http://127.0.0.1:{args.metrics_port}/metrics")
+    stop_dump = REGISTRY.dump_periodically(args.metrics_file) if args.metrics_file else None
+    
+    profiler = None
+    if args.profile:
+        from parser.profiling import StageProfiler
+        profiler = StageProfiler().start()
+    
+    try:
+        run_mode(args, save_output, output_format)
+    finally:
+        if profiler is not None:
+            profiler.stop()
+            report = profiler.write_report(str(Path(args.profile) / datetime.now().strftime("%Y%m%d_%H%M%S")))
+            logger.info(f"Отчет профилирования: {report}")
+        if stop_dump is not None:
+            stop_dump.set()
+            REGISTRY.write_textfile(args.metrics_file)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,8 +1,56 @@
+import re
 from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 
-@dataclass
+NO_CATEGORY = "Без категории"
+
+# Рамка, в которую inn.py заключает текст подсказки продавца
+LEGAL_INFO_HEADER = "=== ИНФОРМАЦИЯ О ПРОДАВЦЕ ==="
+LEGAL_INFO_FOOTER = "============================"
+
+# Строки подсказки вида "ИНН: 1234567890"
+_LEGAL_FIELD_RE = re.compile(r'^(ОГРНИП|ОГРН|ИНН|КПП|Номер регистрации)\s*:\s*(.*)$', re.IGNORECASE)
+
+# Организационно-правовые формы: полное название (начало, без учета регистра) и сокращение.
+# Полные названия обрезаны до надежной части: в данных WB встречаются опечатки ("ответсвенностью")
+_ENTITY_TYPES = (
+    ('индивидуальный предприниматель', 'ИП'),
+    ('общество с ограниченной', 'ООО'),
+    ('публичное акционерное', 'ПАО'),
+    ('непубличное акционерное', 'НАО'),
+    ('закрытое акционерное', 'ЗАО'),
+    ('открытое акционерное', 'ОАО'),
+    ('акционерное общество', 'АО'),
+)
+_ENTITY_ABBREVIATIONS = ('ИП', 'ООО', 'ПАО', 'НАО', 'ЗАО', 'ОАО', 'АО')
+
+
+def extract_category(payload: Dict[str, Any]) -> str:
+    """Извлекает название категории (предмета) из данных WB"""
+    subj = payload.get('subj')
+    if subj and 'name' in subj:
+        return subj['name']
+    return NO_CATEGORY
+
+
+def extract_listing_id(payload: Dict[str, Any]) -> str:
+    """Извлекает артикул товара из элемента выдачи (id или, в старых ответах, nmId)"""
+    return str(payload.get('id', payload.get('nmId', '')))
+
+
+def extract_stocks(payload: Dict[str, Any]) -> Dict[int, int]:
+    """Суммирует остатки по складам из размеров товара за один проход"""
+    stocks: Dict[int, int] = {}
+    get = stocks.get
+    for size in payload.get('sizes') or ():
+        for stock in size.get('stocks') or ():
+            warehouse_id = stock.get('wh', 0)
+            stocks[warehouse_id] = get(warehouse_id, 0) + stock.get('qty', 0)
+    return stocks
+
+
+@dataclass(slots=True)
 class Price:
     """Модель данных о цене товара"""
     current: float
@@ -10,7 +58,29 @@ class Price:
     discount_percentage: Optional[float] = None
     timestamp: datetime = field(default_factory=datetime.now)
 
-@dataclass
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any], timestamp: Optional[datetime] = None) -> 'Price':
+        """Создает цену из данных WB (salePriceU/priceU указаны в копейках)"""
+        sale_price = payload.get('salePriceU')
+        current = sale_price / 100 if sale_price is not None else 0
+        base_price = payload.get('priceU')
+        original = base_price / 100 if base_price is not None else current
+
+        discount_percentage = 0
+        if original > 0 and current < original:
+            discount_percentage = round((1 - current / original) * 100, 2)
+
+        return cls(current, original, discount_percentage, timestamp or datetime.now())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'current': self.current,
+            'original': self.original,
+            'discount_percentage': self.discount_percentage
+        }
+
+
+@dataclass(slots=True)
 class Seller:
     """Модель данных о продавце"""
     id: int
@@ -18,7 +88,84 @@ class Seller:
     rating: Optional[float] = None
     products_count: Optional[int] = None
 
-@dataclass
+@dataclass(slots=True)
+class SellerLegalInfo:
+    """Юридическая информация о продавце и способ, которым она получена"""
+    seller_id: Optional[int]
+    seller_name: str
+    seller_info: str
+    source: str
+
+@dataclass(slots=True)
+class LegalEntity:
+    """Юридическое лицо или ИП, разобранное из текста подсказки продавца"""
+    legal_name: Optional[str] = None
+    inn: Optional[str] = None
+    ogrn: Optional[str] = None
+    kpp: Optional[str] = None
+    entity_type: Optional[str] = None
+    address: Optional[str] = None
+
+    @classmethod
+    def from_seller_info(cls, text: Optional[str]) -> 'LegalEntity':
+        """Разбирает текст подсказки продавца (как в колонке seller_info CSV inn.py)
+
+        Первая строка без метки - название, остальные такие строки - адрес.
+        ОГРНИП записывается в поле ogrn (у ИП он заменяет ОГРН). Тип лица
+        берется из названия, а если его там нет - определяется по ОГРНИП и
+        длине ИНН (10 цифр - ЮЛ, 12 цифр - ФЛ, например самозанятый).
+        """
+        entity = cls()
+        other_lines = []
+        for line in (text or '').splitlines():
+            line = line.strip()
+            if not line or line in (LEGAL_INFO_HEADER, LEGAL_INFO_FOOTER):
+                continue
+            match = _LEGAL_FIELD_RE.match(line)
+            if match is None:
+                other_lines.append(line)
+                continue
+            label = match.group(1).upper()
+            value = re.sub(r'\D', '', match.group(2)) or None
+            if label == 'ИНН':
+                entity.inn = value
+            elif label == 'КПП':
+                entity.kpp = value
+            elif label == 'ОГРНИП' or (label == 'ОГРН' and entity.ogrn is None):
+                entity.ogrn = value
+            elif label == 'НОМЕР РЕГИСТРАЦИИ' and entity.inn is None:
+                entity.inn = value
+
+        if other_lines:
+            entity.legal_name = other_lines[0]
+            entity.address = ", ".join(other_lines[1:]) or None
+        entity.entity_type = entity._detect_type('ОГРНИП' in (text or '').upper())
+        return entity
+
+    def _detect_type(self, has_ogrnip: bool) -> Optional[str]:
+        name = self.legal_name or ''
+        lowered = name.lower()
+        for full_name, abbreviation in _ENTITY_TYPES:
+            if full_name in lowered:
+                return abbreviation
+        words = set(re.findall(r'[А-ЯЁA-Z]+', name))
+        for abbreviation in _ENTITY_ABBREVIATIONS:
+            if abbreviation in words:
+                return abbreviation
+        if has_ogrnip:
+            return 'ИП'
+        if self.inn and len(self.inn) == 10:
+            return 'ЮЛ'
+        if self.inn and len(self.inn) == 12:
+            return 'ФЛ'
+        return None
+
+    @property
+    def is_empty(self) -> bool:
+        """Нет ни ИНН, ни ОГРН - сохранять в реестр нечего"""
+        return not self.inn and not self.ogrn
+
+@dataclass(slots=True)
 class Product:
     """Модель данных о товаре"""
     wb_id: str
@@ -33,7 +180,87 @@ class Product:
     created_at: datetime = field(default_factory=datetime.now)
     updated_at: datetime = field(default_factory=datetime.now)
 
-@dataclass
+    @classmethod
+    def from_card_payload(cls, payload: Dict[str, Any], price: Optional[Price] = None,
+                          product_id: Optional[Any] = None) -> 'Product':
+        """Создает товар из карточки card.wb.ru
+
+        Args:
+            payload: Элемент data.products из ответа карточки
+            price: Цена из отдельного запроса; если не указана, берется из самой карточки
+            product_id: Запрошенный артикул; id из карточки используется, только если он не передан
+        """
+        get = payload.get
+        now = datetime.now()
+        return cls(
+            str(product_id) if product_id is not None else str(get('id', '')),
+            get('name', ''),
+            get('brand', ''),
+            extract_category(payload),
+            Seller(get('supplierId', 0), get('supplierName', '')),
+            get('rating', 0),
+            get('feedbacks', 0),
+            price if price is not None else Price.from_payload(payload, now),
+            extract_stocks(payload),
+            now,
+            now
+        )
+
+    @classmethod
+    def from_listing_payload(cls, payload: Dict[str, Any]) -> 'Product':
+        """Создает товар из элемента выдачи каталога, продавца или поиска"""
+        get = payload.get
+        now = datetime.now()
+        return cls(
+            extract_listing_id(payload),
+            get('name', ''),
+            get('brand', ''),
+            extract_category(payload),
+            Seller(get('supplierId', 0), get('supplier', '')),
+            get('rating', 0),
+            get('feedbacks', 0),
+            Price.from_payload(payload, now),
+            extract_stocks(payload),
+            now,
+            now
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Возвращает товар в формате, который сохраняется в JSON"""
+        return {
+            'wb_id': self.wb_id,
+            'name': self.name,
+            'brand': self.brand,
+            'category': self.category,
+            'seller': {
+                'id': self.seller.id,
+                'name': self.seller.name
+            },
+            'rating': self.rating,
+            'feedbacks_count': self.feedbacks_count,
+            'price': self.price.to_dict() if self.price is not None else None,
+            'stocks': self.stocks
+        }
+
+    def to_record(self) -> Dict[str, Any]:
+        """Возвращает товар плоской записью (колонки parser.batch.PRODUCT_COLUMNS)"""
+        price = self.price
+        return {
+            'wb_id': self.wb_id,
+            'name': self.name,
+            'brand': self.brand,
+            'category': self.category,
+            'seller_id': self.seller.id,
+            'seller_name': self.seller.name,
+            'rating': self.rating,
+            'feedbacks_count': self.feedbacks_count,
+            'current_price': price.current if price is not None else None,
+            'original_price': price.original if price is not None else None,
+            'discount_percentage': price.discount_percentage if price is not None else None,
+            'stock_total': sum(self.stocks.values())
+        }
+
+@dataclass(slots=True)
 class Feedback:
     """Модель данных об отзыве"""
     product_id: int
@@ -43,4 +270,26 @@ class Feedback:
     likes: int = 0
     dislikes: int = 0
     created_at: Optional[datetime] = None
-    parsed_at: datetime = field(default_factory=datetime.now)
\ No newline at end of file
+    parsed_at: datetime = field(default_factory=datetime.now)
+
+    @classmethod
+    def from_payload(cls, product_id: int, payload: Dict[str, Any]) -> 'Feedback':
+        """Создает отзыв из элемента ответа feedbacks.wb.ru"""
+        votes = payload.get('votes') or {}
+        created_at = None
+        created_date = payload.get('createdDate')
+        if created_date:
+            try:
+                created_at = datetime.fromisoformat(created_date.replace('Z', '+00:00'))
+            except ValueError:
+                created_at = None
+
+        return cls(
+            product_id,
+            payload.get('wbUserId'),
+            payload.get('productValuation', 0),
+            payload.get('text'),
+            votes.get('pluses', 0),
+            votes.get('minuses', 0),
+            created_at
+        )
@@ -0,0 +1,86 @@
+import pandas as pd
+
+from models.entities import extract_category, extract_listing_id
+
+# Поля элемента выдачи, которые нужны для сохранения товара
+LISTING_FIELDS = ['name', 'brand', 'supplierId', 'supplier',
+                  'rating', 'feedbacks', 'salePriceU', 'priceU']
+
+PRODUCT_COLUMNS = ['wb_id', 'name', 'brand', 'category', 'seller_id', 'seller_name',
+                   'rating', 'feedbacks_count', 'current_price', 'original_price',
+                   'discount_percentage', 'stock_total']
+
+STOCK_COLUMNS = ['wb_id', 'warehouse_id', 'quantity']
+
+
+class ListingBatch:
+    """Накапливает страницы выдачи и превращает их в колоночные таблицы
+
+    Вместо построения объекта на каждый товар страницы складываются целиком,
+    а нормализация цен, подсчет остатков и дедупликация выполняются
+    векторно над всем пакетом.
+    """
+
+    def __init__(self):
+        self.items = []
+        self.stock_rows = []
+
+    def add_page(self, items):
+        """Добавляет страницу выдачи (список товаров из data.products)"""
+        offset = len(self.items)
+        self.items.extend(items)
+        # Остатки вложены в размеры, поэтому разворачиваем их в плоские строки,
+        # запоминая позицию товара в пакете для последующей дедупликации
+        self.stock_rows.extend(
+            (offset + position, stock.get('wh', 0), stock.get('qty', 0))
+            for position, item in enumerate(items)
+            for size in item.get('sizes') or ()
+            for stock in size.get('stocks') or ()
+        )
+
+    def __len__(self):
+        return len(self.items)
+
+    def frames(self):
+        """Возвращает (products, stocks) — таблицы товаров и остатков по складам"""
+        raw = pd.DataFrame.from_records(self.items, columns=LISTING_FIELDS)
+        # Артикул и категория - с теми же запасными значениями, что в Product.from_listing_payload
+        products = pd.DataFrame({
+            'wb_id': [extract_listing_id(item) for item in self.items],
+            'name': raw['name'].fillna(''),
+            'brand': raw['brand'].fillna(''),
+            'category': [extract_category(item) for item in self.items],
+            'seller_id': raw['supplierId'].fillna(0).astype('int64'),
+            'seller_name': raw['supplier'].fillna(''),
+            'rating': raw['rating'].fillna(0),
+            'feedbacks_count': raw['feedbacks'].fillna(0).astype('int64'),
+        })
+
+        # Цены приходят в копейках; при отсутствии priceU исходная цена равна текущей
+        current = (raw['salePriceU'] / 100).fillna(0)
+        original = (raw['priceU'] / 100).fillna(current)
+        has_discount = (original > 0) & (current < original)
+        products['current_price'] = current
+        products['original_price'] = original
+        products['discount_percentage'] = ((1 - current / original.where(has_discount)) * 100).round(2).fillna(0)
+
+        products = products[products['wb_id'] != ''].drop_duplicates('wb_id', keep='first')
+
+        # Остатки берем только у первого вхождения каждого товара
+        stocks = pd.DataFrame(self.stock_rows, columns=['position', 'warehouse_id', 'quantity'])
+        stocks = stocks[stocks['position'].isin(products.index)]
+        stocks.insert(0, 'wb_id', stocks['position'].map(products['wb_id']))
+        stocks = stocks.groupby(['wb_id', 'warehouse_id'], as_index=False, sort=False)['quantity'].sum()
+
+        totals = stocks.groupby('wb_id', sort=False)['quantity'].sum()
+        products['stock_total'] = products['wb_id'].map(totals).fillna(0).astype('int64')
+
+        return products.reset_index(drop=True)[PRODUCT_COLUMNS], stocks.reset_index(drop=True)[STOCK_COLUMNS]
+
+    def records(self, products=None):
+        """Возвращает товары пакета в виде списка плоских словарей (для JSON)"""
+        if products is None:
+            products, _ = self.frames()
+        # NaN в JSON превращаем в null
+        return products.astype(object).where(products.notna(), None).to_dict('records')
+
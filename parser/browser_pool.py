@@ -0,0 +1,205 @@
+import time
+import queue
+import multiprocessing
+from collections import deque
+
+from loguru import logger
+
+def _worker_loop(worker_id, handler_factory, inbox, results):
+    """Цикл процесса-воркера: создает обработчик и выполняет выданные ему задачи
+
+    Исключение обработчика завершает процесс; пул замечает это, перезапускает
+    воркера и возвращает незавершенную задачу в очередь.
+    """
+    handler = handler_factory()
+    try:
+        while True:
+            envelope = inbox.get()
+            if envelope is None:
+                break
+            started = time.monotonic()
+            result = handler(envelope['task'])
+            results.put((worker_id, envelope, result, time.monotonic() - started))
+    finally:
+        close = getattr(handler, 'close', None)
+        if close is not None:
+            close()
+
+class BrowserWorkerPool:
+    """Пул воркеров в отдельных процессах с общей очередью задач
+
+    Каждый воркер создает свой обработчик вызовом handler_factory() (например,
+    со своим экземпляром браузера). Общая очередь задач хранится в основном
+    процессе, и свободный воркер получает из нее по одной задаче, поэтому
+    пул всегда знает, какая задача была у упавшего воркера. Результаты
+    возвращаются в основной процесс, поэтому дедупликация и запись остаются
+    в одном месте. Упавший воркер перезапускается (не более max_restarts раз),
+    а его задача повторяется до max_attempts раз, после чего возвращается
+    с результатом None. Воркер, который выполняет задачу дольше task_timeout
+    секунд (например, завис вызов Selenium), принудительно завершается и
+    считается упавшим.
+    """
+
+    def __init__(self, handler_factory, workers=4, max_attempts=2, max_restarts=5, task_timeout=300):
+        self.handler_factory = handler_factory
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.max_restarts = max_restarts
+        self.task_timeout = task_timeout
+        self.pending = 0
+        self.stats = {
+            worker_id: {'done': 0, 'failed': 0, 'restarts': 0, 'busy': 0.0}
+            for worker_id in range(workers)
+        }
+
+        self._ctx = multiprocessing.get_context('spawn')
+        self._results = self._ctx.Queue()
+        self._backlog = deque()
+        self._processes = {}
+        self._inboxes = {}
+        self._in_flight = {}
+        self._ready = deque()
+        self._started_at = None
+        self._sequence = 0
+
+    def start(self):
+        self._started_at = time.monotonic()
+        for worker_id in range(self.workers):
+            self._spawn(worker_id)
+        return self
+
+    def _spawn(self, worker_id):
+        # A fresh inbox: a task left in the old one is requeued from _in_flight
+        self._inboxes[worker_id] = self._ctx.Queue()
+        self._in_flight[worker_id] = None
+        process = self._ctx.Process(
+            target=_worker_loop,
+            args=(worker_id, self.handler_factory, self._inboxes[worker_id], self._results),
+            name=f"browser-worker-{worker_id}",
+            daemon=True
+        )
+        process.start()
+        self._processes[worker_id] = process
+
+    def _dispatch(self):
+        """Выдает задачи из общей очереди свободным воркерам"""
+        for worker_id in self._processes:
+            if not self._backlog:
+                break
+            if self._in_flight[worker_id] is None:
+                envelope = self._backlog.popleft()
+                # Номер выдачи отличает результат текущей задачи от запоздавшего результата снятой
+                self._sequence += 1
+                envelope['sequence'] = self._sequence
+                envelope['dispatched_at'] = time.monotonic()
+                self._in_flight[worker_id] = envelope
+                self._inboxes[worker_id].put(envelope)
+
+    def submit(self, task):
+        """Ставит задачу в общую очередь"""
+        self._backlog.append({'task': task, 'attempt': 1})
+        self.pending += 1
+        self._dispatch()
+
+    def poll(self):
+        """Возвращает уже готовые результаты (task, result), не дожидаясь остальных"""
+        while self.pending or self._ready:
+            item = self._next(timeout=0)
+            if item is None:
+                break
+            yield item
+
+    def drain(self):
+        """Дожидается всех отправленных задач, возвращая (task, result) по мере готовности"""
+        while self.pending or self._ready:
+            item = self._next(timeout=1.0)
+            if item is not None:
+                yield item
+
+    def _next(self, timeout):
+        if self._ready:
+            return self._ready.popleft()
+        try:
+            worker_id, envelope, result, elapsed = self._results.get(timeout=timeout)
+        except queue.Empty:
+            self._check_workers()
+            self._dispatch()
+            return self._ready.popleft() if self._ready else None
+
+        current = self._in_flight.get(worker_id)
+        if current is None or current['sequence'] != envelope['sequence']:
+            # Результат задачи, снятой по таймауту: она уже повторена или отдана как невыполненная
+            return None
+
+        self._in_flight[worker_id] = None
+        self._dispatch()
+        self.pending -= 1
+        self.stats[worker_id]['done'] += 1
+        self.stats[worker_id]['busy'] += elapsed
+        return envelope['task'], result
+
+    def _check_workers(self):
+        """Перезапускает упавших и зависших воркеров и повторяет их незавершенные задачи"""
+        now = time.monotonic()
+        for worker_id, process in list(self._processes.items()):
+            envelope = self._in_flight.get(worker_id)
+            if process.is_alive() and envelope is not None and now - envelope['dispatched_at'] > self.task_timeout:
+                logger.warning(f"Воркер {worker_id} выполняет задачу дольше {self.task_timeout} с, завершаем его")
+                process.terminate()
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.kill()
+                    process.join(timeout=5)
+            if process.is_alive():
+                continue
+
+            envelope = self._in_flight.pop(worker_id, None)
+            if envelope is not None:
+                self.stats[worker_id]['failed'] += 1
+                if envelope['attempt'] < self.max_attempts:
+                    envelope['attempt'] += 1
+                    self._backlog.appendleft(envelope)
+                else:
+                    logger.error(f"Задача не выполнена после {envelope['attempt']} попыток: {envelope['task']}")
+                    self.pending -= 1
+                    self._ready.append((envelope['task'], None))
+
+            if self.stats[worker_id]['restarts'] >= self.max_restarts:
+                logger.error(f"Воркер {worker_id} упал {self.max_restarts + 1} раз и больше не перезапускается")
+                del self._processes[worker_id]
+                del self._inboxes[worker_id]
+                continue
+
+            logger.warning(f"Воркер {worker_id} завершился с кодом {process.exitcode}, перезапуск")
+            self.stats[worker_id]['restarts'] += 1
+            self._spawn(worker_id)
+
+        if not self._processes and self.pending:
+            raise RuntimeError("Все воркеры пула остановлены, задачи не могут быть выполнены")
+
+    def close(self):
+        """Останавливает воркеров после завершения текущих задач"""
+        for inbox in self._inboxes.values():
+            inbox.put(None)
+        for process in self._processes.values():
+            process.join(timeout=30)
+            if process.is_alive():
+                process.terminate()
+        self._processes = {}
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def print_summary(self):
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0
+        lines = ["===== Воркеры браузера ====="]
+        lines.append(f"{'воркер':<8}{'готово':>8}{'сбоев':>8}{'рестартов':>11}{'занят, с':>10}{'товаров/мин':>13}")
+        for worker_id, stats in sorted(self.stats.items()):
+            rate = stats['done'] / elapsed * 60 if elapsed else 0
+            lines.append(f"{worker_id:<8}{stats['done']:>8}{stats['failed']:>8}{stats['restarts']:>11}"
+                         f"{stats['busy']:>10.1f}{rate:>13.1f}")
+        logger.info("\n" + "\n".join(lines))
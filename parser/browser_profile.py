@@ -0,0 +1,98 @@
+from collections import defaultdict
+
+from loguru import logger
+
+# Запросы, которые не нужны для чтения текста страницы: картинки, медиа, шрифты и сторонние счетчики
+BLOCKED_URL_PATTERNS = [
+    "*.jpg", "*.jpeg", "*.png", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico",
+    "*.mp4", "*.webm", "*.m3u8", "*.mp3",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*mc.yandex.ru*", "*top-fwz1.mail.ru*", "*vk.com/rtrg*", "*tiktok.com*",
+    "*facebook.net*", "*criteo.*", "*mindbox.ru*"
+]
+
+# Время загрузки документа и объем переданных данных по Navigation/Resource Timing
+_PAGE_LOAD_JS = """
+const nav = performance.getEntriesByType('navigation')[0];
+const resources = performance.getEntriesByType('resource');
+let bytes = nav ? nav.transferSize : 0;
+for (const entry of resources) {
+    bytes += entry.transferSize || 0;
+}
+const loadMs = nav && nav.loadEventEnd > 0 ? nav.loadEventEnd - nav.startTime : performance.now();
+return {load_ms: loadMs, bytes: bytes, requests: resources.length + 1};
+"""
+
+def apply_lean_options(chrome_options):
+    """Настройки Chrome, отключающие загрузку картинок и лишние функции браузера"""
+    chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+    chrome_options.add_argument("--disable-extensions")
+    chrome_options.add_argument("--mute-audio")
+    chrome_options.add_experimental_option("prefs", {
+        "profile.managed_default_content_settings.images": 2,
+        "profile.default_content_setting_values.notifications": 2,
+        "profile.managed_default_content_settings.media_stream": 2
+    })
+
+def block_heavy_requests(driver, patterns=None):
+    """Блокирует через CDP запросы картинок, медиа, шрифтов и сторонних счетчиков"""
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns or BLOCKED_URL_PATTERNS})
+
+def enable_load_metrics(driver):
+    """Увеличивает буфер Resource Timing, чтобы учитывались все запросы страницы"""
+    driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
+        "source": "performance.setResourceTimingBufferSize(5000);"
+    })
+
+class PageLoadStats:
+    """Время загрузки страниц и объем переданных данных по типам страниц
+
+    Объем считается по transferSize из Resource Timing, поэтому для
+    сторонних доменов без заголовка Timing-Allow-Origin он занижен и
+    служит нижней оценкой трафика.
+    """
+
+    def __init__(self, keep_records=False):
+        self.keep_records = keep_records
+        self._loads = defaultdict(list)
+        self._pending = []
+
+    def measure(self, driver, page_type):
+        """Снимает метрики загрузки текущей страницы"""
+        try:
+            metrics = driver.execute_script(_PAGE_LOAD_JS) or {}
+        except Exception:
+            return None
+        record = (page_type, float(metrics.get('load_ms') or 0), int(metrics.get('bytes') or 0),
+                  int(metrics.get('requests') or 0))
+        self._loads[page_type].append(record[1:])
+        if self.keep_records:
+            self._pending.append(record)
+        return record
+
+    def take_records(self):
+        """Возвращает замеры, сделанные с прошлого вызова (для передачи из процесса-воркера)"""
+        records, self._pending = self._pending, []
+        return records
+
+    def merge(self, records):
+        """Добавляет замеры, сделанные в другом процессе"""
+        for page_type, load_ms, size, requests in records:
+            self._loads[page_type].append((load_ms, size, requests))
+
+    def print_summary(self):
+        if not self._loads:
+            return
+        lines = ["===== Загрузка страниц ====="]
+        lines.append(f"{'страница':<12}{'кол-во':>8}{'средн, мс':>11}{'средн, КБ':>11}{'всего, МБ':>11}{'запросов':>10}")
+        for page_type, loads in sorted(self._loads.items()):
+            count = len(loads)
+            total_bytes = sum(size for _, size, _ in loads)
+            lines.append(f"{page_type:<12}{count:>8}"
+                         f"{sum(load_ms for load_ms, _, _ in loads) / count:>11.0f}"
+                         f"{total_bytes / count / 1024:>11.1f}"
+                         f"{total_bytes / 1024 / 1024:>11.1f}"
+                         f"{sum(requests for _, _, requests in loads) / count:>10.0f}")
+        logger.info("\n" + "\n".join(lines))
@@ -0,0 +1,122 @@
+import time
+from collections import defaultdict
+
+from loguru import logger
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
+
+# Количество загруженных ресурсов страницы: по его стабилизации судим о тишине в сети
+_RESOURCE_COUNT_JS = "return window.performance.getEntriesByType('resource').length"
+
+def any_css(selectors):
+    """Локатор, совпадающий с любым из CSS-селекторов списка"""
+    return (By.CSS_SELECTOR, ", ".join(selectors))
+
+def text_present(*keywords):
+    """Условие: видимый текст страницы содержит хотя бы одно из слов"""
+    pattern = "|".join(keywords)
+    script = f"return !!document.body && /{pattern}/.test(document.body.innerText)"
+    return lambda driver: driver.execute_script(script)
+
+class PageWaiter:
+    """Ожидание условий на странице вместо фиксированных пауз
+
+    Каждое ожидание длится только до выполнения своего условия (готовность
+    документа, появление элемента, тишина в сети) и не дольше остатка
+    бюджета времени на текущий товар. Длительность каждого ожидания
+    записывается в статистику по его имени.
+    """
+
+    def __init__(self, driver, default_timeout=10, poll_frequency=0.1):
+        self.driver = driver
+        self.default_timeout = default_timeout
+        self.poll_frequency = poll_frequency
+        self.deadline = None
+        self.durations = defaultdict(list)
+        self.timeouts = defaultdict(int)
+        self._last_step = {}
+
+    def start_budget(self, seconds):
+        """Начинает отсчет бюджета времени (например, на обработку одного товара)"""
+        self.deadline = time.monotonic() + seconds if seconds else None
+
+    def budget_exhausted(self):
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def _timeout(self, timeout):
+        timeout = self.default_timeout if timeout is None else timeout
+        if self.deadline is not None:
+            timeout = min(timeout, max(self.deadline - time.monotonic(), 0))
+        return timeout
+
+    def until(self, name, condition, timeout=None):
+        """Ждет выполнения условия; возвращает его результат или None по таймауту"""
+        started = time.monotonic()
+        try:
+            return WebDriverWait(self.driver, self._timeout(timeout), self.poll_frequency).until(condition)
+        except TimeoutException:
+            self.timeouts[name] += 1
+            return None
+        finally:
+            self.durations[name].append(time.monotonic() - started)
+
+    def document_ready(self, name, timeout=None):
+        """Ждет завершения загрузки документа"""
+        return self.until(
+            name,
+            lambda driver: driver.execute_script("return document.readyState") == "complete",
+            timeout
+        )
+
+    def element(self, name, selectors, timeout=None, visible=False):
+        """Ждет появления любого элемента из списка CSS-селекторов"""
+        locator = any_css(selectors)
+        condition = EC.visibility_of_element_located(locator) if visible else EC.presence_of_element_located(locator)
+        return self.until(name, condition, timeout)
+
+    def network_idle(self, name, idle_time=0.5, timeout=None):
+        """Ждет, пока страница idle_time секунд не запрашивает новых ресурсов"""
+        state = {'count': None, 'since': time.monotonic()}
+
+        def idle(driver):
+            count = driver.execute_script(_RESOURCE_COUNT_JS)
+            now = time.monotonic()
+            if count != state['count']:
+                state['count'] = count
+                state['since'] = now
+                return False
+            return now - state['since'] >= idle_time
+
+        return self.until(name, idle, timeout)
+
+    def pace(self, name, min_interval):
+        """Выдерживает минимальный интервал между шагами одного вида
+
+        В отличие от фиксированной паузы, время, уже потраченное на работу
+        с момента прошлого шага, засчитывается в интервал.
+        """
+        now = time.monotonic()
+        last = self._last_step.get(name)
+        if last is not None:
+            wait = min_interval - (now - last)
+            if wait > 0:
+                time.sleep(wait)
+                self.durations[name].append(wait)
+        self._last_step[name] = time.monotonic()
+
+    def summary(self):
+        """Статистика ожиданий: имя -> (количество, сумма, среднее, максимум, таймауты)"""
+        return {
+            name: (len(values), sum(values), sum(values) / len(values), max(values), self.timeouts[name])
+            for name, values in self.durations.items() if values
+        }
+
+    def print_summary(self):
+        lines = ["===== Ожидания на страницах ====="]
+        lines.append(f"{'ожидание':<24}{'кол-во':>8}{'всего, с':>10}{'средн, с':>10}{'макс, с':>10}{'таймауты':>10}")
+        for name, (count, total, mean, longest, timeouts) in sorted(self.summary().items()):
+            lines.append(f"{name:<24}{count:>8}{total:>10.1f}{mean:>10.2f}{longest:>10.2f}{timeouts:>10}")
+        logger.info("\n" + "\n".join(lines))
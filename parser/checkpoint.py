@@ -0,0 +1,73 @@
+import os
+import json
+import time
+from datetime import datetime
+
+class CrawlCheckpoint:
+    """Сохранение фронтира обхода в локальный файл состояния
+
+    Хранит позицию обхода (индекс категории и страницу), товары и продавцов,
+    результаты которых уже сохранены, и путь к CSV с результатами. Сами
+    данные продавцов в состояние не попадают: они есть в CSV и кэше
+    продавцов, а файл состояния перезаписывается при каждом сохранении. Файл
+    перезаписывается атомарно (временный файл + rename), поэтому падение
+    во время сохранения не портит предыдущую контрольную точку.
+    """
+
+    def __init__(self, filename, save_interval=60):
+        self.filename = filename
+        self.save_interval = save_interval
+        self.csv_filename = None
+        self.category_index = 0
+        self.page = 1
+        self.processed_urls = set()
+        self.processed_ids = set()
+        self.processed_sellers = set()
+        self._last_save = time.monotonic()
+
+    def load(self):
+        """Загружает состояние из файла; возвращает False, если файла нет или он поврежден"""
+        try:
+            with open(self.filename, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return False
+
+        self.csv_filename = state.get('csv_filename')
+        self.category_index = state.get('category_index', 0)
+        self.page = state.get('page', 1)
+        self.processed_urls = set(state.get('processed_urls', []))
+        self.processed_ids = set(state.get('processed_ids', []))
+        self.processed_sellers = set(state.get('processed_sellers', []))
+        return True
+
+    def save(self):
+        """Атомарно записывает текущее состояние на диск"""
+        state = {
+            'saved_at': datetime.now().isoformat(timespec='seconds'),
+            'csv_filename': self.csv_filename,
+            'category_index': self.category_index,
+            'page': self.page,
+            'processed_urls': sorted(self.processed_urls),
+            'processed_ids': sorted(self.processed_ids),
+            'processed_sellers': sorted(self.processed_sellers)
+        }
+        tmp_filename = self.filename + '.tmp'
+        with open(tmp_filename, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_filename, self.filename)
+        self._last_save = time.monotonic()
+
+    def maybe_save(self):
+        """Сохраняет состояние, если с прошлого сохранения прошло save_interval секунд"""
+        if time.monotonic() - self._last_save >= self.save_interval:
+            self.save()
+
+    def clear(self):
+        """Удаляет файл состояния после успешного завершения обхода"""
+        try:
+            os.remove(self.filename)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,73 @@
+import os
+import csv
+import time
+
+class BufferedCsvWriter:
+    """Долгоживущая буферизованная запись результатов в CSV
+
+    Файл открывается один раз в режиме дозаписи. Строки копятся в буфере и
+    сбрасываются на диск, когда набирается flush_rows строк или проходит
+    flush_interval секунд с прошлого сброса. checkpoint() дополнительно
+    вызывает fsync, чтобы записанное пережило падение процесса.
+    Если файл уже существует, заголовок не пишется повторно, запись
+    продолжается в конец файла, а колонки берутся из его заголовка
+    (лишние поля строк отбрасываются).
+    """
+
+    def __init__(self, filename, fieldnames, flush_rows=10, flush_interval=30):
+        self.filename = filename
+        self.fieldnames = fieldnames
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.count = 0
+
+        self.resumed = os.path.exists(filename) and os.path.getsize(filename) > 0
+        if self.resumed:
+            with open(filename, newline='', encoding='utf-8') as f:
+                self.fieldnames = next(csv.reader(f), None) or fieldnames
+        self._file = open(filename, 'a', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames, extrasaction='ignore')
+        if not self.resumed:
+            self._writer.writeheader()
+
+        self._buffer = []
+        self._last_flush = time.monotonic()
+
+    def writerow(self, row):
+        """Добавляет строку в буфер и сбрасывает его по порогу размера или времени"""
+        self._buffer.append(row)
+        self.count += 1
+        if len(self._buffer) >= self.flush_rows or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Записывает буфер в файл"""
+        if self._buffer:
+            self._writer.writerows(self._buffer)
+            self._buffer = []
+        self._file.flush()
+        self._last_flush = time.monotonic()
+
+    def checkpoint(self):
+        """Сбрасывает буфер и гарантирует запись на диск (fsync)"""
+        self.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file is None:
+            return
+        self.checkpoint()
+        self._file.close()
+        self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+def iter_csv_rows(filename):
+    """Лениво читает строки CSV-файла (многострочные ячейки поддерживаются)"""
+    with open(filename, newline='', encoding='utf-8') as f:
+        yield from csv.DictReader(f)
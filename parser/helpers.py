@@ -1,4 +1,7 @@
+import io
+import os
 import re
+import gzip
 import json
 from datetime import datetime
 
@@ -40,6 +43,87 @@ def load_from_json(filename):
     except (FileNotFoundError, json.JSONDecodeError):
         return None
 
+COMPRESSION_SUFFIXES = {None: '', 'gzip': '.gz', 'zstd': '.zst'}
+
+def _open_compressed(filename, mode, compression):
+    """Открывает текстовый поток с учетом сжатия (gzip или zstd)"""
+    if compression is None:
+        return open(filename, mode, encoding='utf-8')
+    if compression == 'gzip':
+        return gzip.open(filename, mode + 't', encoding='utf-8')
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("Для сжатия zstd необходимо установить пакет zstandard")
+        raw = open(filename, mode + 'b')
+        if mode == 'w':
+            stream = zstandard.ZstdCompressor().stream_writer(raw, closefd=True)
+        else:
+            stream = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+        return io.TextIOWrapper(stream, encoding='utf-8')
+    raise ValueError(f"Неизвестный тип сжатия: {compression}")
+
+class NdjsonWriter:
+    """Потоковая запись в NDJSON: по одной JSON-строке на запись
+    
+    Данные пишутся во временный файл рядом с целевым и переименовываются
+    в него только при успешном закрытии, поэтому читатели никогда не видят
+    недописанный файл. При ошибке временный файл остается для разбора.
+    """
+    
+    def __init__(self, filename, compression=None):
+        if compression not in COMPRESSION_SUFFIXES:
+            raise ValueError(f"Неизвестный тип сжатия: {compression}")
+        self.filename = filename + COMPRESSION_SUFFIXES[compression]
+        self.tmp_filename = self.filename + '.tmp'
+        self.count = 0
+        self._file = _open_compressed(self.tmp_filename, 'w', compression)
+    
+    def write(self, record):
+        """Дописывает одну запись"""
+        self._file.write(json.dumps(record, ensure_ascii=False, default=str))
+        self._file.write('\n')
+        self.count += 1
+    
+    def write_many(self, records):
+        """Дописывает несколько записей"""
+        for record in records:
+            self.write(record)
+    
+    def write_product(self, product):
+        """Дописывает товар (models.entities.Product)"""
+        self.write(product.to_dict())
+    
+    def close(self, finalize=True):
+        """Закрывает файл и атомарно переименовывает его в целевой"""
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        if finalize:
+            os.replace(self.tmp_filename, self.filename)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close(finalize=exc_type is None)
+        return False
+
+def iter_ndjson(filename):
+    """Лениво читает записи из NDJSON-файла (сжатие определяется по расширению)"""
+    compression = None
+    if filename.endswith('.gz'):
+        compression = 'gzip'
+    elif filename.endswith('.zst'):
+        compression = 'zstd'
+    
+    with _open_compressed(filename, 'r', compression) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
 def format_datetime(dt):
     """Форматирует дату и время в строку"""
     if isinstance(dt, datetime):
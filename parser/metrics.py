@@ -0,0 +1,153 @@
+import os
+import threading
+from bisect import bisect_left
+
+from parser.timing import HISTOGRAM_BUCKETS
+
+# Корзины для размеров пакетов (количество строк)
+BATCH_SIZE_BUCKETS = (1, 10, 50, 100, 500, 1000, 5000, 10000)
+
+# Корзины для длительности запросов и коммитов в БД, секунды: HISTOGRAM_BUCKETS
+# рассчитаны на HTTP и загрузку страниц, а запросы к локальной PostgreSQL почти
+# все уложились бы в первую корзину
+DB_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1)
+
+class MetricsRegistry:
+    """Счетчики и гистограммы в формате Prometheus
+
+    Метрика идентифицируется именем и набором меток, например
+    wb_http_requests_total{endpoint="card",status="200"}. Реестр
+    потокобезопасен; его содержимое отдается в текстовом формате
+    Prometheus через render(), HTTP-эндпоинт serve() или файл для
+    textfile collector node_exporter (write_textfile()).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help = {}
+        self._counters = {}
+        self._histograms = {}
+
+    def describe(self, name, kind, help_text, buckets=HISTOGRAM_BUCKETS):
+        """Регистрирует метрику: kind - counter или histogram"""
+        self._help[name] = (kind, help_text, tuple(buckets))
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        """Увеличивает счетчик"""
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        """Добавляет значение в гистограмму"""
+        buckets = self._help.get(name, (None, None, HISTOGRAM_BUCKETS))[2]
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {'buckets': [0] * (len(buckets) + 1), 'sum': 0.0, 'count': 0}
+            histogram['buckets'][bisect_left(buckets, value)] += 1
+            histogram['sum'] += value
+            histogram['count'] += 1
+
+    @staticmethod
+    def _format_labels(labels, extra=()):
+        pairs = list(labels) + list(extra)
+        if not pairs:
+            return ''
+        escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+        return '{' + ','.join(f'{label}="{value}"' for (label, _), value in zip(pairs, escaped)) + '}'
+
+    def render(self):
+        """Возвращает все метрики в текстовом формате Prometheus"""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: dict(value, buckets=list(value['buckets'])) for key, value in self._histograms.items()}
+
+        lines = []
+        names = sorted({name for name, _ in counters} | {name for name, _ in histograms})
+        for name in names:
+            kind, help_text, buckets = self._help.get(
+                name, ('histogram' if any(key[0] == name for key in histograms) else 'counter', '', HISTOGRAM_BUCKETS)
+            )
+            if help_text:
+                lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{self._format_labels(labels)} {value}")
+            for (metric, labels), histogram in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(list(buckets) + ['+Inf'], histogram['buckets']):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{self._format_labels(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{name}_sum{self._format_labels(labels)} {histogram['sum']:.6f}")
+                lines.append(f"{name}_count{self._format_labels(labels)} {histogram['count']}")
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, filename):
+        """Атомарно записывает метрики в файл (для textfile collector node_exporter)"""
+        tmp_filename = filename + '.tmp'
+        with open(tmp_filename, 'w', encoding='utf-8') as f:
+            f.write(self.render())
+        os.replace(tmp_filename, filename)
+
+    def dump_periodically(self, filename, interval=15):
+        """Переписывает файл метрик каждые interval секунд в фоновом потоке; возвращает Event для остановки"""
+        stop = threading.Event()
+
+        def loop():
+            while not stop.wait(interval):
+                self.write_textfile(filename)
+
+        threading.Thread(target=loop, name='metrics-textfile', daemon=True).start()
+        return stop
+
+    def serve(self, port, host='127.0.0.1'):
+        """Запускает HTTP-эндпоинт /metrics в фоновом потоке; возвращает сервер"""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+        return server
+
+# Общий реестр процесса: в него пишут скрапер и репозиторий
+REGISTRY = MetricsRegistry()
+
+REGISTRY.describe('wb_http_requests_total', 'counter', 'HTTP requests to WB by endpoint and status')
+REGISTRY.describe('wb_http_request_duration_seconds', 'histogram', 'HTTP request latency by endpoint')
+REGISTRY.describe('wb_http_retries_total', 'counter', 'Repeated HTTP requests by endpoint')
+REGISTRY.describe('wb_db_statements_total', 'counter', 'Executed DB statements by type')
+REGISTRY.describe('wb_db_statement_duration_seconds', 'histogram', 'DB statement latency by type',
+                  buckets=DB_LATENCY_BUCKETS)
+REGISTRY.describe('wb_db_batch_rows', 'histogram', 'Rows per batched DB write by statement type',
+                  buckets=BATCH_SIZE_BUCKETS)
+REGISTRY.describe('wb_db_commit_duration_seconds', 'histogram', 'DB commit latency',
+                  buckets=DB_LATENCY_BUCKETS)
+REGISTRY.describe('wb_db_rollbacks_total', 'counter', 'Rolled back DB transactions')
+REGISTRY.describe('wb_daemon_refreshes_total', 'counter', 'Daemon refreshes of tracked entities by kind and status')
+REGISTRY.describe('wb_daemon_refresh_duration_seconds', 'histogram', 'Daemon refresh latency by entity kind')
+REGISTRY.describe('wb_queue_jobs_total', 'counter', 'Queue jobs processed by this worker by kind and outcome')
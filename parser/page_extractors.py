@@ -0,0 +1,99 @@
+import re
+
+from selenium.common.exceptions import WebDriverException
+
+# Все карточки каталога за один вызов: название, ссылка и артикул (nm id)
+_PRODUCT_CARDS_JS = r"""
+const cards = [];
+const seen = new Set();
+document.querySelectorAll("a[href*='/detail.aspx'], [data-nm-id]").forEach(el => {
+    let url = el.tagName === 'A' ? el.href : '';
+    if (!url) {
+        const link = el.querySelector("a[href*='/detail.aspx'], a[href*='/catalog/']");
+        url = link ? link.href : '';
+    }
+    const match = url.match(/\/catalog\/(\d+)\//);
+    const nmId = el.getAttribute('data-nm-id') || (match ? match[1] : '');
+    if (!url && nmId) {
+        url = `https://www.wildberries.ru/catalog/${nmId}/detail.aspx`;
+    }
+    const key = nmId || url;
+    if (!url || seen.has(key)) {
+        return;
+    }
+    seen.add(key);
+    const card = el.closest("article, .product-card, .j-card-item, [data-nm-id]") || el;
+    const nameEl = card.querySelector(".product-card__name, .goods-name, span[class*='name'], .card__title");
+    const name = (nameEl && nameEl.innerText.trim()) || (card.innerText || '').split('\n')[0].trim();
+    cards.push({name: name, url: url, nm_id: nmId});
+});
+return cards;
+"""
+
+# Видимые элементы для каждого селектора списка в порядке селекторов и документа: элемент, его текст и ссылка
+_CANDIDATES_JS = r"""
+const selectors = arguments[0];
+const isVisible = el => !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length)
+    && window.getComputedStyle(el).visibility !== 'hidden';
+const candidates = [];
+for (const selector of selectors) {
+    let nodes;
+    try {
+        nodes = document.querySelectorAll(selector);
+    } catch (e) {
+        continue;
+    }
+    for (const el of nodes) {
+        if (isVisible(el)) {
+            candidates.push({selector: selector, element: el, text: el.innerText || '', href: el.href || ''});
+        }
+    }
+}
+return candidates;
+"""
+
+def extract_product_cards(driver):
+    """Возвращает карточки товаров страницы каталога одним вызовом execute_script
+
+    Returns:
+        Список кортежей (название, ссылка, ID товара); пустой список, если
+        карточки не найдены или скрипт не выполнился
+    """
+    try:
+        cards = driver.execute_script(_PRODUCT_CARDS_JS) or []
+    except WebDriverException:
+        return []
+
+    products = []
+    for index, card in enumerate(cards, start=1):
+        url = card.get('url') or ''
+        match = re.search(r'/catalog/(\d+)/', url)
+        product_id = card.get('nm_id') or (match.group(1) if match else None)
+        if '/detail.aspx' not in url and not (product_id and product_id.isdigit()):
+            continue
+        products.append((card.get('name') or f"Product {index}", url, product_id))
+    return products
+
+def find_first_candidate(driver, selectors, accept_text=None):
+    """Находит первый видимый элемент по упорядоченному списку CSS-селекторов одним вызовом
+
+    Проверка accept_text проходит все видимые элементы селектора по порядку,
+    поэтому отсеянный элемент не скрывает подходящие элементы того же селектора.
+
+    Args:
+        driver: Экземпляр WebDriver
+        selectors: CSS-селекторы в порядке приоритета
+        accept_text: Проверка текста элемента (например, отсев "Продавайте на Wildberries")
+
+    Returns:
+        (элемент, селектор) или (None, None)
+    """
+    try:
+        candidates = driver.execute_script(_CANDIDATES_JS, list(selectors)) or []
+    except WebDriverException:
+        return None, None
+
+    for candidate in candidates:
+        if accept_text is None or accept_text(candidate.get('text') or ''):
+            return candidate['element'], candidate['selector']
+    return None, None
@@ -0,0 +1,141 @@
+import os
+import uuid
+from datetime import date, datetime
+from urllib.parse import quote
+
+from config.settings import PARQUET_ROW_GROUP_SIZE
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+def _product_schema():
+    """Схема плоской записи товара (колонки parser.batch.PRODUCT_COLUMNS)"""
+    return pa.schema([
+        ('wb_id', pa.string()),
+        ('name', pa.string()),
+        ('brand', pa.string()),
+        ('category', pa.string()),
+        ('seller_id', pa.int64()),
+        ('seller_name', pa.string()),
+        ('rating', pa.float64()),
+        ('feedbacks_count', pa.int64()),
+        ('current_price', pa.float64()),
+        ('original_price', pa.float64()),
+        ('discount_percentage', pa.float64()),
+        ('stock_total', pa.int64()),
+    ])
+
+class ParquetDatasetWriter:
+    """Потоковая запись товаров в Parquet-датасет с разбиением по дате обхода
+
+    Раскладка каталогов совместима с hive-партиционированием pyarrow и pandas:
+
+        <root>/crawl_date=2025-05-13/category_id=123/part-<время>-<uuid>.parquet
+
+    Каждый запуск добавляет новые файлы и не трогает прежние, поэтому датасет
+    дописывается между запусками и читается целиком через pandas.read_parquet(root).
+    Записи копятся в буфере и сбрасываются группами строк по row_group_size.
+    Пока запись не завершена, файлы имеют префикс "_" и не видны читателям.
+    """
+
+    def __init__(self, root, partitions=None, partition_column=None, compression=None,
+                 row_group_size=PARQUET_ROW_GROUP_SIZE, crawl_date=None):
+        """
+        Args:
+            root: Корневой каталог датасета
+            partitions: Постоянные разделы для всех записей, например {'category_id': 123}
+            partition_column: Колонка записи, по значению которой записи раскладываются по разделам
+            compression: Кодек сжатия страниц Parquet (по умолчанию snappy)
+            row_group_size: Количество строк в одной группе строк
+            crawl_date: Дата обхода (по умолчанию сегодняшняя)
+        """
+        if pa is None:
+            raise ImportError("Для записи в Parquet необходимо установить пакет pyarrow")
+
+        self.filename = root
+        self.schema = _product_schema()
+        if partition_column is not None:
+            # Значение динамического раздела хранится в пути, а не в файле
+            self.schema = self.schema.remove(self.schema.get_field_index(partition_column))
+        self.compression = compression or 'snappy'
+        self.row_group_size = row_group_size
+        self.partition_column = partition_column
+        self.count = 0
+
+        partitions = dict(partitions or {})
+        partitions = {'crawl_date': (crawl_date or date.today()).isoformat(), **partitions}
+        self._base_dir = os.path.join(root, *(f"{key}={quote(str(value), safe='')}"
+                                              for key, value in partitions.items()))
+        self._part_name = f"part-{datetime.now():%H%M%S}-{uuid.uuid4().hex[:8]}.parquet"
+
+        # Буферы и открытые файлы по значению динамического раздела
+        self._buffers = {}
+        self._writers = {}
+        self._closed = False
+
+    def _partition_dir(self, value):
+        if self.partition_column is None:
+            return self._base_dir
+        return os.path.join(self._base_dir, f"{self.partition_column}={quote(str(value), safe='')}")
+
+    def write(self, record):
+        """Дописывает одну плоскую запись товара"""
+        key = record.get(self.partition_column) if self.partition_column else None
+        buffer = self._buffers.setdefault(key, [])
+        buffer.append(record)
+        self.count += 1
+        if len(buffer) >= self.row_group_size:
+            self._flush(key)
+
+    def write_many(self, records):
+        """Дописывает несколько записей"""
+        for record in records:
+            self.write(record)
+
+    def write_product(self, product):
+        """Дописывает товар (models.entities.Product)"""
+        self.write(product.to_record())
+
+    def _flush(self, key):
+        buffer = self._buffers.get(key)
+        if not buffer:
+            return
+
+        writer = self._writers.get(key)
+        if writer is None:
+            directory = self._partition_dir(key)
+            os.makedirs(directory, exist_ok=True)
+            tmp_path = os.path.join(directory, '_' + self._part_name)
+            writer = pq.ParquetWriter(tmp_path, self.schema, compression=self.compression)
+            self._writers[key] = writer
+
+        writer.write_table(pa.Table.from_pylist(buffer, schema=self.schema), row_group_size=self.row_group_size)
+        self._buffers[key] = []
+
+    def close(self, finalize=True):
+        """Сбрасывает буферы, закрывает файлы и публикует их в датасете"""
+        if self._closed:
+            return
+        self._closed = True
+
+        if finalize:
+            for key in list(self._buffers):
+                self._flush(key)
+
+        for key, writer in self._writers.items():
+            writer.close()
+            if finalize:
+                directory = self._partition_dir(key)
+                os.replace(os.path.join(directory, '_' + self._part_name),
+                           os.path.join(directory, self._part_name))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(finalize=exc_type is None)
+        return False
@@ -0,0 +1,221 @@
+import io
+import os
+import time
+import pstats
+import cProfile
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+
+# Этапы обработки, по которым разбивается профиль
+STAGES = ('fetch', 'decode', 'normalize', 'persist')
+
+# Время вне размеченных этапов (паузы между запросами, логирование и т.д.)
+OTHER_STAGE = 'other'
+
+_active = None
+
+def stage(name):
+    """Размечает блок кода как этап профиля; без активного профилировщика ничего не делает"""
+    if _active is None:
+        return nullcontext()
+    return _active.stage(name)
+
+class _CProfileBackend:
+    """Детерминированный профиль cProfile"""
+
+    name = 'cprofile'
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def enable(self):
+        self.profile.enable()
+
+    def disable(self):
+        self.profile.disable()
+
+    def report(self, top):
+        stream = io.StringIO()
+        try:
+            pstats.Stats(self.profile, stream=stream).sort_stats('tottime').print_stats(top)
+        except TypeError:
+            # Профиль пуст: этап ни разу не выполнялся под профилировщиком
+            return ""
+        return stream.getvalue()
+
+    def dump(self, filename):
+        self.profile.dump_stats(filename + '.prof')
+
+class _SamplingBackend:
+    """Сэмплирующий профиль pyinstrument (меньше искажает время коротких функций)"""
+
+    name = 'pyinstrument'
+
+    def __init__(self):
+        from pyinstrument import Profiler
+        self.profiler = Profiler(interval=0.001)
+        self.started = False
+
+    def enable(self):
+        self.profiler.start()
+        self.started = True
+
+    def disable(self):
+        if self.started:
+            self.profiler.stop()
+            self.started = False
+
+    def report(self, top):
+        if self.profiler.last_session is None:
+            return ""
+        return self.profiler.output_text(unicode=True, color=False)
+
+    def dump(self, filename):
+        if self.profiler.last_session is not None:
+            with open(filename + '.html', 'w', encoding='utf-8') as f:
+                f.write(self.profiler.output_html())
+
+def _sampling_available():
+    try:
+        import pyinstrument  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+class StageProfiler:
+    """Профиль CPU и выделений памяти с разбивкой по этапам обработки
+
+    Для каждого этапа (fetch, decode, normalize, persist и other - все
+    остальное) заводится свой профилировщик. При входе в этап и выходе из
+    него профилировщик текущего этапа останавливается, а нового -
+    запускается, поэтому время вложенного этапа не попадает во внешний.
+    Так же на границах этапов снимается снимок tracemalloc, и прирост
+    памяти между снимками записывается на счет этапа, который выполнялся.
+
+    Args:
+        backend: cprofile, pyinstrument или auto (pyinstrument, если установлен)
+        trace_memory: Снимать снимки tracemalloc (заметно замедляет работу)
+        top: Сколько функций и мест выделения памяти выводить для этапа
+    """
+
+    def __init__(self, backend='auto', trace_memory=True, top=20):
+        if backend == 'auto':
+            backend = 'pyinstrument' if _sampling_available() else 'cprofile'
+        self._backend_class = _SamplingBackend if backend == 'pyinstrument' else _CProfileBackend
+        self.trace_memory = trace_memory
+        self.top = top
+        self._profiles = {}
+        self._stack = []
+        self._wall = defaultdict(float)
+        self._calls = defaultdict(int)
+        self._allocations = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+        self._switched_at = None
+        self._snapshot = None
+
+    def _profile(self, name):
+        profile = self._profiles.get(name)
+        if profile is None:
+            profile = self._profiles[name] = self._backend_class()
+        return profile
+
+    def start(self):
+        """Начинает профилирование и делает профилировщик активным для stage()"""
+        global _active
+        if self.trace_memory:
+            tracemalloc.start(1)
+            self._snapshot = self._take_snapshot()
+        self._stack = [OTHER_STAGE]
+        self._calls[OTHER_STAGE] += 1
+        self._switched_at = time.perf_counter()
+        self._profile(OTHER_STAGE).enable()
+        _active = self
+        return self
+
+    def stop(self):
+        global _active
+        if _active is not self:
+            return
+        _active = None
+        self._leave(self._stack[-1])
+        self._stack = []
+        if self.trace_memory:
+            tracemalloc.stop()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    @staticmethod
+    def _take_snapshot():
+        return tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__)
+        ])
+
+    def _leave(self, name):
+        """Останавливает учет этапа name и записывает на его счет время и память"""
+        self._profile(name).disable()
+        now = time.perf_counter()
+        self._wall[name] += now - self._switched_at
+        self._switched_at = now
+        if self.trace_memory:
+            snapshot = self._take_snapshot()
+            for stat in snapshot.compare_to(self._snapshot, 'lineno'):
+                if stat.size_diff or stat.count_diff:
+                    frame = stat.traceback[0]
+                    entry = self._allocations[name][(frame.filename, frame.lineno)]
+                    entry[0] += stat.size_diff
+                    entry[1] += stat.count_diff
+            self._snapshot = snapshot
+            # Время снятия снимка не относится ни к одному этапу
+            self._switched_at = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        """Учитывает блок кода как этап name"""
+        self._leave(self._stack[-1])
+        self._stack.append(name)
+        self._calls[name] += 1
+        self._profile(name).enable()
+        try:
+            yield
+        finally:
+            self._leave(self._stack.pop())
+            self._profile(self._stack[-1]).enable()
+
+    def write_report(self, directory):
+        """Пишет отчет report.txt и профили этапов в каталог; возвращает путь к отчету"""
+        os.makedirs(directory, exist_ok=True)
+        names = [name for name in STAGES + (OTHER_STAGE,) if name in self._profiles]
+        names += sorted(name for name in self._profiles if name not in names)
+        total = sum(self._wall.values()) or 1
+
+        lines = ["===== Этапы =====",
+                 f"{'этап':<12}{'вызовов':>10}{'время, с':>11}{'доля':>8}{'память, КБ':>13}"]
+        for name in names:
+            allocated = sum(size for size, _ in self._allocations[name].values())
+            lines.append(f"{name:<12}{self._calls[name]:>10}{self._wall[name]:>11.3f}"
+                         f"{self._wall[name] / total:>8.1%}{allocated / 1024:>13.1f}")
+
+        for name in names:
+            profile = self._profiles[name]
+            lines.append(f"\n===== {name}: функции ({profile.name}) =====")
+            lines.append(profile.report(self.top).strip() or "нет данных")
+            profile.dump(os.path.join(directory, name))
+
+            if self.trace_memory:
+                lines.append(f"\n===== {name}: места выделения памяти (прирост) =====")
+                sites = sorted(self._allocations[name].items(), key=lambda item: -item[1][0])[:self.top]
+                if not sites:
+                    lines.append("нет данных")
+                for (filename, lineno), (size, count) in sites:
+                    lines.append(f"{size / 1024:>10.1f} КБ {count:>8} блоков  {filename}:{lineno}")
+
+        report_path = os.path.join(directory, "report.txt")
+        with open(report_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        return report_path
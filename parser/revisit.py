@@ -0,0 +1,66 @@
+from loguru import logger
+
+class RevisitPlanner:
+    """Интервал следующего обновления товара по истории его цен и остатков
+
+    Товар, цена которого за окно истории менялась k раз за время T, в среднем
+    меняется раз в T / k; чтобы заставать большинство смен, он обновляется
+    вдвое чаще. Товар без смен цены обновляется не чаще, чем тянется уже
+    подтвержденный период стабильности, поэтому интервал растет примерно
+    вдвое с каждым обновлением до max_interval. Недавняя смена скидки
+    (акция началась или закончилась) и малый остаток (товар может закончиться)
+    сокращают интервал вдвое. Результат ограничивается min_interval и
+    max_interval; пока в истории меньше min_observations записей,
+    используется обычный интервал сущности.
+
+    Args:
+        repo: WildberriesRepository
+        min_interval: Минимальный интервал, секунды
+        max_interval: Максимальный интервал, секунды
+        window_days: Глубина истории, дни
+        low_stock: Остаток, начиная с которого товар считается заканчивающимся
+        min_observations: Минимум записей цены для оценки по истории
+    """
+
+    def __init__(self, repo, min_interval=900, max_interval=86400, window_days=30, low_stock=20,
+                 min_observations=3):
+        self.repo = repo
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.window_days = window_days
+        self.low_stock = low_stock
+        self.min_observations = min_observations
+
+    def plan(self, stats, default):
+        """Рассчитывает интервал по сводке истории (get_product_volatility) и обычному интервалу"""
+        if not stats or stats['observations'] < self.min_observations:
+            return self._clamp(default)
+
+        span = float(stats['span_seconds'])
+        if stats['price_changes']:
+            interval = span / stats['price_changes'] / 2
+        else:
+            interval = max(default, span)
+
+        # Скидка менялась в пределах текущего интервала: цена, скорее всего, еще будет двигаться
+        discount_changed_ago = stats.get('discount_changed_ago')
+        if discount_changed_ago is not None and float(discount_changed_ago) < interval:
+            interval /= 2
+
+        stock = stats.get('stock')
+        if stock is not None and 0 < stock <= self.low_stock:
+            interval /= 2
+
+        return self._clamp(interval)
+
+    def interval(self, wb_id, default):
+        """Интервал до следующего обновления товара wb_id, секунды"""
+        try:
+            stats = self.repo.get_product_volatility(wb_id, self.window_days)
+        except Exception as e:
+            logger.error(f"Ошибка при получении истории товара {wb_id}: {e}")
+            stats = None
+        return self.plan(stats, default)
+
+    def _clamp(self, interval):
+        return max(self.min_interval, min(self.max_interval, interval))
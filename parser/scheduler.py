@@ -0,0 +1,261 @@
+import os
+import json
+import time
+import heapq
+import threading
+
+from parser.anti_block import exponential_backoff
+
+# Виды отслеживаемых сущностей и интервалы их обновления по умолчанию, секунды
+DEFAULT_INTERVALS = {
+    'product': 3600,
+    'seller': 6 * 3600,
+    'category': 6 * 3600,
+    'search': 12 * 3600
+}
+
+class RefreshScheduler:
+    """Очередь обновления отслеживаемых товаров, продавцов, категорий и запросов
+
+    Каждая сущность (вид, ID) хранит интервал обновления и время следующего
+    обновления. Очередь с приоритетом (heapq) упорядочена по этому времени,
+    при равенстве - по приоритету сущности (больше - раньше). Изменение или
+    удаление сущности не перестраивает кучу: устаревшие записи узнаются по
+    номеру версии и отбрасываются при извлечении. Неудачное обновление
+    повторяется с экспоненциальной задержкой, но не позже обычного интервала.
+    С планировщиком (parser.revisit.RevisitPlanner) интервал товаров после
+    обновления рассчитывается по истории их цен и остатков, а интервал
+    сущности служит значением по умолчанию.
+    Набор сущностей сохраняется в JSON-файл и переживает перезапуски.
+    Методы потокобезопасны: сущности можно добавлять из потока управления,
+    пока основной цикл ждет в wait_due().
+    """
+
+    # Служебные поля сущности, которые не сохраняются в файл состояния
+    _TRANSIENT_FIELDS = ('version', 'running')
+
+    def __init__(self, state_file=None, intervals=None, planner=None):
+        self.state_file = state_file
+        self.planner = planner
+        self.intervals = dict(DEFAULT_INTERVALS, **(intervals or {}))
+        self._entities = {}
+        self._heap = []
+        self._version = 0
+        self._changed = threading.Condition()
+        if state_file:
+            self.load()
+
+    @staticmethod
+    def key(kind, entity_id):
+        return f"{kind}:{entity_id}"
+
+    def load(self):
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                entities = json.load(f).get('entities', [])
+        except (FileNotFoundError, json.JSONDecodeError):
+            entities = []
+        with self._changed:
+            for entity in entities:
+                entity.pop('running', None)
+                self._entities[self.key(entity['kind'], entity['id'])] = entity
+                self._push(entity)
+
+    def save(self):
+        """Атомарно сохраняет набор сущностей"""
+        if not self.state_file:
+            return
+        with self._changed:
+            entities = [{name: value for name, value in entity.items() if name not in self._TRANSIENT_FIELDS}
+                        for entity in sorted(self._entities.values(), key=lambda entity: entity['next_due'])]
+            state = json.dumps({'entities': entities}, ensure_ascii=False, indent=2)
+        os.makedirs(os.path.dirname(self.state_file) or '.', exist_ok=True)
+        tmp_filename = self.state_file + '.tmp'
+        with open(tmp_filename, 'w', encoding='utf-8') as f:
+            f.write(state)
+        os.replace(tmp_filename, self.state_file)
+
+    def _push(self, entity):
+        self._version += 1
+        entity['version'] = self._version
+        heapq.heappush(self._heap, (entity['next_due'], -entity.get('priority', 0), self._version,
+                                    self.key(entity['kind'], entity['id'])))
+        self._changed.notify_all()
+
+    def add(self, kind, entity_id, interval=None, priority=0, pages=1):
+        """Добавляет сущность (или меняет параметры уже отслеживаемой) и ставит ее в очередь сейчас"""
+        if kind not in DEFAULT_INTERVALS:
+            raise ValueError(f"Неизвестный вид сущности: {kind}")
+        entity_id = str(entity_id)
+        with self._changed:
+            entity = self._entities.get(self.key(kind, entity_id)) or {
+                'kind': kind, 'id': entity_id, 'failures': 0, 'last_refresh': None
+            }
+            entity.update({
+                'interval': interval or entity.get('interval') or self.intervals[kind],
+                'priority': priority,
+                'pages': pages,
+                'next_due': time.time()
+            })
+            self._entities[self.key(kind, entity_id)] = entity
+            self._push(entity)
+            return {name: value for name, value in entity.items() if name != 'version'}
+
+    def remove(self, kind, entity_id):
+        """Прекращает отслеживание сущности; возвращает False, если ее не было"""
+        with self._changed:
+            return self._entities.pop(self.key(kind, str(entity_id)), None) is not None
+
+    def entities(self):
+        """Снимок отслеживаемых сущностей в порядке следующего обновления"""
+        with self._changed:
+            entities = ({name: value for name, value in entity.items() if name != 'version'}
+                        for entity in self._entities.values())
+            return sorted(entities, key=lambda entity: entity['next_due'])
+
+    def __len__(self):
+        return len(self._entities)
+
+    def _peek(self):
+        """Первая актуальная запись кучи (устаревшие отбрасываются) или None"""
+        while self._heap:
+            _, _, version, key = self._heap[0]
+            entity = self._entities.get(key)
+            if entity is not None and entity['version'] == version:
+                return entity
+            heapq.heappop(self._heap)
+        return None
+
+    def wait_due(self, timeout=None, stop=None):
+        """Ждет, пока подойдет срок обновления первой сущности, и извлекает ее
+
+        Добавление сущности будит ожидание. Возвращает копию сущности или
+        None, если за timeout ничего не подошло или выставлен stop.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._changed:
+            while stop is None or not stop.is_set():
+                entity = self._peek()
+                now = time.time()
+                if entity is not None and entity['next_due'] <= now:
+                    heapq.heappop(self._heap)
+                    entity['running'] = True
+                    return dict(entity)
+                wait = entity['next_due'] - now if entity is not None else None
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return None
+                    wait = remaining if wait is None else min(wait, remaining)
+                # Ожидание прерывается раз в секунду, чтобы заметить stop
+                self._changed.wait(min(wait, 1.0) if wait is not None else 1.0)
+            return None
+
+    def interval_for(self, entity):
+        """Интервал до следующего обновления сущности после успешного обновления"""
+        if self.planner is not None and entity['kind'] == 'product':
+            return self.planner.interval(entity['id'], entity['interval'])
+        return entity['interval']
+
+    def complete(self, entity, success):
+        """Ставит сущность в очередь на следующее обновление после попытки"""
+        # Планировщик обращается к БД, поэтому интервал считается до захвата блокировки
+        interval = self.interval_for(entity) if success else None
+        with self._changed:
+            current = self._entities.get(self.key(entity['kind'], entity['id']))
+            if current is None:
+                # Сущность удалили, пока она обновлялась
+                return
+            current.pop('running', None)
+            # Пока сущность обновлялась, ее добавили снова (add): запрошенный срок не теряется
+            requested_due = current['next_due'] if current['version'] != entity['version'] else None
+            now = time.time()
+            if success:
+                current['failures'] = 0
+                current['last_refresh'] = now
+                current['planned_interval'] = round(interval)
+                current['next_due'] = now + interval
+            else:
+                current['failures'] += 1
+                current['next_due'] = now + exponential_backoff(current['failures'], base_delay=30,
+                                                                max_delay=current['interval'])
+            if requested_due is not None:
+                current['next_due'] = min(current['next_due'], requested_due)
+            self._push(current)
+
+    def notify(self):
+        """Будит wait_due (например, при остановке)"""
+        with self._changed:
+            self._changed.notify_all()
+
+def serve_control(scheduler, port, host='127.0.0.1'):
+    """Запускает локальный HTTP-интерфейс управления набором сущностей в фоновом потоке; возвращает сервер
+
+    GET /entities - список отслеживаемых сущностей
+    POST /entities - добавить сущность: {"kind": ..., "id": ..., "interval": ..., "priority": ..., "pages": ...}
+    DELETE /entities/<вид>/<ID> - прекратить отслеживание
+    """
+    from urllib.parse import unquote
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class ControlHandler(BaseHTTPRequestHandler):
+        def _reply(self, status, payload=None):
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8') if payload is not None else b''
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.split('?')[0] != '/entities':
+                self._reply(404, {'error': 'not found'})
+                return
+            self._reply(200, scheduler.entities())
+
+        def do_POST(self):
+            if self.path != '/entities':
+                self._reply(404, {'error': 'not found'})
+                return
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                entity = scheduler.add(request['kind'], request['id'], interval=request.get('interval'),
+                                       priority=request.get('priority', 0), pages=request.get('pages', 1))
+            except (KeyError, ValueError, TypeError) as e:
+                self._reply(400, {'error': str(e)})
+                return
+            scheduler.save()
+            self._reply(201, entity)
+
+        def do_DELETE(self):
+            parts = self.path.strip('/').split('/', 2)
+            if len(parts) != 3 or parts[0] != 'entities':
+                self._reply(404, {'error': 'not found'})
+                return
+            if not scheduler.remove(parts[1], unquote(parts[2])):
+                self._reply(404, {'error': 'not tracked'})
+                return
+            scheduler.save()
+            self._reply(204)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), ControlHandler)
+    threading.Thread(target=server.serve_forever, name='daemon-control', daemon=True).start()
+    return server
+
+def control_request(port, method, path, payload=None, host='127.0.0.1'):
+    """Отправляет запрос интерфейсу управления демона; возвращает (код ответа, ответ)"""
+    from urllib.error import HTTPError
+    from urllib.request import Request, urlopen
+
+    data = json.dumps(payload, ensure_ascii=False).encode('utf-8') if payload is not None else None
+    request = Request(f"http://{host}:{port}{path}", data=data, method=method,
+                      headers={'Content-Type': 'application/json'})
+    try:
+        with urlopen(request, timeout=10) as response:
+            status, body = response.status, response.read()
+    except HTTPError as e:
+        status, body = e.code, e.read()
+    return status, json.loads(body) if body else None
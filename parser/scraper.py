@@ -1,16 +1,17 @@
 import requests
-import json
 import time
-import random
-from datetime import datetime
-from bs4 import BeautifulSoup
+from urllib.parse import urlparse, parse_qsl
 from loguru import logger
 from config.settings import REQUEST_TIMEOUT, MAX_RETRIES, RETRY_DELAY, USER_AGENTS
 from parser.anti_block import get_random_user_agent, get_random_delay, exponential_backoff
+from models.entities import Product, Price, Seller, extract_category, extract_stocks
+from parser.metrics import REGISTRY
+from parser.profiling import stage
 
 class WildBerriesScraper:
     def __init__(self):
         self.session = requests.Session()
+        self._catalog_menu = None
         self.update_headers()
     
     def update_headers(self):
@@ -22,6 +23,26 @@ class WildBerriesScraper:
             'Connection': 'keep-alive'
         })
     
+    def _get(self, endpoint, url, **kwargs):
+        """GET-запрос сессии с учетом метрик: число запросов по статусам и задержка по endpoint"""
+        started = time.perf_counter()
+        try:
+            with stage('fetch'):
+                response = self.session.get(url, timeout=REQUEST_TIMEOUT, **kwargs)
+        except Exception as e:
+            REGISTRY.inc('wb_http_requests_total', endpoint=endpoint, status=type(e).__name__)
+            raise
+        finally:
+            REGISTRY.observe('wb_http_request_duration_seconds', time.perf_counter() - started, endpoint=endpoint)
+        REGISTRY.inc('wb_http_requests_total', endpoint=endpoint, status=str(response.status_code))
+        return response
+    
+    @staticmethod
+    def _decode(response):
+        """Разбирает JSON ответа (этап decode профиля)"""
+        with stage('decode'):
+            return response.json()
+    
     def get_product_data(self, product_id):
         """Получает данные о товаре по его ID"""
         url = f"https://card.wb.ru/cards/detail?nm={product_id}"
@@ -30,41 +51,25 @@ class WildBerriesScraper:
             try:
                 # Обновляем заголовки перед запросом
                 self.update_headers()
+                if attempt > 0:
+                    REGISTRY.inc('wb_http_retries_total', endpoint='card')
                 
                 # Делаем запрос с таймаутом
-                response = self.session.get(url, timeout=REQUEST_TIMEOUT)
+                response = self._get('card', url)
                 
                 if response.status_code == 200:
-                    data = response.json()
+                    data = self._decode(response)
                     
                     # Проверяем наличие данных о товаре
                     if 'data' in data and 'products' in data['data'] and len(data['data']['products']) > 0:
                         product = data['data']['products'][0]
                         
                         # Получаем дополнительные данные (цены, наличие)
-                        prices_data = self._get_product_prices(product_id)
-                        
-                        # Форматируем данные в единую структуру
-                        result = {
-                            'wb_id': str(product_id),
-                            'name': product.get('name', ''),
-                            'brand': product.get('brand', ''),
-                            'category': self._extract_category(product),
-                            'seller': {
-                                'id': product.get('supplierId', 0),
-                                'name': product.get('supplierName', '')
-                            },
-                            'rating': product.get('rating', 0),
-                            'feedbacks_count': product.get('feedbacks', 0),
-                            'price': {
-                                'current': prices_data.get('current_price'),
-                                'original': prices_data.get('original_price'),
-                                'discount_percentage': prices_data.get('discount_percentage')
-                            },
-                            'stocks': self._extract_stocks(product)
-                        }
+                        price = self._get_product_prices(product_id)
                         
-                        return result
+                        # Собираем сущность товара за один проход по карточке
+                        with stage('normalize'):
+                            return Product.from_card_payload(product, price, product_id)
                     else:
                         logger.warning(f"Товар {product_id} не найден или данные отсутствуют")
                 else:
@@ -80,65 +85,101 @@ class WildBerriesScraper:
         
         return None
     
+    def get_product_seller(self, product_id):
+        """Получает продавца товара из карточки без запроса цен"""
+        url = f"https://card.wb.ru/cards/detail?nm={product_id}"
+        
+        try:
+            response = self._get('card_seller', url)
+            if response.status_code == 200:
+                data = self._decode(response)
+                
+                if 'data' in data and 'products' in data['data'] and len(data['data']['products']) > 0:
+                    product = data['data']['products'][0]
+                    return Seller(product.get('supplierId', 0), product.get('supplierName', ''))
+        except Exception as e:
+            logger.error(f"Ошибка при получении продавца товара {product_id}: {e}")
+        
+        return None
+    
+    def get_seller_legal_info(self, seller_id):
+        """Получает юридические данные продавца (наименование, ИНН, ОГРН, адрес)"""
+        url = f"https://static-basket-01.wbbasket.ru/vol0/data/supplier-by-id/{seller_id}.json"
+        
+        try:
+            response = self._get('supplier', url)
+            if response.status_code == 200:
+                data = self._decode(response)
+                
+                if data and not data.get('isUnknown'):
+                    return data
+        except Exception as e:
+            logger.error(f"Ошибка при получении юридических данных продавца {seller_id}: {e}")
+        
+        return None
+    
     def _get_product_prices(self, product_id):
         """Получает данные о ценах товара"""
         url = f"https://wbxcatalog-ru.wildberries.ru/nm-2-card/catalog?spp=0&regions=68,64,83,4,38,80,33,70,82,86,75,30,69,22,66,31,48,1,40,71&stores=117673,122258,122259,125238,125239,125240,507,3158,117501,120602,120762,6158,121709,124731,130744,159402,2737,117986,1733,686,132043&nm={product_id}"
         
         try:
-            response = self.session.get(url, timeout=REQUEST_TIMEOUT)
+            response = self._get('prices', url)
             if response.status_code == 200:
-                data = response.json()
+                data = self._decode(response)
                 
                 if 'data' in data and 'products' in data['data'] and len(data['data']['products']) > 0:
-                    product = data['data']['products'][0]
-                    
-                    current_price = product.get('salePriceU', 0) / 100 if 'salePriceU' in product else 0
-                    original_price = product.get('priceU', 0) / 100 if 'priceU' in product else current_price
-                    
-                    discount_percentage = 0
-                    if original_price > 0 and current_price < original_price:
-                        discount_percentage = round((1 - current_price / original_price) * 100, 2)
-                    
-                    return {
-                        'current_price': current_price,
-                        'original_price': original_price,
-                        'discount_percentage': discount_percentage
-                    }
+                    with stage('normalize'):
+                        return Price.from_payload(data['data']['products'][0])
         except Exception as e:
             logger.error(f"Ошибка при получении цен товара {product_id}: {e}")
         
-        return {
-            'current_price': 0,
-            'original_price': 0,
-            'discount_percentage': 0
-        }
+        return Price(0, 0, 0)
     
     def _extract_category(self, product):
         """Извлекает категорию товара из данных"""
-        if 'subj' in product and 'name' in product['subj']:
-            return product['subj']['name']
-        return "Без категории"
+        return extract_category(product)
     
     def _extract_stocks(self, product):
         """Извлекает данные о наличии товара на складах"""
-        stocks = {}
+        return extract_stocks(product)
+    
+    def get_catalog_menu(self):
+        """Получает дерево категорий каталога (ссылка, шард и параметры запроса каждой категории)"""
+        if self._catalog_menu is not None:
+            return self._catalog_menu
         
-        if 'sizes' in product:
-            for size in product['sizes']:
-                if 'stocks' in size:
-                    for stock in size['stocks']:
-                        warehouse_id = stock.get('wh', 0)
-                        quantity = stock.get('qty', 0)
-                        
-                        if warehouse_id in stocks:
-                            stocks[warehouse_id] += quantity
-                        else:
-                            stocks[warehouse_id] = quantity
+        url = "https://static-basket-01.wbbasket.ru/vol0/data/main-menu-ru-ru-v3.json"
+        try:
+            response = self._get('catalog_menu', url)
+            if response.status_code == 200:
+                self._catalog_menu = self._decode(response)
+                return self._catalog_menu
+        except Exception as e:
+            logger.error(f"Ошибка при получении дерева каталога: {e}")
         
-        return stocks
+        return []
     
-    def get_category_products(self, category_id, page=1, limit=100):
-        """Получает список товаров из категории"""
+    def find_category(self, category_url):
+        """Находит категорию в дереве каталога по ссылке на ее страницу
+        
+        Returns:
+            Узел дерева с ключами shard и query или None, если категория не найдена
+        """
+        path = urlparse(category_url).path.rstrip('/')
+        nodes = list(self.get_catalog_menu())
+        while nodes:
+            node = nodes.pop()
+            if node.get('url', '').rstrip('/') == path and node.get('shard'):
+                return node
+            nodes.extend(node.get('childs', []))
+        return None
+    
+    def get_category_products(self, category_id, page=1, limit=100, query=None):
+        """Получает список товаров из категории
+        
+        category_id - шард каталога, query - параметры запроса категории из
+        дерева каталога (например, "cat=128483")
+        """
         url = f"https://catalog.wb.ru/catalog/{category_id}/catalog"
         params = {
             "appType": 1,
@@ -156,11 +197,13 @@ class WildBerriesScraper:
             "spp": 0,
             "limit": limit
         }
+        if query:
+            params.update(parse_qsl(query))
         
         try:
-            response = self.session.get(url, params=params, timeout=REQUEST_TIMEOUT)
+            response = self._get('catalog', url, params=params)
             if response.status_code == 200:
-                data = response.json()
+                data = self._decode(response)
                 
                 if 'data' in data and 'products' in data['data']:
                     return data['data']['products']
@@ -191,9 +234,9 @@ class WildBerriesScraper:
         }
         
         try:
-            response = self.session.get(url, params=params, timeout=REQUEST_TIMEOUT)
+            response = self._get('seller_catalog', url, params=params)
             if response.status_code == 200:
-                data = response.json()
+                data = self._decode(response)
                 
                 if 'data' in data and 'products' in data['data']:
                     return data['data']['products']
@@ -213,9 +256,9 @@ class WildBerriesScraper:
         }
         
         try:
-            response = self.session.get(url, params=params, timeout=REQUEST_TIMEOUT)
+            response = self._get('feedbacks', url, params=params)
             if response.status_code == 200:
-                data = response.json()
+                data = self._decode(response)
                 
                 if 'feedbacks' in data:
                     return data['feedbacks']
@@ -247,9 +290,9 @@ class WildBerriesScraper:
         }
         
         try:
-            response = self.session.get(url, params=params, timeout=REQUEST_TIMEOUT)
+            response = self._get('search', url, params=params)
             if response.status_code == 200:
-                data = response.json()
+                data = self._decode(response)
                 
                 if 'data' in data and 'products' in data['data']:
                     return data['data']['products']
@@ -0,0 +1,105 @@
+import os
+import json
+
+class SelectorStats:
+    """Статистика срабатывания селекторов по типам страниц
+
+    Для каждого типа страницы (например, блок продавца в карточке товара
+    или подсказка на странице продавца) запоминается, сколько раз селектор
+    пробовали и сколько раз он нашел элемент. По этой статистике списки
+    селекторов переупорядочиваются: сначала пробуются самые результативные.
+    Селекторы, не срабатывавшие skip_after_runs запусков подряд, уходят в
+    резервный список и пробуются только если основные ничего не нашли.
+    Статистика хранится в JSON-файле и переживает перезапуски. В процессах
+    воркеров (keep_records=True) попытки дополнительно копятся для передачи
+    в основной процесс, который один пишет файл.
+    """
+
+    def __init__(self, filename, skip_after_runs=5, keep_records=False):
+        self.filename = filename
+        self.skip_after_runs = skip_after_runs
+        self.keep_records = keep_records
+        self.runs = 0
+        self._pages = {}
+        self._pending = []
+        self._dirty = False
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.filename, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            state = {}
+        self.runs = state.get('runs', 0)
+        self._pages = state.get('pages', {})
+
+    def begin_run(self):
+        """Отмечает начало нового запуска (счетчик запусков для пропуска селекторов)"""
+        self.runs += 1
+        self._dirty = True
+
+    def _entry(self, page_type, selector):
+        return self._pages.setdefault(page_type, {}).setdefault(
+            selector, {'hits': 0, 'attempts': 0, 'first_run': self.runs, 'last_hit_run': None}
+        )
+
+    def record(self, page_type, selector, hit):
+        """Запоминает попытку селектора и ее результат"""
+        self._apply(page_type, selector, hit)
+        if self.keep_records:
+            self._pending.append((page_type, selector, hit))
+
+    def take_records(self):
+        """Возвращает попытки, записанные с прошлого вызова (для передачи из процесса-воркера)"""
+        records, self._pending = self._pending, []
+        return records
+
+    def merge(self, records):
+        """Добавляет попытки, записанные в другом процессе"""
+        for page_type, selector, hit in records:
+            self._apply(page_type, selector, hit)
+
+    def _apply(self, page_type, selector, hit):
+        entry = self._entry(page_type, selector)
+        entry['attempts'] += 1
+        if hit:
+            entry['hits'] += 1
+            entry['last_hit_run'] = self.runs
+        self._dirty = True
+
+    def _is_stale(self, entry):
+        last_run = entry['last_hit_run'] if entry['last_hit_run'] is not None else entry['first_run']
+        return entry['attempts'] > 0 and self.runs - last_run >= self.skip_after_runs
+
+    def split(self, page_type, selectors):
+        """Возвращает (основные, резервные) селекторы в порядке убывания доли попаданий
+
+        Доля попаданий сглажена ((hits + 1) / (attempts + 2)), поэтому новые
+        селекторы встают между надежными и постоянно промахивающимися, а
+        при равенстве сохраняется исходный порядок списка.
+        """
+        stats = self._pages.get(page_type, {})
+
+        def rate(selector):
+            entry = stats.get(selector)
+            if entry is None:
+                return 0.5
+            return (entry['hits'] + 1) / (entry['attempts'] + 2)
+
+        ordered = sorted(selectors, key=rate, reverse=True)
+        fast, fallback = [], []
+        for selector in ordered:
+            entry = stats.get(selector)
+            (fallback if entry is not None and self._is_stale(entry) else fast).append(selector)
+        return fast, fallback
+
+    def save(self):
+        """Атомарно сохраняет статистику на диск"""
+        if not self._dirty:
+            return
+        tmp_filename = self.filename + '.tmp'
+        with open(tmp_filename, 'w', encoding='utf-8') as f:
+            json.dump({'runs': self.runs, 'pages': self._pages}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_filename, self.filename)
+        self._dirty = False
@@ -0,0 +1,87 @@
+import os
+import re
+import json
+import time
+
+class SellerCache:
+    """Кэш юридической информации продавцов с ограниченным сроком жизни
+
+    Товары одной категории часто продаются одним и тем же продавцом, поэтому
+    информация о нем сохраняется по ключу продавца и переиспользуется без
+    повторного перехода на его страницу. Кэш хранится в JSON-файле и
+    переживает перезапуски; записи старше ttl_days считаются устаревшими.
+    """
+
+    def __init__(self, filename, ttl_days=30):
+        self.filename = filename
+        self.ttl = ttl_days * 24 * 3600
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._dirty = False
+        self.load()
+
+    @staticmethod
+    def key_for(seller_url=None, seller_name=None):
+        """Возвращает ключ продавца: ID из ссылки, саму ссылку или имя"""
+        if seller_url:
+            match = re.search(r'/seller/(\d+)', seller_url)
+            if match:
+                return SellerCache.key_for_id(match.group(1))
+            return seller_url.split('?')[0].rstrip('/')
+        if seller_name:
+            return f"name:{seller_name.strip()}"
+        return None
+
+    @staticmethod
+    def key_for_id(seller_id):
+        """Ключ продавца по его ID (совпадает с ключом по ссылке /seller/<id>)"""
+        return f"seller:{seller_id}"
+
+    @staticmethod
+    def id_from_key(key):
+        """ID продавца из ключа вида seller:<id> или None для ключей по ссылке и имени"""
+        if key and key.startswith('seller:') and key[7:].isdigit():
+            return int(key[7:])
+        return None
+
+    def load(self):
+        try:
+            with open(self.filename, 'r', encoding='utf-8') as f:
+                self._entries = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._entries = {}
+
+    def get(self, key):
+        """Возвращает сохраненную запись продавца или None, если ее нет или она устарела"""
+        entry = self._entries.get(key) if key else None
+        if entry is None or time.time() - entry['cached_at'] > self.ttl:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def set(self, key, seller_name, seller_info, **extra):
+        """Запоминает информацию о продавце"""
+        if not key:
+            return
+        self._entries[key] = {
+            'seller_name': seller_name,
+            'seller_info': seller_info,
+            'cached_at': time.time(),
+            **extra
+        }
+        self._dirty = True
+
+    def save(self):
+        """Атомарно сохраняет кэш на диск, удаляя устаревшие записи"""
+        if not self._dirty:
+            return
+        now = time.time()
+        self._entries = {key: entry for key, entry in self._entries.items()
+                         if now - entry['cached_at'] <= self.ttl}
+        tmp_filename = self.filename + '.tmp'
+        with open(tmp_filename, 'w', encoding='utf-8') as f:
+            json.dump(self._entries, f, ensure_ascii=False)
+        os.replace(tmp_filename, self.filename)
+        self._dirty = False
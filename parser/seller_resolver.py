@@ -0,0 +1,70 @@
+from loguru import logger
+
+from models.entities import SellerLegalInfo
+from parser.scraper import WildBerriesScraper
+from parser.seller_cache import SellerCache
+
+SOURCE_CACHE = 'cache'
+SOURCE_HTTP = 'http'
+SOURCE_BROWSER = 'browser'
+
+def has_legal_details(text):
+    """Проверяет, что текст содержит регистрационные данные (ИНН или ОГРН)"""
+    return bool(text) and ("ИНН" in text or "ОГРН" in text)
+
+def format_legal_info(details):
+    """Приводит юридические данные продавца к виду текста подсказки на сайте"""
+    lines = [
+        details.get('supplierFullName') or details.get('supplierName'),
+        details.get('legalAddress')
+    ]
+    for label, key in (('ОГРН', 'ogrn'), ('ОГРНИП', 'ogrnip'), ('ИНН', 'inn'), ('КПП', 'kpp')):
+        if details.get(key):
+            lines.append(f"{label}: {details[key]}")
+    return "\n".join(line for line in lines if line)
+
+class SellerResolver:
+    """Получение юридической информации о продавце товара без браузера
+
+    Продавец определяется по supplierId из JSON-карточки товара, после чего
+    его данные берутся из кэша или из JSON-справочника продавцов WB.
+    Если ни то, ни другое не дало ИНН/ОГРН, resolve() возвращает None и
+    вызывающий код переходит к получению данных через браузер.
+    """
+
+    def __init__(self, scraper=None, cache=None):
+        self.scraper = scraper or WildBerriesScraper()
+        self.cache = cache
+        self.stats = {SOURCE_CACHE: 0, SOURCE_HTTP: 0, SOURCE_BROWSER: 0, 'unresolved': 0}
+
+    def resolve(self, product_id):
+        """Возвращает SellerLegalInfo для товара или None, если нужен браузер"""
+        seller = self.scraper.get_product_seller(product_id)
+        if seller is None or not seller.id:
+            self.stats['unresolved'] += 1
+            return None
+        return self.resolve_seller(seller)
+
+    def resolve_seller(self, seller):
+        """Возвращает SellerLegalInfo для уже известного продавца (например, из выдачи каталога)"""
+        key = SellerCache.key_for_id(seller.id)
+        if self.cache is not None:
+            entry = self.cache.get(key)
+            if entry is not None:
+                self.stats[SOURCE_CACHE] += 1
+                return SellerLegalInfo(seller.id, entry['seller_name'] or seller.name,
+                                       entry['seller_info'], SOURCE_CACHE)
+
+        details = self.scraper.get_seller_legal_info(seller.id)
+        text = format_legal_info(details) if details else ""
+        if not has_legal_details(text):
+            logger.debug(f"Юридические данные продавца {seller.id} недоступны по HTTP")
+            self.stats['unresolved'] += 1
+            return None
+
+        seller_name = details.get('trademark') or details.get('supplierName') or seller.name
+        if self.cache is not None:
+            self.cache.set(key, seller_name, text, source=SOURCE_HTTP)
+        self.stats[SOURCE_HTTP] += 1
+        return SellerLegalInfo(seller.id, seller_name, text, SOURCE_HTTP)
+
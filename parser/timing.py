@@ -0,0 +1,93 @@
+import json
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+
+from loguru import logger
+
+# Границы корзин гистограммы длительностей, секунды
+HISTOGRAM_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+class StageTimer:
+    """Замеры длительности этапов обработки (спанов) с гистограммами
+
+    Каждый спан - это этап (загрузка категории, переход на товар, поиск
+    продавца и т.д.) с длительностью и произвольными атрибутами (например,
+    ID товара). Длительности копятся по этапам для итоговой таблицы, а при
+    заданном trace_file каждый спан пишется в него строкой JSON.
+    """
+
+    def __init__(self, trace_file=None, keep_records=False):
+        self.trace_file = trace_file
+        self.keep_records = keep_records
+        self.durations = defaultdict(list)
+        self._pending = []
+        self._trace = open(trace_file, 'a', encoding='utf-8') if trace_file else None
+
+    @contextmanager
+    def span(self, stage, **attrs):
+        """Замеряет длительность блока кода как этап stage"""
+        started_at = time.time()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - started, started_at, **attrs)
+
+    def record(self, stage, duration, started_at=None, **attrs):
+        """Добавляет замер этапа, сделанный вне span()"""
+        span = {
+            'stage': stage,
+            'start': started_at if started_at is not None else time.time() - duration,
+            'duration': round(duration, 6),
+            **attrs
+        }
+        self._add(span)
+        if self.keep_records:
+            self._pending.append(span)
+
+    def _add(self, span):
+        self.durations[span['stage']].append(span['duration'])
+        if self._trace is not None:
+            self._trace.write(json.dumps(span, ensure_ascii=False) + '\n')
+
+    def take_records(self):
+        """Возвращает спаны, записанные с прошлого вызова (для передачи из процесса-воркера)"""
+        records, self._pending = self._pending, []
+        return records
+
+    def merge(self, records):
+        """Добавляет спаны, записанные в другом процессе"""
+        for span in records:
+            self._add(span)
+
+    def histogram(self, stage):
+        """Количество замеров этапа по корзинам HISTOGRAM_BUCKETS (последняя - больше 30 с)"""
+        counts = [0] * (len(HISTOGRAM_BUCKETS) + 1)
+        for duration in self.durations.get(stage, []):
+            counts[bisect_left(HISTOGRAM_BUCKETS, duration)] += 1
+        return counts
+
+    def close(self):
+        if self._trace is not None:
+            self._trace.close()
+            self._trace = None
+
+    def print_summary(self):
+        if not self.durations:
+            return
+        lines = ["===== Длительность этапов ====="]
+        lines.append(f"{'этап':<20}{'кол-во':>8}{'всего, с':>10}{'средн, с':>10}{'p50, с':>9}{'p95, с':>9}{'макс, с':>9}")
+        for stage, values in sorted(self.durations.items(), key=lambda item: -sum(item[1])):
+            ordered = sorted(values)
+            count = len(ordered)
+            lines.append(f"{stage:<20}{count:>8}{sum(ordered):>10.1f}{sum(ordered) / count:>10.2f}"
+                         f"{ordered[count // 2]:>9.2f}{ordered[min(int(count * 0.95), count - 1)]:>9.2f}{ordered[-1]:>9.2f}")
+
+        labels = [f"<{bound}" for bound in HISTOGRAM_BUCKETS] + [f">{HISTOGRAM_BUCKETS[-1]}"]
+        lines.append("")
+        lines.append("Гистограмма, секунды: " + " ".join(f"{label:>6}" for label in labels))
+        for stage in sorted(self.durations):
+            lines.append(f"{stage:<22}" + " ".join(f"{count:>6}" for count in self.histogram(stage)))
+        logger.info("\n" + "\n".join(lines))